@@ -0,0 +1,47 @@
+"""control-server.py를 import해서 쓰기 위한 패키지 (테스트, 벤치마크, 한 프로세스에 여러 인스턴스)
+
+control-server.py는 파일 이름에 '-'가 있어 일반 import가 안 되고, 서버 상태(장치 목록, 락, 스레드)를
+모듈 전역으로 가진다. 이 패키지는 파일을 인스턴스마다 새 모듈로 로드해 전역 상태를 분리한다.
+import만으로는 스레드/소켓을 만들지 않으며, 백그라운드 작업은 uvicorn lifespan 시작 시에만 시작된다.
+
+사용:
+  from aircon_server import ServerConfig, create_app
+  app = create_app(ServerConfig(port=8001, udp_listener=False, time_sync=False, mdns=False,
+                                transport=fake_requests, db_path="/tmp/a.db"))
+  uvicorn.run(app, port=8001)
+
+  srv = app.state.server      # 인스턴스의 모듈 (devices, send_ac_command 등 직접 접근)
+"""
+import importlib.util
+import itertools
+import os
+import sys
+
+from aircon_server.config import ServerConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_PATH = os.path.join(ROOT, "control-server.py")
+
+_instance_seq = itertools.count(1)
+
+
+def load_server_module():
+    """control-server.py를 새 모듈 객체로 로드 (호출마다 전역 상태가 분리된 인스턴스)"""
+    if ROOT not in sys.path:
+        sys.path.append(ROOT)   # control-server.py가 같은 폴더의 registry_shm, aircon_server.config를 import
+    name = f"aircon_server.instance{next(_instance_seq)}"
+    spec = importlib.util.spec_from_file_location(name, SERVER_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def create_app(config=None):
+    """새 서버 인스턴스를 만들고 config(ServerConfig)를 적용한 FastAPI app 반환"""
+    mod = load_server_module()
+    app = mod.create_app(config)
+    app.state.server = mod
+    return app
+
+
+__all__ = ["ServerConfig", "create_app", "load_server_module"]
@@ -0,0 +1,31 @@
+"""create_app 설정
+
+control-server.py를 로드하지 않고 만들 수 있도록 별도 모듈에 둔다 (서버 모듈도 이 클래스를 import).
+None인 항목은 서버 모듈의 설정(환경 변수 또는 기본값)을 그대로 쓰고, create_app이 채운 사본을
+인스턴스 모듈의 server_config로 남긴다.
+"""
+import dataclasses
+from typing import Any, Dict
+
+
+@dataclasses.dataclass
+class ServerConfig:
+    host: str | None = None
+    port: int | None = None
+    udp_port: int | None = None          # UDP 수신 포트 (기본 4210). 한 호스트에 여러 인스턴스면 달리 지정
+    udp_listener: bool | None = None     # UDP 수신 + discover
+    scheduler: bool | None = None
+    time_sync: bool | None = None        # 시스템 시계를 바꾸므로 테스트 인스턴스에서는 끌 것
+    mdns: bool | None = None
+    registry_snapshot: bool | None = None
+    static_watch: bool | None = None
+    health_probe: bool | None = None
+    db_path: str | None = None
+    snapshot_path: str | None = None
+    pending_commands_path: str | None = None
+    action_log_path: str | None = None
+    config_path: str | None = None       # 런타임 설정 파일 (다른 경로면 create_app에서 읽고, 잘못되면 ValueError)
+    transport: Any = None    # requests 호환 .get 객체 (None이면 requests)
+    clock: Any = None        # .time()을 가진 객체 (None이면 time 모듈)
+    registry: Dict[str, Dict[str, Any]] | None = None   # 장치 목록으로 쓸 dict (None이면 빈 목록)
+    store: Any = None        # 새 sqlite3 연결을 반환하는 callable (None이면 db_path)
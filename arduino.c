@@ -28,6 +28,8 @@ const char* PASS = "a1234567890";
 static const char* HOST = "f4-ac-01";
 static const uint16_t HTTP_PORT = 80;
 static const uint16_t UDP_PORT  = 4210;
+// 그룹 명령 대상 이름 (예: 층 "3F"). 서버의 /all/off?group=3F 브로드캐스트 1패킷에 반응. 비우면 전체("*") 명령만
+static const char* GROUP = "";
 static const unsigned long MDNS_ANNOUNCE_MS = 120000;
 static const unsigned long WIFI_RETRY_INTERVAL_MS = 5000;    // 재연결 간 최소 대기(5초)
 static const unsigned long WIFI_CONNECT_TIMEOUT_MS = 120000;  // 초기/재연결 대기 한계(120초)
@@ -63,9 +65,19 @@ unsigned long g_preSignalUntilMs = 0;
 IPAddress g_backendIp;
 uint16_t  g_backendPort = 0;
 bool      g_statusPushPending = false;
+// UDP 명령: 최근 적용한 seq 링 (서버 재전송 시 IR 중복 송신 방지).
+// 그룹 명령 재전송이 그 뒤에 온 장치별 명령보다 늦게 도착해도 이미 본 seq면 다시 적용하지 않음
+static const uint8_t CMD_SEQ_RING = 16;
+uint32_t  g_cmdSeqRing[CMD_SEQ_RING];
+uint8_t   g_cmdSeqCount = 0;
+uint8_t   g_cmdSeqNext = 0;
 unsigned long g_statusPushDueMs = 0;
 static const uint16_t BACKEND_HTTP_PORT_DEFAULT = 8000;
 uint16_t g_backendHttpPort = BACKEND_HTTP_PORT_DEFAULT;
+// 서버가 discover {"wire":N}로 알린 바이너리 상태 형식 버전 (0이면 JSON + HTTP POST)
+static const uint8_t WIRE_VERSION = 1;
+uint8_t  g_backendWire = 0;
+uint32_t g_statusSeq = 0;   // 상태 푸시 순번 (부팅 시 임의 값에서 시작, 서버가 중복/지연 패킷 무시)
 
 // ---------------------------
 // AC 상태 저장
@@ -273,16 +285,61 @@ String netJson() {
 // ---------------------------
 // 상태 푸시 (UDP 유니캐스트, 브로드캐스트 질의에 대한 별도 푸시)
 // ---------------------------
+// 바이너리 형식 v1 (big-endian, control-server.py의 _WIRE_HEADER와 동일)
+// "AS" ver flags seq(4) ip(4) port(2) udp_port(2) temp mode fan room_temp x10(2) id_len id group_len group
+void pushStatusWire() {
+  updateDhtIfNeeded();
+  uint8_t pkt[22 + 64 + 1 + 32];
+  size_t n = 0;
+  uint8_t idLen = (uint8_t)min((size_t)64, strlen(HOST));
+  uint8_t groupLen = (uint8_t)min((size_t)32, strlen(GROUP));
+  uint32_t seq = ++g_statusSeq;
+  IPAddress ip = WiFi.localIP();
+  int16_t room = isnan(g_lastTempC) ? (int16_t)-32768 : (int16_t)lroundf(g_lastTempC * 10.0f);
+  uint8_t fan = (st_fan == kSamsungAcFanLow ? 1 :
+                 st_fan == kSamsungAcFanMed ? 2 :
+                 st_fan == kSamsungAcFanHigh ? 3 : 0);
+
+  pkt[n++] = 'A'; pkt[n++] = 'S';
+  pkt[n++] = WIRE_VERSION;
+  pkt[n++] = 0x04 | (st_power ? 0x01 : 0) | (st_swing ? 0x02 : 0);   // state | power | swing
+  pkt[n++] = seq >> 24; pkt[n++] = seq >> 16; pkt[n++] = seq >> 8; pkt[n++] = seq;
+  for (int i = 0; i < 4; i++) pkt[n++] = ip[i];
+  pkt[n++] = HTTP_PORT >> 8; pkt[n++] = HTTP_PORT & 0xFF;
+  pkt[n++] = UDP_PORT >> 8;  pkt[n++] = UDP_PORT & 0xFF;
+  pkt[n++] = st_temp;
+  pkt[n++] = (st_mode == kSamsungAcHeat) ? 1 : 0;
+  pkt[n++] = fan;
+  pkt[n++] = (uint16_t)room >> 8; pkt[n++] = (uint16_t)room & 0xFF;
+  pkt[n++] = idLen;
+  memcpy(pkt + n, HOST, idLen); n += idLen;
+  pkt[n++] = groupLen;
+  memcpy(pkt + n, GROUP, groupLen); n += groupLen;
+
+  // discover를 보낸 서버 소켓으로 바로 응답 (TCP 연결 없음)
+  udp.beginPacket(g_backendIp, g_backendPort);
+  udp.write(pkt, n);
+  udp.endPacket();
+}
+
 void pushStatusToBackend() {
   if (!g_statusPushPending) return;
   unsigned long now = millis();
   if ((long)(now - g_statusPushDueMs) < 0) return;
   g_statusPushPending = false;
 
+  if (g_backendWire >= 1) {
+    pushStatusWire();
+    yield();
+    return;
+  }
+
   String payload = String("{\"id\":\"") + HOST +
                    "\",\"domain\":\"" + HOST + ".local" +
                    "\",\"ip\":\"" + WiFi.localIP().toString() +
                    "\",\"port\":" + HTTP_PORT +
+                   ",\"udp_port\":" + UDP_PORT +
+                   ",\"group\":\"" + GROUP + "\"" +
                    ",\"state\":" + stateJson() +
                    "}";
   // HTTP PUT로 백엔드에 유니캐스트 전송
@@ -303,6 +360,27 @@ void pushStatusToBackend() {
 // ---------------------------
 void handleOptions() { addCORS(); server.send(204, "text/plain", ""); }
 
+// 명령 필드 1개 적용 (HTTP /ac/set 인자와 UDP set 명령 공용)
+static const char* CMD_KEYS[] = {"power", "mode", "temp", "fan", "swing"};
+
+void applyCommandField(const String& key, const String& v) {
+  if (key == "power") {
+    st_power = (v == "on" || v == "1" || v == "true");
+  } else if (key == "mode") {
+    st_mode = (v == "hot") ? kSamsungAcHeat : kSamsungAcCool;
+  } else if (key == "temp") {
+    int t = v.toInt();
+    if (t >= 16 && t <= 30) st_temp = t;
+  } else if (key == "fan") {
+    if      (v == "auto")   st_fan = kSamsungAcFanAuto;
+    else if (v == "low")    st_fan = kSamsungAcFanLow;
+    else if (v == "medium") st_fan = kSamsungAcFanMed;
+    else if (v == "high")   st_fan = kSamsungAcFanHigh;
+  } else if (key == "swing") {
+    st_swing = (v == "on" || v == "1" || v == "true");
+  }
+}
+
 void handleSet() {
   addCORS();
 
@@ -310,28 +388,8 @@ void handleSet() {
   g_preSignalUntilMs = millis() + 1000;
   updateStatusLeds();
 
-  if (server.hasArg("power")) {
-    String v = server.arg("power");
-    st_power = (v == "on" || v == "1" || v == "true");
-  }
-  if (server.hasArg("mode")) {
-    String m = server.arg("mode");
-    st_mode = (m == "hot") ? kSamsungAcHeat : kSamsungAcCool;
-  }
-  if (server.hasArg("temp")) {
-    int t = server.arg("temp").toInt();
-    if (t >= 16 && t <= 30) st_temp = t;
-  }
-  if (server.hasArg("fan")) {
-    String f = server.arg("fan");
-    if      (f == "auto")   st_fan = kSamsungAcFanAuto;
-    else if (f == "low")    st_fan = kSamsungAcFanLow;
-    else if (f == "medium") st_fan = kSamsungAcFanMed;
-    else if (f == "high")   st_fan = kSamsungAcFanHigh;
-  }
-  if (server.hasArg("swing")) {
-    String s = server.arg("swing");
-    st_swing = (s == "on" || s == "1" || s == "true");
+  for (const char* key : CMD_KEYS) {
+    if (server.hasArg(key)) applyCommandField(key, server.arg(key));
   }
 
   // 상태 변경 저장
@@ -424,6 +482,68 @@ void sendHeartbeatIfDue() {
 }
 #endif
 
+// ---------------------------
+// UDP 명령 (서버 → {"op":"set","seq":N,"to":"<HOST>|*"|"group":"<GROUP>",...} → ack)
+// ---------------------------
+// 가벼운 JSON 필드 추출 ("key":값 → 값 문자열, 따옴표 제거). 없으면 빈 문자열
+String jsonField(const String& q, const char* key) {
+  String k = String("\"") + key + "\"";
+  int p = q.indexOf(k);
+  if (p < 0) return "";
+  int c = q.indexOf(':', p + k.length());
+  if (c < 0) return "";
+  int end = q.indexOf(',', c + 1);
+  if (end < 0) end = q.indexOf('}', c + 1);
+  if (end < 0) end = q.length();
+  String v = q.substring(c + 1, end);
+  v.trim();
+  if (v.length() >= 2 && v.startsWith("\"") && v.endsWith("\"")) v = v.substring(1, v.length() - 1);
+  return v;
+}
+
+bool cmdSeqSeen(uint32_t seq) {
+  for (uint8_t i = 0; i < g_cmdSeqCount; i++) {
+    if (g_cmdSeqRing[i] == seq) return true;
+  }
+  return false;
+}
+
+void rememberCmdSeq(uint32_t seq) {
+  g_cmdSeqRing[g_cmdSeqNext] = seq;
+  g_cmdSeqNext = (g_cmdSeqNext + 1) % CMD_SEQ_RING;
+  if (g_cmdSeqCount < CMD_SEQ_RING) g_cmdSeqCount++;
+}
+
+void handleUdpCommand(const String& q) {
+  String to = jsonField(q, "to");
+  String group = jsonField(q, "group");
+  bool mine = (to == "*" || to.equalsIgnoreCase(HOST)) ||
+              (group.length() > 0 && strlen(GROUP) > 0 && group.equalsIgnoreCase(GROUP));
+  if (!mine) return;
+
+  uint32_t seq = (uint32_t)strtoul(jsonField(q, "seq").c_str(), NULL, 10);
+  // 이미 적용한 seq의 재전송(ack 유실, 그룹 명령 재전송)이면 IR을 다시 쏘지 않고 ack만 다시 보냄
+  if (!cmdSeqSeen(seq)) {
+    g_preSignalUntilMs = millis() + 1000;
+    updateStatusLeds();
+    for (const char* key : CMD_KEYS) {
+      String v = jsonField(q, key);
+      if (v.length() > 0) applyCommandField(key, v);
+    }
+    saveStateToEeprom();
+    applyAndSend();
+    rememberCmdSeq(seq);
+  }
+
+  // 보낸 쪽(서버 명령 소켓)으로 적용 후 상태를 담아 ack
+  String ack = String("{\"op\":\"ack\",\"seq\":") + String(seq) +
+               ",\"id\":\"" + HOST + "\",\"state\":" + stateJson() + "}";
+  udp.beginPacket(udp.remoteIP(), udp.remotePort());
+  udp.write((const uint8_t*)ack.c_str(), ack.length());
+  udp.endPacket();
+  yield();
+}
+
 // ---------------------------
 // Discover 응답
 // ---------------------------
@@ -431,17 +551,26 @@ void handleUdpQuery() {
   int n = udp.parsePacket();
   if (n <= 0) return;
 
-  char buf[96];
-  if (n > 95) n = 95;
+  char buf[192];
+  if (n > 191) n = 191;
   int len = udp.read(buf, n);
+  if (len < 0) len = 0;
   buf[len] = 0;
 
   String q = String(buf);
   q.trim();
+
+  if (q.startsWith("{") && jsonField(q, "op") == "set") {
+    handleUdpCommand(q);
+    return;
+  }
   String qLower = q; qLower.toLowerCase();
   String hostLower = String(HOST); hostLower.toLowerCase();
 
-  bool match = (qLower == "discover" ||
+  // JSON discover ({"op":"discover","http_port":..,"wire":..})는 http_port/wire 협상 포함
+  bool jsonDiscover = q.startsWith("{") && jsonField(q, "op") == "discover";
+  bool match = (jsonDiscover ||
+                qLower == "discover" ||
                 qLower == "whois *" ||
                 qLower == ("whois " + hostLower));
 
@@ -450,6 +579,12 @@ void handleUdpQuery() {
   // 마지막 디스커버 수신 시각 갱신 (SW WDT 피드)
   g_lastDiscoverMs = millis();
 
+  // 서버는 JSON discover 직후 구형 호환용 평문 discover도 보냄: 이미 예약된 푸시의 협상 값을 덮지 않음
+  if (!jsonDiscover && g_statusPushPending && udp.remoteIP() == g_backendIp) {
+    yield();
+    return;
+  }
+
   // 즉시 큰 payload로 응답하지 않고, 약간의 지터 후 상태를 유니캐스트로 푸시
   g_backendIp = udp.remoteIP();
   g_backendPort = udp.remotePort();
@@ -469,6 +604,9 @@ void handleUdpQuery() {
   } else {
     g_backendHttpPort = BACKEND_HTTP_PORT_DEFAULT;
   }
+  // 서버가 받을 수 있는 형식 버전 중 펌웨어가 지원하는 최고 버전 사용 (없으면 JSON)
+  int wire = jsonDiscover ? jsonField(q, "wire").toInt() : 0;
+  g_backendWire = (uint8_t)(wire > 0 ? min(wire, (int)WIRE_VERSION) : 0);
   // 50~300ms 랜덤 지연으로 동시 충돌 완화
   unsigned long jitter = (unsigned long)random(50, 301);
   g_statusPushDueMs = millis() + jitter;
@@ -490,6 +628,7 @@ void setup() {
 
   // 랜덤 지터용 시드 초기화
   randomSeed(ESP.getChipId() ^ micros());
+  g_statusSeq = (uint32_t)random(1, 0x7FFFFFFF);
 
   dht.begin();
   // 부팅 시 저장된 상태 복원 (없으면 현재 기본값을 초기 저장)
@@ -0,0 +1,1012 @@
+#!/usr/bin/env python3
+"""control-server.py 성능 벤치마크
+
+실제 모듈 없이 로컬 대역(stand-in)으로 다음 항목을 측정한다.
+- udp_ingest: discover 응답 패킷 처리량 (_handle_udp_packet)
+- put_status_storm: discover 직후 put_status 폭주 시 초당 처리 요청 수 (동기 반영 / 큐+배치 반영)
+- udp_prefilter: 자기 discover 에코/잡음 패킷 처리 비용 (전처리 켬/끔)
+- wire_ingest: 같은 상태를 JSON / 바이너리 형식으로 받을 때 패킷당 CPU (디코드만, 장치 목록 반영까지)
+- status_N: /devices/status 지연 p50/p99 (장치 100 / 1k / 5k)
+- all_on_fail_X: 일부 장치가 실패할 때 /all/on 완료 시간
+- priority_lanes: 예약 일괄 전송 중 단일 장치 명령 지연 (interactive lane / 같은 lane) 과 lane별 대기 p99
+- scene: 장치마다 다른 명령을 장면 1회 fan-out으로 보낼 때 완료 시간 (장치별 요청 N회 대비)
+- idempotent_retries: 응답 전 /all/on 재시도 3회의 장치 HTTP 요청 수 (Idempotency-Key 없음 / 같은 키)
+- all_on_fail_50_scored: 같은 조건에서 health 점수가 쌓인 뒤 (점수 순 전송, 낮은 점수 장치는 재시도 없음)
+- schedule_tick: 스케줄 평가 1회(1분 tick) 비용
+- schedule_simulate: 스케줄 1000개 1년 dry-run 계산 시간
+- schedules_db: /schedules SQLite 조회/수정 지연
+- status_stale_fallback: 상태 캐시가 오래된 장치가 많고 STATE_HTTP_FALLBACK=1일 때 /devices/status 지연 (요청 안 순차 조회 대비)
+  과 같은 장치 동시 조회 시 실제 HTTP 요청 수 (single-flight)
+- status_serialization: 5k 장치 /devices/status 직렬화 CPU (기존 jsonable_encoder 경로 대비)
+- status_delta: 1k 장치 중 폴링 사이 1%가 바뀔 때 /devices/status?since= 응답 크기/지연 (전체 응답 대비)
+- discovery_adaptive: 적응형 discover의 1시간 시뮬레이션 (고정 주기 대비 broadcast/put_status 수)
+- registry_shm: 공유 메모리 테이블 갱신 비용과 1k 장치 전체 읽기 지연 (registry_shm.py 리더)
+- all_off_udp_lossX: 가상 장치 무리(UDP 응답기)에 대한 UDP 그룹 /all/off 완료 시간과 패킷/HTTP 수 (장치별 HTTP 대비)
+
+결과는 JSON으로 출력하고, 저장된 기준선(baseline)과 비교하여 회귀 시 종료 코드 1을 반환한다.
+
+사용:
+  python bench/bench_server.py                      # 측정 + bench/baseline.json 과 비교
+  python bench/bench_server.py --save-baseline      # 현재 결과를 기준선으로 저장
+  python bench/bench_server.py --quick --out r.json # 짧게 측정 후 파일로 저장
+"""
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import io
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SEED = 4210
+
+
+class BenchTransport:
+    """장치 HTTP 대역 (requests 호환 .get). handler를 바꿔 끼워 벤치마크별 응답을 흉내냄"""
+
+    def __init__(self):
+        self.handler = None
+
+    def get(self, url, params=None, timeout=None):
+        if self.handler is None:
+            raise ConnectionError("no bench transport handler")
+        return self.handler(url, params=params, timeout=timeout)
+
+
+def load_server(work_dir: str):
+    """앱 팩토리로 백그라운드 작업 없는 서버 인스턴스를 만들고 그 모듈을 반환 (lifespan은 실행하지 않음)
+    액션 로그/DB/스냅샷 등 파일은 모두 work_dir 아래에 기록 (저장소의 logs/ 등을 건드리지 않음)"""
+    from aircon_server import ServerConfig, create_app
+    with contextlib.redirect_stdout(io.StringIO()):
+        config = ServerConfig(
+            udp_listener=False, scheduler=False, time_sync=False, mdns=False,
+            registry_snapshot=False, static_watch=False, transport=BenchTransport(),
+            action_log_path=os.path.join(work_dir, "logs", "actions.log"),
+            db_path=os.path.join(work_dir, "schedules.db"),
+            snapshot_path=os.path.join(work_dir, "registry.json"),
+            pending_commands_path=os.path.join(work_dir, "pending-commands.json"),
+        )
+        app = create_app(config)
+    return app.state.server
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def timed_samples(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def make_fleet(srv, count: int, with_state: bool = True):
+    """가상 장치 count개로 registry를 채움"""
+    now = time.time()
+    fleet = {}
+    for i in range(count):
+        dev_id = f"sim-{i:05d}"
+        entry = {
+            "id": dev_id,
+            "ip": f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+            "port": 80,
+            "last_seen": now - random.uniform(0, 60),
+        }
+        if with_state:
+            entry["state"] = {
+                "power": random.random() < 0.5,
+                "mode": random.choice(["cool", "hot"]),
+                "temp": random.randint(18, 28),
+                "fan": "mid",
+                "swing": "off",
+                "room_temp": round(random.uniform(20, 30), 1),
+            }
+            entry["state_last_seen"] = entry["last_seen"]
+        fleet[dev_id] = entry
+    with srv.devices_lock:
+        srv.devices.clear()
+        srv.devices.update(fleet)
+    srv.health_scores.clear()
+
+
+# ========================
+# 개별 벤치마크
+# ========================
+def bench_udp_ingest(srv, quick: bool) -> dict:
+    count = 5000 if quick else 50000
+    fleet_size = 1000
+    packets = []
+    for i in range(count):
+        dev = i % fleet_size
+        msg = {
+            "id": f"sim-{dev:05d}",
+            "ip": f"10.0.{dev >> 8}.{dev & 255}",
+            "port": 80,
+            "state": {"power": bool(i & 1), "mode": "cool", "temp": 24, "fan": "mid", "swing": "off"},
+        }
+        packets.append((json.dumps(msg).encode("utf-8"), (msg["ip"], 4210)))
+    with srv.devices_lock:
+        srv.devices.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        for data, addr in packets:
+            srv._handle_udp_packet(data, addr)
+        elapsed = time.perf_counter() - t0
+    return {
+        "packets": count,
+        "elapsed_sec": elapsed,
+        "packets_per_sec": count / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+class _BenchRequest:
+    """ingest_status에 넘길 최소 요청 대역 (본문과 클라이언트 주소만)"""
+    method = "POST"
+
+    def __init__(self, body: bytes, host: str):
+        self._body = body
+        self.client = types.SimpleNamespace(host=host)
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+def bench_put_status_storm(srv, quick: bool) -> dict:
+    """장치 300대가 discover마다 1회씩 put_status. 같은 이벤트 루프에서 연속 처리할 때의 초당 요청 수
+    다른 스레드가 10ms마다 devices_lock을 2ms씩 잡는 상태 (대형 장치 목록의 스냅샷 저장/상태 조회 흉내)
+    queued: 202 응답까지, drained: 큐가 비어 장치 목록에 모두 반영될 때까지. p99_ms는 요청 1건 처리 지연"""
+    fleet_size = 300
+    rounds = 5 if quick else 30
+    bodies = []
+    for r in range(rounds):
+        for dev in range(fleet_size):
+            msg = {
+                "id": f"sim-{dev:05d}",
+                "ip": f"10.0.{dev >> 8}.{dev & 255}",
+                "port": 80,
+                "state": {"power": bool((dev + r) & 1), "mode": "cool", "temp": 24, "fan": "auto", "swing": False},
+            }
+            bodies.append((json.dumps(msg).encode("utf-8"), msg["ip"]))
+    count = len(bodies)
+
+    latencies: list[float] = []
+
+    async def storm():
+        for body, host in bodies:
+            t0 = time.perf_counter()
+            await srv.ingest_status(_BenchRequest(body, host), types.SimpleNamespace(status_code=202))
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    stop = threading.Event()
+
+    def hold_lock():
+        while not stop.wait(0.008):
+            with srv.devices_lock:
+                time.sleep(0.002)
+
+    result = {"requests": count}
+    saved = srv.INGEST_QUEUE_ENABLED
+    poller = threading.Thread(target=hold_lock, daemon=True)
+    try:
+        with srv.devices_lock:
+            srv.devices.clear()
+        poller.start()
+        for label, enabled in (("sync", False), ("queued", True)):
+            srv.INGEST_QUEUE_ENABLED = enabled
+            applied_before = srv.ingest_stats["applied"]
+            del latencies[:]
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                asyncio.run(storm())
+                accepted = time.perf_counter() - t0
+                # 마지막 배치 반영까지 대기
+                deadline = time.monotonic() + 10.0
+                while srv.ingest_stats["applied"] - applied_before < count and time.monotonic() < deadline:
+                    time.sleep(0.001)
+                drained = time.perf_counter() - t0
+            result[f"{label}_req_per_sec"] = count / accepted if accepted > 0 else 0.0
+            result[f"{label}_p99_ms"] = percentile(latencies, 99)
+            result[f"{label}_max_ms"] = max(latencies)
+            if enabled:
+                result["drained_req_per_sec"] = count / drained if drained > 0 else 0.0
+    finally:
+        stop.set()
+        poller.join()
+        srv.INGEST_QUEUE_ENABLED = saved
+    result["max_batch"] = srv.ingest_stats["max_batch"]
+    return result
+
+
+def bench_udp_prefilter(srv, quick: bool) -> dict:
+    """응답이 아닌 패킷(자기 discover 에코, 평문 discover, 다른 시스템의 잡음)만 흘려 패킷당 비용 비교"""
+    count = 6000 if quick else 60000
+    own_ip = "10.9.0.1"
+    junk = [
+        (srv._discover_payloads()[0], (own_ip, 4210)),
+        (b"discover", (own_ip, 4210)),
+        (b"M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\nMAN: \"ssdp:discover\"\r\n\r\n", ("10.9.0.77", 4210)),
+        (b'{"op":"discover","http_port":8001,"wire":1}', ("10.9.0.50", 4210)),
+        (b"x" * 1500, ("10.9.0.78", 4210)),
+        (b'{"id":"sim-00001","ip":"10.9.0.20","port":80}', (own_ip, 4210)),
+    ]
+    packets = [junk[i % len(junk)] for i in range(count)]
+    saved = (srv.UDP_PREFILTER_ENABLED, srv.udp_own_ips)
+    srv.udp_own_ips = frozenset([own_ip])
+    timings = {}
+    try:
+        for enabled in (False, True):
+            srv.UDP_PREFILTER_ENABLED = enabled
+            with srv.devices_lock:
+                srv.devices.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                for data, addr in packets:
+                    srv._handle_udp_packet(data, addr)
+                timings[enabled] = (time.perf_counter() - t0) * 1e6 / count
+            registered = len(srv.devices)
+    finally:
+        srv.UDP_PREFILTER_ENABLED, srv.udp_own_ips = saved
+    return {
+        "packets": count,
+        "unfiltered_us": timings[False],
+        "filtered_us": timings[True],
+        "registered_after_filter": registered,
+        "drops": dict(srv.udp_drop_stats),
+    }
+
+
+def bench_wire_ingest(srv, quick: bool) -> dict:
+    count = 5000 if quick else 50000
+    fleet_size = 1000
+    json_packets = []
+    wire_packets = []
+    for i in range(count):
+        dev = i % fleet_size
+        dev_id = f"sim-{dev:05d}"
+        ip = f"10.0.{dev >> 8}.{dev & 255}"
+        state = {"power": bool(i & 1), "mode": "cool", "temp": 24, "fan": "medium", "swing": False, "room_temp": 26.5}
+        msg = {"id": dev_id, "ip": ip, "port": 80, "udp_port": 4210, "state": state}
+        json_packets.append((json.dumps(msg).encode("utf-8"), (ip, 4210)))
+        wire_packets.append((srv.encode_wire_status(dev_id, ip, 80, state, i, udp_port=4210), (ip, 4210)))
+
+    def decode_json():
+        for data, _ in json_packets:
+            msg = json.loads(data.decode("utf-8").strip())
+            (msg.get("id"), msg.get("ip"), int(msg.get("port", 80)), msg.get("udp_port"), msg.get("state"))
+
+    def decode_wire():
+        for data, _ in wire_packets:
+            srv.decode_wire_status(data)
+
+    def ingest(packets):
+        with srv.devices_lock:
+            srv.devices.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            for data, addr in packets:
+                srv._handle_udp_packet(data, addr)
+            return time.perf_counter() - t0
+
+    per_packet = lambda fn: min(timed_samples(fn, 3)) * 1000.0 / count   # ms -> µs
+    decode_json_us = per_packet(decode_json)
+    decode_wire_us = per_packet(decode_wire)
+    json_us = ingest(json_packets) * 1e6 / count
+    wire_us = ingest(wire_packets) * 1e6 / count
+    return {
+        "packets": count,
+        "json_bytes": sum(len(d) for d, _ in json_packets) // count,
+        "wire_bytes": sum(len(d) for d, _ in wire_packets) // count,
+        "decode_json_us": decode_json_us,
+        "decode_wire_us": decode_wire_us,
+        "ingest_json_us": json_us,
+        "ingest_wire_us": wire_us,
+        "saved_pct": round(100.0 * (1.0 - wire_us / json_us), 1) if json_us > 0 else 0.0,
+    }
+
+
+def bench_status(srv, count: int, quick: bool) -> dict:
+    make_fleet(srv, count)
+    repeat = 20 if quick else (200 if count <= 1000 else 50)
+    samples = timed_samples(srv.get_all_status, repeat)
+    return {
+        "devices": count,
+        "repeat": repeat,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def bench_status_stale_fallback(srv, quick: bool) -> dict:
+    """HTTP 대역: /ac/state가 5ms 후 응답. 모든 장치의 상태 캐시가 오래된 상태에서 /devices/status 반복"""
+    count = 100 if quick else 400
+    make_fleet(srv, count)
+    now = time.time()
+    with srv.devices_lock:
+        for dev in srv.devices.values():
+            dev["last_seen"] = now
+            dev["state_last_seen"] = now - 3600
+
+    class _Resp:
+        ok = True
+        status_code = 200
+
+        def json(self):
+            return {"power": True, "mode": "cool", "temp": 24, "fan": "auto", "swing": False}
+
+    http_calls = [0]
+
+    def fake_get(url, params=None, timeout=None):
+        http_calls[0] += 1
+        time.sleep(0.005)
+        return _Resp()
+
+    saved = srv.tuning
+    saved_interval = srv.STATE_REFRESH_MIN_INTERVAL_SEC
+    srv.http_transport.handler = fake_get
+    srv.tuning = dataclasses.replace(saved, state_http_fallback=True)
+    srv.STATE_REFRESH_MIN_INTERVAL_SEC = 3600.0
+    try:
+        # 기존 방식: 요청 안에서 장치마다 순차 HTTP 조회
+        t0 = time.perf_counter()
+        for dev in list(srv.devices.values()):
+            srv.get_device_state(dev)
+        serial_ms = (time.perf_counter() - t0) * 1000.0
+        http_calls[0] = 0
+        samples = timed_samples(srv.get_all_status, 10 if quick else 50)
+        deadline = time.time() + 10
+        while srv._state_flights and time.time() < deadline:
+            time.sleep(0.005)
+        refreshed = sum(1 for d in srv.devices.values() if time.time() - d["state_last_seen"] < 60)
+        # 같은 장치를 스레드 16개가 동시에 max_age=0으로 조회
+        target = next(iter(srv.devices.values()))
+        before = http_calls[0]
+        threads = [threading.Thread(target=srv.read_device_state, args=(target, 0)) for _ in range(16)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        coalesced_calls = http_calls[0] - before
+    finally:
+        srv.http_transport.handler = None
+        srv.tuning = saved
+        srv.STATE_REFRESH_MIN_INTERVAL_SEC = saved_interval
+    return {
+        "devices": count,
+        "serial_fallback_ms": serial_ms,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+        "refreshed_devices": refreshed,
+        "background_http_calls": http_calls[0] - coalesced_calls,
+        "concurrent_reads": len(threads),
+        "concurrent_http_calls": coalesced_calls,
+    }
+
+
+def bench_all_on(srv, fail_ratio: float, quick: bool, scored: bool = False) -> dict:
+    """HTTP 대역: 정상 장치는 5ms 후 200, 실패 장치는 20ms 후 연결 오류
+    scored=True면 한 번 미리 보내 health 점수를 쌓은 뒤 측정 (실패 장치는 뒤로, 재시도 없이 1회)"""
+    count = 32 if quick else 128
+    make_fleet(srv, count)
+    failing = set(random.sample(sorted(srv.devices.keys()), int(count * fail_ratio)))
+    failing_ips = {srv.devices[d]["ip"] for d in failing}
+
+    class _Resp:
+        ok = True
+        status_code = 200
+
+    def fake_get(url, params=None, timeout=None):
+        host = url.split("//", 1)[1].split(":", 1)[0]
+        if host in failing_ips:
+            time.sleep(0.02)
+            raise ConnectionError("simulated failure")
+        time.sleep(0.005)
+        return _Resp()
+
+    saved = srv.tuning
+    srv.http_transport.handler = fake_get
+    srv.tuning = dataclasses.replace(saved, ac_send_interval_sec=0.01, ac_retry_jitter_ms=0)
+    try:
+        if scored:
+            srv.all_on(None)
+        t0 = time.perf_counter()
+        result = srv.all_on(None)
+        elapsed = time.perf_counter() - t0
+    finally:
+        srv.http_transport.handler = None
+        srv.tuning = saved
+    ok_cnt = sum(1 for v in result.get("results", {}).values() if v.get("ok"))
+    return {
+        "devices": count,
+        "fail_ratio": fail_ratio,
+        "succeeded": ok_cnt,
+        "elapsed_sec": elapsed,
+    }
+
+
+def bench_priority_lanes(srv, quick: bool) -> dict:
+    """HTTP 대역: 모든 장치 30ms 응답. 예약 lane의 /all/on 진행 중에 장치 1대 단일 명령 지연
+    (interactive lane vs 같은 schedule lane에 넣었을 때)"""
+    count = 64 if quick else 256
+    make_fleet(srv, count)
+
+    class _Resp:
+        ok = True
+        status_code = 200
+
+    def fake_get(url, params=None, timeout=None):
+        time.sleep(0.03)
+        return _Resp()
+
+    def _measure(lane: str) -> float:
+        bulk = threading.Thread(target=lambda: srv._schedule_send_off())
+        bulk.start()
+        time.sleep(0.05)
+        target = srv.devices[f"sim-{count - 1:05d}"]
+        t0 = time.perf_counter()
+        srv.dispatch_command(target, {"power": "on"}, lane=lane).result()
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        bulk.join()
+        return elapsed
+
+    saved = srv.tuning
+    srv.http_transport.handler = fake_get
+    srv.tuning = dataclasses.replace(saved, all_cmd_per_device_timeout_sec=60.0)
+    try:
+        same_lane_ms = _measure("schedule")
+        interactive_ms = _measure("interactive")
+        lanes = srv.dispatch_status()["lanes"]
+    finally:
+        srv.http_transport.handler = None
+        srv.tuning = saved
+    return {
+        "devices": count,
+        "schedule_limit": lanes["schedule"]["limit"],
+        "interactive_ms": interactive_ms,
+        "same_lane_ms": same_lane_ms,
+        "schedule_wait_p99_ms": lanes["schedule"]["wait_ms"]["p99"],
+        "interactive_wait_p99_ms": lanes["interactive"]["wait_ms"]["p99"],
+    }
+
+
+def bench_scene(srv, quick: bool) -> dict:
+    """HTTP 대역: 모든 장치 5ms 응답. 장치마다 다른 온도를 장면 1회로 보낼 때와 장치별 /devices/control 요청 N회 비교"""
+    count = 32 if quick else 128
+    make_fleet(srv, count)
+    commands = {"devices": {dev_id: {"power": "on", "temp": 18 + i % 10} for i, dev_id in enumerate(sorted(srv.devices))}, "groups": {}}
+
+    class _Resp:
+        ok = True
+        status_code = 200
+
+    def fake_get(url, params=None, timeout=None):
+        time.sleep(0.005)
+        return _Resp()
+
+    saved = srv.tuning
+    srv.http_transport.handler = fake_get
+    srv.tuning = dataclasses.replace(saved, all_cmd_per_device_timeout_sec=60.0)
+    try:
+        t0 = time.perf_counter()
+        for dev_id, params in commands["devices"].items():
+            srv._execute_batch_command([dev_id], params)
+        per_request = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        result = srv.execute_scene(commands, "bench")
+        elapsed = time.perf_counter() - t0
+    finally:
+        srv.http_transport.handler = None
+        srv.tuning = saved
+    return {
+        "devices": count,
+        "succeeded": result["summary"]["succeeded"],
+        "elapsed_sec": elapsed,
+        "per_request_elapsed": per_request,
+    }
+
+
+def bench_idempotent_retries(srv, quick: bool) -> dict:
+    """HTTP 대역: 모든 장치 50ms 응답. 클라이언트가 응답 전에 /all/on을 3번 재시도할 때 장치 HTTP 요청 수 (키 없음 / 같은 키)"""
+    count = 16 if quick else 64
+    make_fleet(srv, count)
+    http_calls = [0]
+
+    class _Resp:
+        ok = True
+        status_code = 200
+
+    def fake_get(url, params=None, timeout=None):
+        http_calls[0] += 1
+        time.sleep(0.05)
+        return _Resp()
+
+    def _storm(key):
+        threads = []
+        for _ in range(3):
+            th = threading.Thread(target=srv.all_on_endpoint, args=(types.SimpleNamespace(headers={}), None, None, key))
+            th.start()
+            threads.append(th)
+            time.sleep(0.01)
+        for th in threads:
+            th.join()
+        calls, http_calls[0] = http_calls[0], 0
+        return calls
+
+    saved_state = srv.lifecycle["state"]
+    srv.http_transport.handler = fake_get
+    srv.lifecycle["state"] = "running"
+    try:
+        without_key = _storm(None)
+        t0 = time.perf_counter()
+        with_key = _storm(f"bench-{time.time()}")
+        elapsed = time.perf_counter() - t0
+    finally:
+        srv.http_transport.handler = None
+        srv.lifecycle["state"] = saved_state
+    return {
+        "devices": count,
+        "retries": 3,
+        "http_requests_without_key": without_key,
+        "http_requests_with_key": with_key,
+        "elapsed_sec": elapsed,
+    }
+
+
+class SimFleet:
+    """UDP 명령을 받는 가상 장치 무리. 소켓 1개가 장치 여러 대를 흉내냄 (브로드캐스트 1패킷 = 모든 장치 수신)
+    deaf에 든 장치는 ack하지 않음 (UDP 유실/구형 펌웨어 → HTTP fallback 경로)
+    """
+
+    def __init__(self, ids: list[str], deaf: set[str]):
+        self.ids = ids
+        self.deaf = deaf
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.packets = 0
+        self.applied: dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            self.packets += 1
+            msg = json.loads(data)
+            if msg.get("op") != "set":
+                continue
+            targets = self.ids if msg.get("to") == "*" else [msg.get("to")]
+            for dev_id in targets:
+                if dev_id not in self.ids or dev_id in self.deaf:
+                    continue
+                # 장치는 seq가 바뀔 때만 적용 (재전송은 ack만)
+                self.applied[dev_id] = msg["seq"]
+                ack = {"op": "ack", "seq": msg["seq"], "id": dev_id, "state": {"power": msg.get("power") == "on"}}
+                self.sock.sendto(json.dumps(ack).encode("utf-8"), addr)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+
+def bench_all_off_udp(srv, loss_ratio: float, quick: bool) -> dict:
+    """장치 300대(quick 100대) 중 loss_ratio 만큼은 UDP 무응답. HTTP 대역은 5ms 후 200.
+    같은 장치 목록으로 장치별 HTTP /all/off와 UDP 그룹 /all/off를 비교"""
+    count = 100 if quick else 300
+    make_fleet(srv, count)
+    ids = sorted(srv.devices.keys())
+    deaf = set(random.sample(ids, int(count * loss_ratio)))
+    fleet = SimFleet(ids, deaf)
+    with srv.devices_lock:
+        for dev in srv.devices.values():
+            dev["ip"] = "127.0.0.1"
+            dev["udp_port"] = fleet.port
+    http_calls = []
+
+    class _Resp:
+        ok = True
+        status_code = 200
+
+    def fake_get(url, params=None, timeout=None):
+        http_calls.append(url)
+        time.sleep(0.005)
+        return _Resp()
+
+    saved = (srv.UDP_COMMANDS_ENABLED, srv.UDP_CMD_GROUP_ADDRS, srv.UDP_CMD_GROUP_WAIT_SEC, srv.UDP_CMD_ACK_TIMEOUT_SEC)
+    srv.http_transport.handler = fake_get
+    srv.UDP_CMD_GROUP_ADDRS = f"127.0.0.1:{fleet.port}"
+    srv.UDP_CMD_GROUP_WAIT_SEC = 0.05
+    srv.UDP_CMD_ACK_TIMEOUT_SEC = 0.01
+    try:
+        srv.UDP_COMMANDS_ENABLED = False
+        t0 = time.perf_counter()
+        srv.all_off()
+        http_elapsed = time.perf_counter() - t0
+        http_only_calls = len(http_calls)
+        del http_calls[:]
+
+        srv.UDP_COMMANDS_ENABLED = True
+        t0 = time.perf_counter()
+        result = srv.all_off()
+        elapsed = time.perf_counter() - t0
+    finally:
+        srv.http_transport.handler = None
+        srv.UDP_COMMANDS_ENABLED, srv.UDP_CMD_GROUP_ADDRS, srv.UDP_CMD_GROUP_WAIT_SEC, srv.UDP_CMD_ACK_TIMEOUT_SEC = saved
+        fleet.close()
+    via: dict[str, int] = {}
+    for v in result.get("results", {}).values():
+        if v.get("ok"):
+            via[v.get("via", "http")] = via.get(v.get("via", "http"), 0) + 1
+    return {
+        "devices": count,
+        "loss_ratio": loss_ratio,
+        "succeeded": sum(via.values()),
+        "via_udp_group": via.get("udp_group", 0),
+        "via_http": via.get("http", 0),
+        "udp_packets_received": fleet.packets,
+        "http_requests": len(http_calls),
+        "http_requests_http_only": http_only_calls,
+        "http_only_elapsed": http_elapsed,
+        "elapsed_sec": elapsed,
+    }
+
+
+def bench_status_serialization(srv, quick: bool) -> dict:
+    """기존 경로(dict 목록 -> jsonable_encoder -> json.dumps)와 조각 캐시 경로의 CPU 시간 비교"""
+    from fastapi.encoders import jsonable_encoder
+
+    make_fleet(srv, 5000)
+    repeat = 5 if quick else 30
+
+    def legacy():
+        json.dumps(jsonable_encoder(srv.build_status_list()), ensure_ascii=False, allow_nan=False,
+                   separators=(",", ":")).encode("utf-8")
+
+    def cpu_ms(fn) -> list[float]:
+        samples = []
+        for _ in range(repeat):
+            t0 = time.process_time()
+            fn()
+            samples.append((time.process_time() - t0) * 1000.0)
+        return samples
+
+    legacy_samples = cpu_ms(legacy)
+    srv._status_fragments.clear()
+    t0 = time.process_time()
+    srv.build_status_payload()
+    cold_ms = (time.process_time() - t0) * 1000.0
+    fast_samples = cpu_ms(srv.build_status_payload)
+    legacy_p50 = percentile(legacy_samples, 50)
+    fast_p50 = percentile(fast_samples, 50)
+    return {
+        "devices": 5000,
+        "orjson": bool(srv.ORJSON_AVAILABLE),
+        "legacy_cpu_p50_ms": legacy_p50,
+        "cached_cold_cpu_ms": cold_ms,
+        "cached_cpu_p50_ms": fast_p50,
+        "speedup": legacy_p50 / fast_p50 if fast_p50 > 0 else 0.0,
+    }
+
+
+def bench_status_delta(srv, quick: bool) -> dict:
+    """웹 UI 폴링 흉내: 매 폴링 사이 장치 10대 상태가 바뀜. 전체 응답과 since= 델타 응답 비교"""
+    count = 1000
+    make_fleet(srv, count)
+    now = time.time()
+    with srv.devices_lock:
+        for i, dev in enumerate(srv.devices.values()):
+            dev["last_seen"] = now
+            dev["state_last_seen"] = now
+            dev["rev"] = i + 1
+        srv.registry_version = count
+    devs = list(srv.devices.values())
+    polls = 20 if quick else 200
+    full_bytes, delta_bytes, full_ms, delta_ms = [], [], [], []
+    for _ in range(polls):
+        since = srv.registry_version
+        with srv.devices_lock:
+            for dev in random.sample(devs, 10):
+                dev["state"] = {**dev["state"], "room_temp": round(random.uniform(20, 30), 1)}
+                srv.registry_version += 1
+                dev["rev"] = srv.registry_version
+        t0 = time.perf_counter()
+        body = srv.build_status_payload()
+        full_ms.append((time.perf_counter() - t0) * 1000.0)
+        full_bytes.append(len(body))
+        t0 = time.perf_counter()
+        body = srv.build_status_delta(since)
+        delta_ms.append((time.perf_counter() - t0) * 1000.0)
+        delta_bytes.append(len(body))
+    delta = json.loads(body)
+    return {
+        "devices": count,
+        "changed_per_poll": len(delta["changed"]),
+        "full_bytes": int(percentile(full_bytes, 50)),
+        "delta_bytes": int(percentile(delta_bytes, 50)),
+        "full_p50_ms": percentile(full_ms, 50),
+        "delta_p50_ms": percentile(delta_ms, 50),
+    }
+
+
+def _synthetic_schedules(count: int) -> list[dict]:
+    items = []
+    for i in range(count):
+        st = ("once", "daily", "weekly")[i % 3]
+        items.append({
+            "id": i + 1,
+            "enabled": True,
+            "power": "on",
+            "mode": "cool",
+            "temp": 24,
+            "schedule_type": st,
+            "date": "2026-07-01" if st == "once" else None,
+            "start_date": "2026-06-01" if st != "weekly" else None,
+            "end_date": "2026-09-30" if st != "weekly" else None,
+            "weekday": i % 7 if st == "weekly" else None,
+            "start_time_min": (i * 7) % 1440,
+            "end_time_min": (i * 7 + 480) % 1440,
+        })
+    return items
+
+
+def bench_schedule_tick(srv, quick: bool) -> dict:
+    schedules = _synthetic_schedules(1000)
+    ticks = 200 if quick else 1440
+    start = datetime(2026, 7, 1, 0, 0)
+    grace = timedelta(seconds=srv.SCHEDULE_GRACE_SEC)
+    samples = []
+    for m in range(ticks):
+        now = start.replace(hour=(m // 60) % 24, minute=m % 60)
+        t0 = time.perf_counter()
+        # 스케줄러 루프가 매 평가에서 호출하는 것과 같은 경로 (schedule_last_sent는 비어 있어 매번 전체 평가)
+        srv._select_due_events(schedules, now - grace, now)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "schedules": len(schedules),
+        "ticks": ticks,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def bench_schedule_simulate(srv, quick: bool) -> dict:
+    schedules = _synthetic_schedules(1000)
+    start = datetime(2026, 1, 1)
+    end = start.replace(year=2027)
+    samples = timed_samples(lambda: srv.simulate_schedules(schedules, start, end, 1000), 3 if quick else 20)
+    return {
+        "schedules": len(schedules),
+        "days": (end - start).days,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def bench_schedules_db(srv, quick: bool) -> dict:
+    repeat = 50 if quick else 500
+    saved = srv.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        srv.DB_PATH = os.path.join(tmp, "schedules.db")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                srv.init_db()
+            list_samples = timed_samples(srv.list_schedules, repeat)
+            upd = srv.ScheduleUpdate(enabled=False, temp=25)
+            update_samples = timed_samples(lambda: srv.update_schedule(3, upd), repeat)
+            enabled_samples = timed_samples(srv.get_enabled_schedules, repeat)
+        finally:
+            srv.DB_PATH = saved
+    return {
+        "repeat": repeat,
+        "list_p50_ms": percentile(list_samples, 50),
+        "list_p99_ms": percentile(list_samples, 99),
+        "update_p50_ms": percentile(update_samples, 50),
+        "update_p99_ms": percentile(update_samples, 99),
+        "enabled_p50_ms": percentile(enabled_samples, 50),
+    }
+
+
+def bench_discovery_adaptive(srv, quick: bool) -> dict:
+    """300대 장치, 1시간: 20분에 1대 이탈, 40분에 1대 추가. 모든 응답은 discover 직후 도착"""
+    fleet = [f"sim-{i:05d}" for i in range(300)]
+    duration = 3600.0
+    state = {
+        "round": 0, "interval_sec": srv.tuning.discovery_min_interval_sec, "stable_rounds": 0,
+        "known_ids": set(), "last_round_at": 0.0, "next_round_at": 0.0, "started_at": None, "last_plan": None,
+    }
+    t0 = 1_000_000.0
+    now = t0
+    last_seen: dict[str, float] = {}
+    put_status = 0
+    unicast = 0
+    while now - t0 < duration:
+        plan = srv.plan_discovery_round(state, now, dict(last_seen))
+        unicast += len(plan["missing"])
+        elapsed = now - t0
+        for dev_id in fleet:
+            if dev_id == "sim-00007" and elapsed >= 1200:
+                continue
+            last_seen[dev_id] = now + 0.1
+            put_status += 1
+        if elapsed >= 2400 and "sim-new" not in last_seen:
+            fleet.append("sim-new")
+        now += plan["interval_sec"]
+    report = srv.discovery_load_report(state, now)
+    fixed_put_status = report["fixed_rounds"] * 300
+    return {
+        "broadcast_rounds": report["rounds"],
+        "fixed_rounds": report["fixed_rounds"],
+        "put_status": put_status,
+        "fixed_put_status": fixed_put_status,
+        "unicast_discovers": unicast,
+        "reduction_pct": report["reduction_pct"],
+    }
+
+
+def bench_registry_shm(srv, quick: bool) -> dict:
+    sys.path.insert(0, ROOT)
+    import registry_shm
+
+    make_fleet(srv, 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "registry")
+        with contextlib.redirect_stdout(io.StringIO()):
+            srv.open_registry_table(path=path, capacity=2048)
+        devs = list(srv.devices.values())
+        count = 2000 if quick else 20000
+        t0 = time.perf_counter()
+        with srv.devices_lock:
+            for i in range(count):
+                srv._shm_publish(devs[i % len(devs)])
+        publish_us = (time.perf_counter() - t0) / count * 1e6
+        with registry_shm.RegistryTable(path) as table:
+            samples = timed_samples(table.read_all, 10 if quick else 100)
+            get_samples = timed_samples(lambda: table.get("sim-00999"), 20 if quick else 200)
+        srv._shm_map = None
+    return {
+        "devices": len(devs),
+        "publish_us": publish_us,
+        "read_all_p50_ms": percentile(samples, 50),
+        "get_p50_ms": percentile(get_samples, 50),
+    }
+
+
+def run_all(quick: bool) -> dict:
+    random.seed(SEED)
+    with tempfile.TemporaryDirectory() as work_dir:
+        srv = load_server(work_dir)
+        results = run_benches(srv, quick)
+        # 임시 디렉터리 삭제 전에 액션 로그 파일 닫기 (Windows는 열린 파일을 지울 수 없음)
+        if srv.action_logger is not None:
+            for handler in list(srv.action_logger.handlers):
+                handler.close()
+                srv.action_logger.removeHandler(handler)
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def run_benches(srv, quick: bool) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    results["udp_ingest"] = bench_udp_ingest(srv, quick)
+    results["wire_ingest"] = bench_wire_ingest(srv, quick)
+    results["udp_prefilter"] = bench_udp_prefilter(srv, quick)
+    results["put_status_storm"] = bench_put_status_storm(srv, quick)
+    for n in (100, 1000, 5000):
+        results[f"status_{n}"] = bench_status(srv, n, quick)
+    results["status_serialization"] = bench_status_serialization(srv, quick)
+    results["status_delta"] = bench_status_delta(srv, quick)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["status_stale_fallback"] = bench_status_stale_fallback(srv, quick)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ratio in (0.0, 0.1, 0.5):
+            results[f"all_on_fail_{int(ratio * 100)}"] = bench_all_on(srv, ratio, quick)
+        results["all_on_fail_50_scored"] = bench_all_on(srv, 0.5, quick, scored=True)
+        results["priority_lanes"] = bench_priority_lanes(srv, quick)
+        results["scene"] = bench_scene(srv, quick)
+        results["idempotent_retries"] = bench_idempotent_retries(srv, quick)
+        for ratio in (0.0, 0.1):
+            results[f"all_off_udp_loss{int(ratio * 100)}"] = bench_all_off_udp(srv, ratio, quick)
+    results["schedule_tick"] = bench_schedule_tick(srv, quick)
+    results["schedule_simulate"] = bench_schedule_simulate(srv, quick)
+    results["schedules_db"] = bench_schedules_db(srv, quick)
+    results["discovery_adaptive"] = bench_discovery_adaptive(srv, quick)
+    results["registry_shm"] = bench_registry_shm(srv, quick)
+    return results
+
+
+# ========================
+# 기준선 비교
+# ========================
+def _metric_direction(name: str) -> int:
+    """1: 클수록 좋음, -1: 작을수록 좋음, 0: 비교 대상 아님"""
+    if name.endswith("_per_sec"):
+        return 1
+    if name.endswith("_ms") or name.endswith("_us") or name == "elapsed_sec":
+        return -1
+    return 0
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    regressions = []
+    for bench, metrics in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(bench)
+        if not base:
+            continue
+        for name, value in metrics.items():
+            direction = _metric_direction(name)
+            ref = base.get(name)
+            if direction == 0 or not isinstance(ref, (int, float)) or ref <= 0:
+                continue
+            ratio = value / ref
+            worse = ratio < (1.0 - tolerance) if direction > 0 else ratio > (1.0 + tolerance)
+            if worse:
+                regressions.append({"bench": bench, "metric": name, "baseline": ref, "current": value, "ratio": ratio})
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="control-server.py 벤치마크")
+    parser.add_argument("--quick", action="store_true", help="반복 횟수를 줄여 빠르게 측정")
+    parser.add_argument("--out", help="결과 JSON 저장 경로 (기본: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="비교할 기준선 JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="현재 결과를 기준선으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="허용 회귀 비율 (기본 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = run_all(args.quick)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] baseline saved: {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    regressions = report.get("regressions") or []
+    for r in regressions:
+        print(f"[Bench] REGRESSION {r['bench']}.{r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} (x{r['ratio']:.2f})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,67 +3,280 @@ import sys
 import threading
 import socket
 import json
+import ipaddress
+import re
 import time
+_STARTUP_T0 = time.perf_counter()  # 시작 시간 분석 기준 (표준 라이브러리 이후 import 포함)
 import random
 from typing import Dict, Any
+import asyncio
+import collections
 import concurrent.futures
+import contextlib
+import gzip
+import hashlib
+import contextvars
+import dataclasses
+import heapq
+import importlib.util
+import itertools
 import logging
+import mmap
+import multiprocessing
+import signal
+import socketserver
+import struct
+import tempfile
 
 import requests
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, Response
 from pydantic import BaseModel
 import uvicorn
 import os
 import subprocess
 import platform
+import queue
 import shutil
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from logging.handlers import RotatingFileHandler
+from aircon_server.config import ServerConfig
+from registry_shm import (
+    SHM_BODY, SHM_COUNT, SHM_COUNT_OFFSET, SHM_FLAG_STATE, SHM_FLAG_SWING, SHM_FLAG_UNVERIFIED, SHM_FLAG_USED,
+    SHM_HEADER, SHM_HEADER_SIZE, SHM_LAYOUT_VERSION, SHM_MAGIC, SHM_NO_TEMP, SHM_RECORD_SIZE, SHM_SEQ,
+    SHM_VERSION, SHM_VERSION_OFFSET,
+)
+
+# 선택: 인터페이스/서브넷 열거 (없으면 ip/ifconfig 출력 파싱). 시작 시간을 줄이려고 사용 시점에 import
+PSUTIL_AVAILABLE = importlib.util.find_spec("psutil") is not None
+
+try:
+    import orjson  # 선택: 대량 응답 직렬화 가속 (없으면 표준 json 사용)
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 try:
-    from zeroconf import ServiceInfo, Zeroconf
-    from zeroconf._exceptions import NonUniqueNameException
-    ZEROCONF_AVAILABLE = True
+    import brotli  # 선택: 정적 파일 brotli 사전 압축 (없으면 gzip만 사용)
+    BROTLI_AVAILABLE = True
 except ImportError:
-    ZEROCONF_AVAILABLE = False
-    NonUniqueNameException = None
-    print("[경고] zeroconf가 설치되지 않았습니다. mDNS 기능을 사용할 수 없습니다.")
-    print("      설치: pip install zeroconf")
+    BROTLI_AVAILABLE = False
+
+try:
+    import fcntl  # 멀티 프로세스 모드의 리더 선출(flock). Windows에는 없음
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# mDNS(zeroconf)는 import 비용이 커서 등록 시점(백그라운드)에 import. 미설치 안내도 등록 시점에 출력
+ZEROCONF_AVAILABLE = importlib.util.find_spec("zeroconf") is not None
+
+_STARTUP_IMPORTS_MS = round((time.perf_counter() - _STARTUP_T0) * 1000.0, 1)
 
 # ========================
 # 설정
 # ========================
 UDP_LISTEN_IP = ""           # 모든 인터페이스
-UDP_LISTEN_PORT = 4210       # ESP8266과 동일
-DEVICE_TIMEOUT_SEC = 60 * 5  # 5분
+UDP_LISTEN_PORT = int(os.getenv("UDP_LISTEN_PORT", "4210"))   # 서버 수신 포트 (모듈은 보낸 포트로 응답)
+DEVICE_UDP_PORT = 4210       # 모듈(ESP8266)의 UDP 포트: discover/명령 목적지
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 8000
+# HTTP 워커 프로세스 수. 2 이상이면 리더 1개가 UDP/스케줄러/장치 목록을 맡고 나머지는 HTTP만 처리
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+CLUSTER_ENABLED = SERVER_WORKERS > 1 and FCNTL_AVAILABLE
+CLUSTER_LOCK_PATH = os.getenv("CLUSTER_LOCK_PATH", os.path.join(os.path.dirname(__file__), ".leader.lock"))
+CLUSTER_SOCKET_PATH = os.getenv("CLUSTER_SOCKET_PATH", os.path.join(tempfile.gettempdir(), f"aircon-controller-{SERVER_PORT}.sock"))
+CLUSTER_SYNC_INTERVAL_SEC = float(os.getenv("CLUSTER_SYNC_INTERVAL_SEC", "0.5"))      # 팔로워의 장치 목록 동기화 주기
+CLUSTER_ELECTION_INTERVAL_SEC = float(os.getenv("CLUSTER_ELECTION_INTERVAL_SEC", "2"))  # 리더 부재 시 승계까지 최대 지연
+CLUSTER_COMMAND_TIMEOUT_SEC = float(os.getenv("CLUSTER_COMMAND_TIMEOUT_SEC", "60"))    # 팔로워가 리더로 전달한 제어 명령의 응답 대기
+MDNS_ENABLED = os.getenv("MDNS_ENABLED", "1").lower() in ("1", "true", "yes")
 MDNS_HOSTNAME = "aircon-controller"
 MDNS_SERVICE_TYPE = "_http._tcp.local."
-DISCOVERY_INTERVAL_SEC = int(os.getenv("DISCOVERY_INTERVAL_SEC", "30"))  # 서버 주도 discover 주기 (기본 30초)
-# 브로드캐스트 기반 건강 판단: 최근 응답 허용 최대 연령(초)
-# 기본값은 discover 주기의 2배와 120초 중 큰 값
-HEALTH_OK_MAX_AGE_SEC = int(os.getenv("HEALTH_OK_MAX_AGE_SEC", str(max(120, 2 * int(DISCOVERY_INTERVAL_SEC)))))
-# 브로드캐스트 기반 상태 캐시 허용 최대 연령(초)
-# 기본값은 건강 기준과 동일하게 설정
-STATE_OK_MAX_AGE_SEC = int(os.getenv("STATE_OK_MAX_AGE_SEC", str(HEALTH_OK_MAX_AGE_SEC)))
-# 구형 모듈을 위해 상태 캐시가 없거나 오래됐을 때만 HTTP fallback 허용 여부 (기본 비활성)
-STATE_HTTP_FALLBACK = os.getenv("STATE_HTTP_FALLBACK", "0").lower() in ("1", "true", "yes")
+# discover 대상 서브넷 (쉼표 구분 CIDR, 예: "192.168.10.0/24,192.168.20.0/24")
+# 지정하지 않으면 로컬 인터페이스의 서브넷마다 directed broadcast 전송
+DISCOVERY_SUBNETS = os.getenv("DISCOVERY_SUBNETS", "")
+# 서브넷별 discover 주기 (예: "192.168.20.0/24=120,10.0.0.0/16=300")
+DISCOVERY_SUBNET_INTERVALS = os.getenv("DISCOVERY_SUBNET_INTERVALS", "")
+# 255.255.255.255 제한 브로드캐스트도 함께 전송할지 (서브넷을 못 찾으면 항상 사용)
+DISCOVERY_LIMITED_BROADCAST = os.getenv("DISCOVERY_LIMITED_BROADCAST", "0").lower() in ("1", "true", "yes")
+# 인터페이스/서브넷 재탐색 주기 (DHCP 변경, NIC 추가 대응)
+DISCOVERY_IFACE_REFRESH_SEC = int(os.getenv("DISCOVERY_IFACE_REFRESH_SEC", "300"))
 
 HTTP_PATH_SET = "/ac/set"    # ESP8266 코드에 맞춤
-HTTP_TIMEOUT = 2.0
-# 전체 제어 시, 장치별 최대 대기 시간(초) - 초과 시 타임아웃으로 처리
-ALL_CMD_PER_DEVICE_TIMEOUT_SEC = int(os.getenv("ALL_CMD_PER_DEVICE_TIMEOUT_SEC", "10"))
-# IR 명령 전송 재시도 설정 (기본 1회 전송)
-AC_SEND_ATTEMPTS = int(os.getenv("AC_SEND_ATTEMPTS", "6"))
-AC_SEND_INTERVAL_SEC = float(os.getenv("AC_SEND_INTERVAL_SEC", "2"))
-# 실패 시 재시도 백오프/지터 설정
-AC_RETRY_BACKOFF = float(os.getenv("AC_RETRY_BACKOFF", "2.0"))   # 지수 백오프 배수
-AC_RETRY_JITTER_MS = int(os.getenv("AC_RETRY_JITTER_MS", "200")) # 0~지정ms 랜덤 지터
+
+# ========================
+# 런타임 설정 (재시작 없이 변경: 설정 파일 수정 후 POST /config/reload 또는 SIGHUP)
+# ========================
+# 키 이름은 환경 변수와 같음. 우선순위: 기본값 < 환경 변수 < 설정 파일 (파일은 실행 중 바꾸는 용도)
+CONFIG_PATH = os.getenv("CONFIG_PATH", os.path.join(os.path.dirname(__file__), "config.json"))
+
+def _tuning_field(default: Any, lo: float | None = None, hi: float | None = None, derive=None):
+    return dataclasses.field(default=default, metadata={"range": (lo, hi), "derive": derive})
+
+@dataclasses.dataclass(frozen=True)
+class Tuning:
+    """실행 중 다시 읽을 수 있는 설정 묶음. 통째로 교체되므로 한 번 읽은 객체는 항상 한 버전의 값만 가짐"""
+    # 이 시간(초) 동안 응답이 없는 장치는 목록에서 제거
+    device_timeout_sec: int = _tuning_field(60 * 5, 10, 86400)
+    http_timeout: float = _tuning_field(2.0, 0.1, 60)
+    # 전체 제어 시, 장치별 최대 대기 시간(초) - 초과 시 타임아웃으로 처리
+    all_cmd_per_device_timeout_sec: int = _tuning_field(10, 1, 600)
+    # IR 명령 전송 재시도 설정 (성공하면 추가 전송 없음)
+    ac_send_attempts: int = _tuning_field(6, 1, 20)
+    ac_send_interval_sec: float = _tuning_field(2.0, 0, 60)
+    ac_retry_backoff: float = _tuning_field(2.0, 1, 10)      # 지수 백오프 배수
+    ac_retry_jitter_ms: int = _tuning_field(200, 0, 10000)   # 0~지정ms 랜덤 지터
+    # 서버 주도 discover 주기 (기본 30초)
+    discovery_interval_sec: int = _tuning_field(30, 1, 3600)
+    # 적응형 discover: 시작 직후/장치 변동 시 짧은 주기, 안정 시 점차 긴 주기 (기본 비활성)
+    discovery_adaptive: bool = _tuning_field(False)
+    discovery_min_interval_sec: int = _tuning_field(5, 1, 240)
+    # 모듈 펌웨어는 5분간 discover가 없으면 재시작하므로 최대 240초
+    discovery_max_interval_sec: int = _tuning_field(120, 1, 240)
+    discovery_warmup_rounds: int = _tuning_field(3, 0, 100)
+    # 알려진 장치 IP로 유니캐스트 discover 전송 (켜면 브로드캐스트 주기를 늘려 트래픽 절감)
+    discovery_unicast_sweep: bool = _tuning_field(False)
+    discovery_broadcast_interval_sec: int = _tuning_field(
+        0, 1, 86400, lambda v: v["discovery_interval_sec"] * 4 if v["discovery_unicast_sweep"] else v["discovery_interval_sec"])
+    # 브로드캐스트 기반 건강 판단: 최근 응답 허용 최대 연령(초)
+    # 기본값은 discover 주기(적응형이면 최대 주기)의 2배와 120초 중 큰 값
+    health_ok_max_age_sec: int = _tuning_field(0, 1, 86400, lambda v: max(120, 2 * int(
+        v["discovery_max_interval_sec"] if v["discovery_adaptive"] else v["discovery_interval_sec"])))
+    # 브로드캐스트 기반 상태 캐시 허용 최대 연령(초). 기본값은 건강 기준과 동일
+    state_ok_max_age_sec: int = _tuning_field(0, 1, 86400, lambda v: v["health_ok_max_age_sec"])
+    # 구형 모듈을 위해 상태 캐시가 없거나 오래됐을 때만 HTTP fallback 허용 여부 (기본 비활성)
+    state_http_fallback: bool = _tuning_field(False)
+
+def _coerce_tuning_value(kind: type, value: Any) -> Any:
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ("1", "true", "yes", "0", "false", "no", ""):
+            return value.strip().lower() in ("1", "true", "yes")
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        raise ValueError("expected a boolean")
+    if isinstance(value, bool):
+        raise ValueError(f"expected {kind.__name__}")
+    number = float(value)
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError("expected an integer")
+        return int(number)
+    return number
+
+def _read_config_file(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path}: invalid JSON ({e})")
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: top level must be an object")
+    known = {f.name.upper() for f in dataclasses.fields(Tuning)}
+    unknown = sorted(k for k in data if k not in known)
+    if unknown:
+        raise ValueError(f"{path}: unknown keys {', '.join(unknown)}")
+    return data
+
+def load_tuning(path: str | None = None, use_file: bool = True) -> tuple[Tuning, Dict[str, str]]:
+    """기본값 < 환경 변수 < 설정 파일 순으로 합쳐 검증한 Tuning과 키별 출처 반환. 잘못된 값이 있으면 ValueError"""
+    raw: Dict[str, tuple[Any, str]] = {}
+    for f in dataclasses.fields(Tuning):
+        key = f.name.upper()
+        if key in os.environ:
+            raw[key] = (os.environ[key], "env")
+    if use_file:
+        for key, value in _read_config_file(path or CONFIG_PATH).items():
+            raw[key] = (value, "file")
+    values: Dict[str, Any] = {}
+    sources: Dict[str, str] = {}
+    errors: list[str] = []
+    for f in dataclasses.fields(Tuning):
+        key = f.name.upper()
+        if key in raw:
+            value, source = raw[key]
+            try:
+                value = _coerce_tuning_value(f.type, value)
+            except (TypeError, ValueError) as e:
+                errors.append(f"{key}={value!r}: {e}")
+                continue
+        elif f.metadata["derive"] is not None:
+            if errors:
+                continue   # 기준 값이 잘못되어 계산할 수 없음 (이미 오류로 기록됨)
+            value, source = f.metadata["derive"](values), "default"
+        else:
+            value, source = f.default, "default"
+        lo, hi = f.metadata["range"]
+        if lo is not None and not lo <= value <= hi:
+            errors.append(f"{key}={value}: must be between {lo:g} and {hi:g}")
+            continue
+        values[f.name] = value
+        sources[key] = source
+    if not errors and values["discovery_min_interval_sec"] > values["discovery_max_interval_sec"]:
+        errors.append("DISCOVERY_MIN_INTERVAL_SEC must not exceed DISCOVERY_MAX_INTERVAL_SEC")
+    if errors:
+        raise ValueError("; ".join(errors))
+    return Tuning(**values), sources
+
+def _load_initial_tuning() -> tuple[Tuning, Dict[str, str], str | None]:
+    try:
+        loaded, sources = load_tuning()
+        return loaded, sources, None
+    except ValueError as e:
+        # 설정 파일이 잘못돼도 서버는 시작 (환경 변수 값 사용). 환경 변수가 잘못됐으면 여기서 실패
+        print(f"[Config] {CONFIG_PATH} ignored: {e}")
+        loaded, sources = load_tuning(use_file=False)
+        return loaded, sources, str(e)
+
+tuning, tuning_sources, _tuning_error = _load_initial_tuning()
+config_state: Dict[str, Any] = {"version": 1, "loaded_at": time.time(), "last_error": _tuning_error, "last_changes": {}}
+_config_lock = threading.Lock()
+# discover 관련 값이 바뀌면 set: UDP 수신 루프가 discover 대상/주기를 다시 계산
+discovery_reconfigure = threading.Event()
+
+def reload_config(reason: str = "api") -> Dict[str, Any]:
+    """설정 파일/환경 변수를 다시 읽어 검증 후 Tuning을 통째로 교체. 검증에 실패하면 기존 값 유지"""
+    global tuning, tuning_sources
+    with _config_lock:
+        try:
+            loaded, sources = load_tuning()
+        except ValueError as e:
+            config_state["last_error"] = str(e)
+            print(f"[Config] reload ({reason}) rejected: {e}")
+            return {"ok": False, "error": str(e), "version": config_state["version"]}
+        changes = {
+            f.name.upper(): [getattr(tuning, f.name), getattr(loaded, f.name)]
+            for f in dataclasses.fields(Tuning)
+            if getattr(tuning, f.name) != getattr(loaded, f.name)
+        }
+        # 참조 1회 교체: 읽는 쪽은 이전 설정 전체 또는 새 설정 전체 중 하나만 봄
+        tuning, tuning_sources = loaded, sources
+        config_state["loaded_at"] = time.time()
+        config_state["last_error"] = None
+        if changes:
+            config_state["version"] += 1
+            config_state["last_changes"] = changes
+            if any(key.startswith("DISCOVERY_") for key in changes):
+                discovery_reconfigure.set()
+        version = config_state["version"]
+    if changes:
+        print(f"[Config] reload ({reason}) v{version}: " + ", ".join(f"{k} {old} -> {new}" for k, (old, new) in changes.items()))
+        write_action_log("config_reload", {"reason": reason, "version": version, "changes": changes})
+    return {"ok": True, "version": version, "changes": changes}
+
+def _sighup_reload(signum, frame):
+    # 시그널 핸들러에서는 파일을 읽지 않고 스레드로 넘김
+    threading.Thread(target=reload_config, args=("SIGHUP",), daemon=True).start()
+
+def install_sighup_reload():
+    if hasattr(signal, "SIGHUP"):   # Windows에는 없음
+        signal.signal(signal.SIGHUP, _sighup_reload)
 
 # ========================
 # 액션 로그 설정 (용량 제한 로테이션)
@@ -78,7 +291,9 @@ def _setup_action_logger() -> logging.Logger:
         os.makedirs(LOG_DIR, exist_ok=True)
     except Exception:
         pass
-    logger = logging.getLogger("actions")
+    # 로거는 프로세스 전역이므로 경로별로 분리 (한 프로세스의 여러 인스턴스가 다른 파일에 기록)
+    default_path = os.path.join(os.path.dirname(__file__), "logs", "actions.log")
+    logger = logging.getLogger("actions" if ACTION_LOG_PATH == default_path else f"actions:{ACTION_LOG_PATH}")
     logger.setLevel(logging.INFO)
     if not logger.handlers:
         try:
@@ -94,18 +309,159 @@ def _setup_action_logger() -> logging.Logger:
             logger.info(f"[ActionLog] handler setup failed: {e}")
     return logger
 
-action_logger = _setup_action_logger()
+# 첫 기록 시점에 파일 핸들러 생성 (import 시 logs/ 생성/파일 열기 생략)
+action_logger: logging.Logger | None = None
 
 def write_action_log(event: str, data: dict):
+    global action_logger
     try:
         msg = json.dumps({"event": event, **(data or {})}, ensure_ascii=False)
     except Exception:
         msg = f"{event} {data}"
     try:
+        if action_logger is None:
+            action_logger = _setup_action_logger()
         action_logger.info(msg)
     except Exception:
         pass
 
+# ========================
+# 요청 트레이싱 / 느린 요청 기록 (옵션, 기본 비활성)
+# ========================
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0").lower() in ("1", "true", "yes")
+TRACE_SLOW_KEEP = int(os.getenv("TRACE_SLOW_KEEP", "20"))       # 보관할 가장 느린 요청 수
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))     # 요청당 최대 span 수
+# 이 시간(ms) 이상 걸린 요청은 샘플링 프로파일을 함께 보관 (0이면 프로파일 비활성)
+TRACE_PROFILE_THRESHOLD_MS = int(os.getenv("TRACE_PROFILE_THRESHOLD_MS", "0"))
+TRACE_PROFILE_INTERVAL_MS = int(os.getenv("TRACE_PROFILE_INTERVAL_MS", "10"))
+
+_current_trace: contextvars.ContextVar[dict | None] = contextvars.ContextVar("current_trace", default=None)
+_trace_lock = threading.Lock()
+_slow_heap: list[tuple[float, int, dict]] = []   # (duration_ms, seq, record) 최소 힙
+_slow_seq = itertools.count()
+_profiled_traces: dict[int, dict] = {}          # 샘플링 대상 요청 (id(trace) -> trace)
+_profiler_thread: threading.Thread | None = None
+
+@contextlib.contextmanager
+def _trace_span(name: str, **attrs):
+    """현재 요청 트레이스에 span 기록. 트레이스가 없으면 attrs만 돌려주고 아무것도 하지 않음"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield attrs
+        return
+    trace["threads"].add(threading.get_ident())
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        attrs["name"] = name
+        attrs["start_ms"] = round((t0 - trace["t0"]) * 1000.0, 3)
+        attrs["dur_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        if len(trace["spans"]) < TRACE_MAX_SPANS:
+            trace["spans"].append(attrs)
+        else:
+            trace["dropped_spans"] += 1
+
+@contextlib.contextmanager
+def _traced_lock(lock, name: str):
+    """락 획득 대기 시간을 span으로 기록"""
+    if _current_trace.get() is None:
+        with lock:
+            yield
+        return
+    with _trace_span("lock_wait", lock=name):
+        lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+def _fold_stack(frame, max_depth: int = 40) -> str:
+    parts = []
+    while frame is not None and len(parts) < max_depth:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+def _profiler_loop():
+    """진행 중인 요청의 스레드 스택을 주기적으로 샘플링"""
+    interval = max(1, TRACE_PROFILE_INTERVAL_MS) / 1000.0
+    while True:
+        time.sleep(interval)
+        with _trace_lock:
+            traces = list(_profiled_traces.values())
+        if not traces:
+            continue
+        frames = sys._current_frames()
+        for trace in traces:
+            samples = trace["samples"]
+            for tid in list(trace["threads"]):
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                key = _fold_stack(frame)
+                samples[key] = samples.get(key, 0) + 1
+
+def _trace_begin(method: str, path: str, query: str) -> dict:
+    global _profiler_thread
+    trace = {
+        "method": method,
+        "path": path,
+        "query": query,
+        "started_at": time.time(),
+        "t0": time.perf_counter(),
+        "spans": [],
+        "threads": set(),
+        "dropped_spans": 0,
+    }
+    if TRACE_PROFILE_THRESHOLD_MS > 0:
+        trace["samples"] = {}
+        with _trace_lock:
+            _profiled_traces[id(trace)] = trace
+            if _profiler_thread is None:
+                _profiler_thread = threading.Thread(target=_profiler_loop, daemon=True)
+                _profiler_thread.start()
+    return trace
+
+def _trace_end(trace: dict, status_code: int):
+    duration_ms = (time.perf_counter() - trace["t0"]) * 1000.0
+    with _trace_lock:
+        _profiled_traces.pop(id(trace), None)
+        if len(_slow_heap) >= TRACE_SLOW_KEEP and (not _slow_heap or duration_ms <= _slow_heap[0][0]):
+            return
+    spans = sorted(trace["spans"], key=lambda sp: sp["start_ms"])
+    summary: Dict[str, Dict[str, float]] = {}
+    for sp in spans:
+        agg = summary.setdefault(sp["name"], {"count": 0, "total_ms": 0.0})
+        agg["count"] += 1
+        agg["total_ms"] = round(agg["total_ms"] + sp["dur_ms"], 3)
+    record = {
+        "method": trace["method"],
+        "path": trace["path"],
+        "query": trace["query"],
+        "status_code": status_code,
+        "started_at": trace["started_at"],
+        "duration_ms": round(duration_ms, 3),
+        "summary": summary,
+        "spans": spans,
+        "dropped_spans": trace["dropped_spans"],
+    }
+    samples = trace.get("samples")
+    if samples and duration_ms >= TRACE_PROFILE_THRESHOLD_MS:
+        top = sorted(samples.items(), key=lambda kv: kv[1], reverse=True)[:15]
+        record["profile"] = {
+            "interval_ms": TRACE_PROFILE_INTERVAL_MS,
+            "samples": sum(samples.values()),
+            "top_stacks": [{"stack": k, "count": v} for k, v in top],
+        }
+    with _trace_lock:
+        item = (duration_ms, next(_slow_seq), record)
+        if len(_slow_heap) < TRACE_SLOW_KEEP:
+            heapq.heappush(_slow_heap, item)
+        elif _slow_heap and duration_ms > _slow_heap[0][0]:
+            heapq.heapreplace(_slow_heap, item)
+
 # ========================
 # 시계 동기화 설정
 # ========================
@@ -114,16 +470,841 @@ TIME_SYNC_INTERVAL_SEC = int(os.getenv("TIME_SYNC_INTERVAL_SEC", str(60 * 60 * 2
 DEFAULT_NTP_SERVER = "time.apple.com" if platform.system() == "Darwin" else "pool.ntp.org"
 NTP_SERVER = os.getenv("NTP_SERVER", DEFAULT_NTP_SERVER)
 TIME_SYNC_COMMAND = os.getenv("TIME_SYNC_COMMAND")  # 커스텀 명령이 필요할 때 사용
+# 첫 동기화는 시작 직후 CPU/네트워크 경합을 피해 지연 실행
+TIME_SYNC_START_DELAY_SEC = float(os.getenv("TIME_SYNC_START_DELAY_SEC", "10"))
+
+# ========================
+# JSON 직렬화 (orjson 우선)
+# ========================
+def _json_bytes(obj: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_bytes_response(body: bytes, status_code: int = 200) -> Response:
+    """미리 직렬화된 JSON 바이트를 그대로 응답 (jsonable_encoder 생략)"""
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# ========================
+# 외부 의존성 (create_app에서 교체: 가짜 전송으로 벤치마크, 고정 시계로 재현 등)
+# ========================
+http_transport: Any = requests   # 장치 HTTP 호출. requests 호환 .get(url, params=, timeout=)
+clock: Any = time                # 장치 목록/건강 판단 시각 (.time()). 스케줄러는 시계 점프 감지를 위해 실제 시계 사용
+db_connect = None                # 스케줄 DB 연결 팩토리. None이면 DB_PATH로 sqlite3.connect
+
+# ========================
+# 수명 주기 (종료 시 새 명령 거부 -> 전송 중 명령 drain -> 정리 훅)
+# ========================
+# 종료 시 전송 중(재시도 포함) 명령이 끝나기를 기다리는 최대 시간(초). 넘기면 파일에 저장 후 다음 시작 시 재전송
+SHUTDOWN_DRAIN_SEC = float(os.getenv("SHUTDOWN_DRAIN_SEC", "15"))
+PENDING_COMMANDS_PATH = os.getenv("PENDING_COMMANDS_PATH", os.path.join(os.path.dirname(__file__), "pending-commands.json"))
+# 이보다 오래된 저장 명령은 재전송하지 않음 (기본 10분)
+PENDING_COMMAND_MAX_AGE_SEC = int(os.getenv("PENDING_COMMAND_MAX_AGE_SEC", "600"))
+
+lifecycle: Dict[str, Any] = {"state": "starting", "started_at": time.time(), "stopping_at": None}
+_lifecycle_lock = threading.Lock()
+# 종료 시작 시 set: 백그라운드 루프 종료
+_shutdown_event = threading.Event()
+# drain 기한이 지나면 set: 재시도 대기를 끊고 남은 재시도 중단
+_drain_expired = threading.Event()
+_shutdown_hooks: list[tuple[str, Any]] = []
+
+inflight_lock = threading.Lock()
+inflight_sends: Dict[int, Dict[str, Any]] = {}
+_inflight_seq = itertools.count(1)
+
+def add_shutdown_hook(name: str, fn):
+    """종료 시 drain 이후 등록 순서대로 실행할 정리 작업"""
+    _shutdown_hooks.append((name, fn))
+
+def require_accepting_commands():
+    if lifecycle["state"] in ("draining", "stopped"):
+        raise HTTPException(status_code=503, detail="server shutting down", headers={"Retry-After": "5"})
+
+def _inflight_begin(dev: Dict[str, Any], params: Dict[str, Any]) -> int:
+    token = next(_inflight_seq)
+    with inflight_lock:
+        inflight_sends[token] = {
+            "device": dev.get("id"),
+            "ip": dev.get("ip"),
+            "port": dev.get("port"),
+            "params": dict(params),
+            "started_at": time.time(),
+        }
+    return token
+
+def _inflight_end(token: int):
+    with inflight_lock:
+        inflight_sends.pop(token, None)
+
+def drain_inflight_sends(timeout_sec: float) -> list[Dict[str, Any]]:
+    """전송 중 명령이 끝나기를 기다림 (재시도 간격은 평소대로). 기한까지 남은 명령 목록 반환"""
+    deadline = time.monotonic() + max(0.0, timeout_sec)
+    while time.monotonic() < deadline:
+        with inflight_lock:
+            if not inflight_sends:
+                return []
+        time.sleep(0.05)
+    with inflight_lock:
+        leftover = list(inflight_sends.values())
+    # 목록을 확보한 뒤에 남은 재시도를 멈춤
+    _drain_expired.set()
+    return leftover
+
+def save_pending_commands(items: list[Dict[str, Any]], path: str | None = None) -> int:
+    """drain하지 못한 명령을 장치별 최신 1건으로 저장 (명령은 절대 상태라 재전송해도 안전)"""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for item in sorted(items, key=lambda it: it["started_at"]):
+        latest[item["device"]] = item
+    target = path or PENDING_COMMANDS_PATH
+    tmp = f"{target}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"v": 1, "saved_at": time.time(), "commands": list(latest.values())}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    return len(latest)
+
+def replay_pending_commands(path: str | None = None) -> int:
+    """이전 종료 때 저장된 명령을 재전송 (파일은 먼저 삭제해 중복 재전송 방지)"""
+    target = path or PENDING_COMMANDS_PATH
+    try:
+        with open(target, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        os.remove(target)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        print(f"[Lifecycle] pending commands load failed: {e}")
+        return 0
+    now = time.time()
+    commands = [
+        c for c in (data.get("commands") or [])
+        if c.get("device") and c.get("ip") and now - float(c.get("started_at") or 0) <= PENDING_COMMAND_MAX_AGE_SEC
+    ]
+    for c in commands:
+        dev = {"id": c["device"], "ip": c["ip"], "port": int(c.get("port") or 80)}
+        write_action_log("pending_replay", {"device": dev["id"], "params": c.get("params")})
+        dispatch_command(dev, c.get("params") or {}, lane="schedule")
+    if commands:
+        print(f"[Lifecycle] replaying {len(commands)} commands interrupted by last shutdown")
+    return len(commands)
+
+def run_shutdown(reason: str = "signal"):
+    """새 명령 거부 -> 전송 중 명령 drain (기한 초과분 저장) -> 종료 훅 실행. 여러 번 호출해도 1회만 실행"""
+    with _lifecycle_lock:
+        if lifecycle["state"] in ("draining", "stopped"):
+            return
+        lifecycle["state"] = "draining"
+        lifecycle["stopping_at"] = time.time()
+    if threading.current_thread() is threading.main_thread():
+        # drain 도중 들어온 중복 SIGTERM(감독 프로세스의 terminate 등)으로 정리가 끊기지 않도록
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    _shutdown_event.set()
+    schedule_wake.set()
+    print(f"[Lifecycle] shutdown ({reason}): draining in-flight commands (max {SHUTDOWN_DRAIN_SEC:g}s)")
+    leftover = drain_inflight_sends(SHUTDOWN_DRAIN_SEC)
+    if leftover:
+        try:
+            saved = save_pending_commands(leftover)
+            print(f"[Lifecycle] {saved} unfinished commands saved to {PENDING_COMMANDS_PATH}")
+        except Exception as e:
+            print(f"[Lifecycle] pending commands save failed: {e}")
+    for name, fn in _shutdown_hooks:
+        try:
+            fn()
+        except Exception as e:
+            print(f"[Lifecycle] shutdown hook {name} failed: {e}")
+    lifecycle["state"] = "stopped"
+    print(f"[Lifecycle] stopped in {time.time() - lifecycle['stopping_at']:.1f}s")
+
+def _sigterm_to_interrupt(signum, frame):
+    # SIGTERM(systemd stop, pkill)도 Ctrl+C와 같은 정리 경로를 타도록
+    raise KeyboardInterrupt
+
+# ------------------------
+# 시작 시간 분석 / 준비 상태
+# ------------------------
+startup_phases: list[tuple[str, float]] = [("imports", _STARTUP_IMPORTS_MS)]   # (단계, 시작 기준 누적 ms)
+startup_tasks: Dict[str, Dict[str, Any]] = {}    # 백그라운드 초기화 작업 상태
+
+def startup_mark(phase: str):
+    startup_phases.append((phase, round((time.perf_counter() - _STARTUP_T0) * 1000.0, 1)))
+
+@contextlib.contextmanager
+def startup_task(name: str, once: bool = False):
+    """백그라운드 초기화 작업의 상태/소요 시간 기록. once=True면 첫 실행만 기록"""
+    if once and name in startup_tasks:
+        yield None
+        return
+    task: Dict[str, Any] = {"state": "running", "took_ms": None}
+    startup_tasks[name] = task
+    t0 = time.perf_counter()
+    try:
+        yield task
+        if task["state"] == "running":
+            task["state"] = "ok"
+    except Exception as e:
+        task["state"] = "failed"
+        task["error"] = str(e)
+        print(f"[Startup] {name} failed: {e}")
+    finally:
+        task["took_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
 
 # ========================
 # 장치 목록
 # ========================
 devices_lock = threading.Lock()
 devices: Dict[str, Dict[str, Any]] = {}
+# 장치의 ip/port/state/unverified가 바뀔 때마다 증가하는 registry 버전 (devices_lock 하에서 갱신)
+registry_version = 0
+_REV_FIELDS = ("ip", "port", "state", "unverified", "udp_port", "group")
+
+def _bump_rev(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    """내용이 바뀐 장치에만 새 rev 부여 (last_seen 갱신만으로는 유지)"""
+    global registry_version
+    if "rev" not in old or any(old.get(k) != new.get(k) for k in _REV_FIELDS):
+        registry_version += 1
+        new["rev"] = registry_version
+
+# ========================
+# 장치 목록 스냅샷 (재시작 직후 웜 스타트)
+# ========================
+REGISTRY_SNAPSHOT_ENABLED = os.getenv("REGISTRY_SNAPSHOT_ENABLED", "1").lower() in ("1", "true", "yes")
+REGISTRY_SNAPSHOT_PATH = os.getenv("REGISTRY_SNAPSHOT_PATH", os.path.join(os.path.dirname(__file__), "registry.json"))
+REGISTRY_SNAPSHOT_INTERVAL_SEC = int(os.getenv("REGISTRY_SNAPSHOT_INTERVAL_SEC", "60"))
+# 이보다 오래된 스냅샷 항목은 복원하지 않음 (기본 1일)
+REGISTRY_SNAPSHOT_MAX_AGE_SEC = int(os.getenv("REGISTRY_SNAPSHOT_MAX_AGE_SEC", str(60 * 60 * 24)))
+REGISTRY_SNAPSHOT_VERSION = 1
+# 스냅샷 레코드 필드 순서 (키 반복 없이 배열로 저장)
+_SNAPSHOT_FIELDS = ("id", "ip", "port", "last_seen", "state", "state_last_seen", "udp_port", "group")
+
+def save_registry_snapshot(path: str | None = None) -> int:
+    """장치 목록을 임시 파일에 쓴 뒤 원자적으로 교체. 저장한 장치 수 반환"""
+    target = path or REGISTRY_SNAPSHOT_PATH
+    with devices_lock:
+        rows = [[dev.get(f) for f in _SNAPSHOT_FIELDS] for dev in devices.values()]
+    data = json.dumps(
+        {"v": REGISTRY_SNAPSHOT_VERSION, "saved_at": clock.time(), "fields": _SNAPSHOT_FIELDS, "devices": rows},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    tmp = f"{target}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    return len(rows)
+
+def load_registry_snapshot(path: str | None = None) -> list[Dict[str, Any]]:
+    """스냅샷을 장치 목록에 복원 (unverified로 표시). 복원된 항목 반환"""
+    target = path or REGISTRY_SNAPSHOT_PATH
+    try:
+        with open(target, "r", encoding="utf-8") as f:
+            snap = json.load(f)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"[Registry] snapshot load failed: {e}")
+        return []
+    if not isinstance(snap, dict) or snap.get("v") != REGISTRY_SNAPSHOT_VERSION:
+        print(f"[Registry] unsupported snapshot version: {snap.get('v') if isinstance(snap, dict) else None}")
+        return []
+    fields = snap.get("fields") or _SNAPSHOT_FIELDS
+    now = clock.time()
+    restored: list[Dict[str, Any]] = []
+    with devices_lock:
+        for row in snap.get("devices") or []:
+            rec = dict(zip(fields, row))
+            dev_id = rec.get("id")
+            if not dev_id or not rec.get("ip") or dev_id in devices:
+                continue
+            if now - float(rec.get("last_seen") or 0) > REGISTRY_SNAPSHOT_MAX_AGE_SEC:
+                continue
+            entry = {k: v for k, v in rec.items() if v is not None}
+            entry["port"] = int(entry.get("port") or 80)
+            entry["last_seen"] = float(entry.get("last_seen") or 0)
+            entry["unverified"] = True        # 재시작 후 아직 응답하지 않은 장치
+            entry["restored_at"] = now        # 만료 판단은 복원 시각 기준
+            _bump_rev({}, entry)
+            devices[dev_id] = entry
+            _shm_publish(entry)
+            restored.append(entry)
+    if restored:
+        print(f"[Registry] restored {len(restored)} devices from snapshot (unverified)")
+    return restored
+
+def _registry_snapshot_loop():
+    print(f"[Registry] Snapshot every {REGISTRY_SNAPSHOT_INTERVAL_SEC}s -> {REGISTRY_SNAPSHOT_PATH}")
+    while not _shutdown_event.wait(max(1, REGISTRY_SNAPSHOT_INTERVAL_SEC)):
+        try:
+            save_registry_snapshot()
+        except Exception as e:
+            print(f"[Registry] snapshot save failed: {e}")
+
+# ========================
+# 장치 목록 공유 메모리 테이블 (로컬 프로세스가 HTTP 없이 읽기)
+# ========================
+# 고정 크기 레코드의 mmap 파일. 레이아웃(SHM_*)과 리더는 registry_shm.py에만 정의
+REGISTRY_SHM_ENABLED = os.getenv("REGISTRY_SHM_ENABLED", "0").lower() in ("1", "true", "yes")
+REGISTRY_SHM_PATH = os.getenv("REGISTRY_SHM_PATH", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), f"aircon-registry-{SERVER_PORT}"))
+REGISTRY_SHM_CAPACITY = int(os.getenv("REGISTRY_SHM_CAPACITY", "1024"))   # 최대 장치 수
+
+_shm_map: mmap.mmap | None = None
+_shm_slots: Dict[str, int] = {}   # 장치 id -> 슬롯 번호 (devices_lock 하에서 갱신)
+_shm_free: list[int] = []
+_shm_full_warned = False
+
+def open_registry_table(path: str | None = None, capacity: int | None = None) -> mmap.mmap:
+    """테이블 파일을 열어 현재 장치 목록으로 다시 기록. 리더/단일 프로세스만 호출
+
+    외부 리더(registry_shm)와 이전 리더가 같은 파일을 매핑하고 있을 수 있으므로 파일을 0으로 자르지 않는다
+    (매핑 범위 밖이 되면 SIGBUS). 필요할 때 늘리기만 하고, 기존 레코드는 seqlock을 지키며 비운다.
+    """
+    global _shm_map
+    target = path or REGISTRY_SHM_PATH
+    cap = max(1, capacity or REGISTRY_SHM_CAPACITY)
+    fd = os.open(target, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        existing = os.fstat(fd).st_size
+        old_cap = max(0, existing - SHM_HEADER_SIZE) // SHM_RECORD_SIZE
+        cap = max(cap, old_cap)   # 줄이지 않음
+        size = SHM_HEADER_SIZE + cap * SHM_RECORD_SIZE
+        if existing < size:
+            os.ftruncate(fd, size)   # 늘어난 부분은 0으로 채워짐
+        mm = mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+    with devices_lock:
+        _shm_map = mm
+        _shm_slots.clear()
+        _shm_free.clear()
+        # 사용 슬롯 수를 먼저 0으로 -> 이전 레코드를 비우는 동안 새 리더는 읽지 않음
+        SHM_HEADER.pack_into(mm, 0, SHM_MAGIC, SHM_LAYOUT_VERSION, SHM_RECORD_SIZE, cap, 0, registry_version, clock.time())
+        for slot in range(old_cap):
+            _shm_write(slot, None)
+        for dev in devices.values():
+            _shm_publish(dev)
+    print(f"[Registry] shared table {target} ({cap} slots x {SHM_RECORD_SIZE}B)")
+    return mm
+
+def _shm_text(value: Any, size: int) -> bytes:
+    return str(value).encode("utf-8")[:size] if value is not None else b""
+
+def _shm_write(slot: int, entry: Dict[str, Any] | None):
+    mm = _shm_map
+    off = SHM_HEADER_SIZE + slot * SHM_RECORD_SIZE
+    seq = SHM_SEQ.unpack_from(mm, off)[0]
+    seq += seq & 1   # 이전 프로세스가 쓰다 중단한 슬롯(홀수)도 짝수에서 다시 시작
+    # seqlock: 홀수 seq 동안 리더는 재시도
+    SHM_SEQ.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF)
+    if entry is None:
+        SHM_BODY.pack_into(mm, off + 4, 0, -1, 0, b"", SHM_NO_TEMP, SHM_NO_TEMP, 0, 0.0, 0.0, b"", b"", b"")
+    else:
+        st = entry.get("state") if isinstance(entry.get("state"), dict) else None
+        flags = SHM_FLAG_USED
+        if entry.get("unverified"):
+            flags |= SHM_FLAG_UNVERIFIED
+        power, temp, room, mode, fan = -1, SHM_NO_TEMP, SHM_NO_TEMP, b"", b""
+        if st is not None:
+            flags |= SHM_FLAG_STATE
+            if st.get("swing") in (True, 1, "on", "true"):
+                flags |= SHM_FLAG_SWING
+            if st.get("power") is not None:
+                power = 1 if st.get("power") in (True, 1, "on", "true") else 0
+            try:
+                temp = int(st["temp"]) if st.get("temp") is not None else SHM_NO_TEMP
+                room = int(round(float(st["room_temp"]) * 10)) if st.get("room_temp") is not None else SHM_NO_TEMP
+            except (TypeError, ValueError):
+                pass
+            mode, fan = _shm_text(st.get("mode"), 8), _shm_text(st.get("fan"), 8)
+        try:
+            ip = socket.inet_aton(entry.get("ip") or "0.0.0.0")
+        except OSError:
+            ip = b"\0\0\0\0"
+        SHM_BODY.pack_into(
+            mm, off + 4, flags, power, int(entry.get("port") or 0) & 0xFFFF, ip, temp, room,
+            int(entry.get("rev") or 0) & 0xFFFFFFFF, float(entry.get("last_seen") or 0.0),
+            float(entry.get("state_last_seen") or 0.0), _shm_text(entry["id"], 32), mode, fan,
+        )
+    SHM_SEQ.pack_into(mm, off, (seq + 2) & 0xFFFFFFFF)
+
+def _shm_publish(entry: Dict[str, Any]):
+    """장치 1개를 테이블에 제자리 갱신 (devices_lock 하에서 호출)"""
+    global _shm_full_warned
+    if _shm_map is None:
+        return
+    slot = _shm_slots.get(entry["id"])
+    if slot is None:
+        cap, count = SHM_HEADER.unpack_from(_shm_map, 0)[3:5]
+        if _shm_free:
+            slot = _shm_free.pop()
+        elif count < cap:
+            slot = count
+            SHM_COUNT.pack_into(_shm_map, SHM_COUNT_OFFSET, count + 1)
+        else:
+            if not _shm_full_warned:
+                print(f"[Registry] shared table full ({cap}); raise REGISTRY_SHM_CAPACITY")
+                _shm_full_warned = True
+            return
+        _shm_slots[entry["id"]] = slot
+    _shm_write(slot, entry)
+    SHM_VERSION.pack_into(_shm_map, SHM_VERSION_OFFSET, registry_version, clock.time())
+
+def _shm_remove(dev_id: str):
+    if _shm_map is None:
+        return
+    slot = _shm_slots.pop(dev_id, None)
+    if slot is not None:
+        _shm_write(slot, None)
+        _shm_free.append(slot)
+
+# ========================
+# 네트워크 인터페이스 / discover 대상
+# ========================
+def _iface_entry(name: str, ip: str, prefix: int) -> Dict[str, Any] | None:
+    try:
+        iface = ipaddress.IPv4Interface(f"{ip}/{prefix}")
+    except ValueError:
+        return None
+    if iface.ip.is_loopback or iface.ip.is_link_local:
+        return None
+    return {
+        "name": name,
+        "ip": str(iface.ip),
+        "prefix": iface.network.prefixlen,
+        "network": str(iface.network),
+        "broadcast": str(iface.network.broadcast_address),
+    }
+
+def _ifaces_from_psutil() -> list[Dict[str, Any]]:
+    result = []
+    import psutil
+    for name, addrs in psutil.net_if_addrs().items():
+        for a in addrs:
+            if a.family != socket.AF_INET or not a.netmask:
+                continue
+            prefix = ipaddress.IPv4Network(f"0.0.0.0/{a.netmask}").prefixlen
+            entry = _iface_entry(name, a.address, prefix)
+            if entry:
+                result.append(entry)
+    return result
+
+def _ifaces_from_ip_cmd() -> list[Dict[str, Any]]:
+    # 예: "2: eth0    inet 192.168.0.5/24 brd 192.168.0.255 scope global eth0"
+    proc = subprocess.run(["ip", "-o", "-4", "addr", "show"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=3)
+    result = []
+    for line in proc.stdout.splitlines():
+        m = re.search(r"^\d+:\s+(\S+)\s+inet\s+(\d+\.\d+\.\d+\.\d+)/(\d+)", line)
+        if m:
+            entry = _iface_entry(m.group(1), m.group(2), int(m.group(3)))
+            if entry:
+                result.append(entry)
+    return result
+
+def _ifaces_from_ifconfig() -> list[Dict[str, Any]]:
+    # 예(macOS): "inet 192.168.0.5 netmask 0xffffff00 broadcast 192.168.0.255"
+    proc = subprocess.run(["ifconfig"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=3)
+    result = []
+    name = ""
+    for line in proc.stdout.splitlines():
+        if line and not line[0].isspace():
+            name = line.split(":", 1)[0]
+            continue
+        m = re.search(r"inet (?:addr:)?(\d+\.\d+\.\d+\.\d+)\s+.*?(?:netmask|Mask:)\s*(0x[0-9a-fA-F]+|\d+\.\d+\.\d+\.\d+)", line)
+        if not m:
+            continue
+        mask = m.group(2)
+        if mask.startswith("0x"):
+            mask = str(ipaddress.IPv4Address(int(mask, 16)))
+        prefix = ipaddress.IPv4Network(f"0.0.0.0/{mask}").prefixlen
+        entry = _iface_entry(name, m.group(1), prefix)
+        if entry:
+            result.append(entry)
+    return result
+
+# 넷마스크를 알 수 없는 주소(socket fallback)에 가정할 prefix
+IFACE_FALLBACK_PREFIX = int(os.getenv("IFACE_FALLBACK_PREFIX", "24"))
+
+def _ifaces_from_socket() -> list[Dict[str, Any]]:
+    # psutil/ip/ifconfig가 없는 환경(주로 Windows)용: 호스트 이름의 주소 + 기본 경로의 주소
+    # 넷마스크는 알 수 없어 IFACE_FALLBACK_PREFIX(기본 /24)로 가정
+    ips = []
+    try:
+        for info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET):
+            ips.append(info[4][0])
+    except OSError:
+        pass
+    try:
+        # UDP connect는 패킷을 보내지 않고 경로만 정함 (외부 연결 불필요)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("10.255.255.255", 1))
+            ips.append(s.getsockname()[0])
+    except OSError:
+        pass
+    result = []
+    for ip in dict.fromkeys(ips):
+        entry = _iface_entry("host", ip, IFACE_FALLBACK_PREFIX)
+        if entry:
+            result.append(entry)
+    return result
+
+_iface_warned = False
+
+def list_ipv4_interfaces() -> list[Dict[str, Any]]:
+    """IPv4 인터페이스와 서브넷 목록 (loopback/link-local 제외)"""
+    global _iface_warned
+    sources = []
+    if PSUTIL_AVAILABLE:
+        sources.append(_ifaces_from_psutil)
+    if shutil.which("ip"):
+        sources.append(_ifaces_from_ip_cmd)
+    if shutil.which("ifconfig"):
+        sources.append(_ifaces_from_ifconfig)
+    sources.append(_ifaces_from_socket)
+    for source in sources:
+        try:
+            ifaces = source()
+        except Exception as e:
+            print(f"[Net] interface enumeration failed ({source.__name__}): {e}")
+            continue
+        if ifaces:
+            if source is _ifaces_from_socket and not _iface_warned:
+                _iface_warned = True
+                print(f"[Net] WARNING: psutil/ip/ifconfig 없이 주소만 확인, /{IFACE_FALLBACK_PREFIX} 서브넷으로 가정합니다 "
+                      f"(pip install psutil 권장): {[i['network'] for i in ifaces]}")
+            return ifaces
+    if not _iface_warned:
+        _iface_warned = True
+        print("[Net] WARNING: 네트워크 인터페이스를 찾지 못했습니다. discover는 255.255.255.255로만 보내고 "
+              "자기 에코 필터(udp_own_ips)가 비활성됩니다. psutil을 설치하거나 DISCOVERY_SUBNETS를 지정하세요.")
+    return []
+
+def _parse_subnet_intervals(spec: str) -> Dict[str, int]:
+    result: Dict[str, int] = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        net, sec = item.split("=", 1)
+        try:
+            result[str(ipaddress.IPv4Network(net.strip(), strict=False))] = int(sec)
+        except ValueError:
+            print(f"[UDP] invalid DISCOVERY_SUBNET_INTERVALS entry: {item}")
+    return result
+
+def build_discover_targets() -> list[Dict[str, Any]]:
+    """서브넷별 directed broadcast 대상 목록 생성"""
+    intervals = _parse_subnet_intervals(DISCOVERY_SUBNET_INTERVALS)
+    broadcast_interval = tuning.discovery_broadcast_interval_sec
+    networks: list[ipaddress.IPv4Network] = []
+    if DISCOVERY_SUBNETS.strip():
+        for item in DISCOVERY_SUBNETS.split(","):
+            if not item.strip():
+                continue
+            try:
+                networks.append(ipaddress.IPv4Network(item.strip(), strict=False))
+            except ValueError:
+                print(f"[UDP] invalid DISCOVERY_SUBNETS entry: {item}")
+    else:
+        networks = [ipaddress.IPv4Network(i["network"]) for i in list_ipv4_interfaces()]
+
+    targets: list[Dict[str, Any]] = []
+    seen = set()
+    for net in networks:
+        # /31, /32 는 브로드캐스트 주소가 없음
+        if net.prefixlen >= 31 or str(net) in seen:
+            continue
+        seen.add(str(net))
+        targets.append({
+            "subnet": str(net),
+            "addr": str(net.broadcast_address),
+            "interval_sec": intervals.get(str(net), broadcast_interval),
+            # 서브넷별 주기를 직접 지정한 대상은 적응형 주기를 따르지 않음
+            "fixed": str(net) in intervals,
+            "last_sent": 0.0,
+        })
+    if not targets or DISCOVERY_LIMITED_BROADCAST:
+        targets.append({
+            "subnet": "limited",
+            "addr": "255.255.255.255",
+            "interval_sec": broadcast_interval,
+            "fixed": False,
+            "last_sent": 0.0,
+        })
+    return targets
+
+# udp_listener가 관리하는 discover 대상/전송 통계 (/discovery 조회용)
+discovery_targets: list[Dict[str, Any]] = []
+discovery_stats: Dict[str, int] = {"broadcast_packets": 0, "unicast_packets": 0, "udp_responses": 0, "put_status": 0, "wire_packets": 0, "wire_stale": 0}
+# 적응형 discover 상태 (plan_discovery_round가 갱신)
+discovery_state: Dict[str, Any] = {
+    "round": 0,
+    "interval_sec": tuning.discovery_min_interval_sec,
+    "stable_rounds": 0,
+    "known_ids": set(),
+    "last_round_at": 0.0,
+    "next_round_at": 0.0,
+    "started_at": None,
+    "last_plan": None,
+}
+
+def plan_discovery_round(state: Dict[str, Any], now: float, last_seen: Dict[str, float]) -> Dict[str, Any]:
+    """적응형 discover 1라운드 계획 (state 갱신, 전송은 하지 않음)
+    - 시작 직후 DISCOVERY_WARMUP_ROUNDS 라운드, 또는 신규 장치 발견 시: 최소 주기
+    - 직전 라운드 이후 응답/푸시가 없는 장치가 있으면: 주기 절반 + 해당 장치로 유니캐스트
+    - 변동이 없으면: 주기 2배 (DISCOVERY_MAX_INTERVAL_SEC까지)
+    """
+    t = tuning
+    prev_at = state.get("last_round_at") or 0.0
+    known = state.get("known_ids") or set()
+    current = set(last_seen)
+    new_ids = sorted(current - known) if state["round"] > 0 else []
+    gone = sorted(known - current)
+    # 오래전에 사라진 장치(DEVICE_TIMEOUT_SEC 초과)는 변동으로 보지 않음
+    missing = sorted(
+        dev_id for dev_id, ts in last_seen.items()
+        if prev_at and ts < prev_at and now - ts <= t.device_timeout_sec
+    )
+    state["round"] += 1
+    if state.get("started_at") is None:
+        state["started_at"] = now
+    interval = state.get("interval_sec") or t.discovery_min_interval_sec
+    if state["round"] <= t.discovery_warmup_rounds or new_ids or gone:
+        interval = t.discovery_min_interval_sec
+        state["stable_rounds"] = 0
+    elif missing:
+        interval = max(t.discovery_min_interval_sec, interval // 2)
+        state["stable_rounds"] = 0
+    else:
+        interval = min(t.discovery_max_interval_sec, max(t.discovery_min_interval_sec, interval * 2))
+        state["stable_rounds"] += 1
+    state["interval_sec"] = interval
+    state["known_ids"] = current
+    state["last_round_at"] = now
+    state["next_round_at"] = now + interval
+    plan = {"round": state["round"], "interval_sec": interval, "new": new_ids, "missing": missing, "gone": gone}
+    state["last_plan"] = plan
+    return plan
+
+def discovery_load_report(state: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """고정 주기(DISCOVERY_INTERVAL_SEC) 대비 discover 라운드 절감률"""
+    started = state.get("started_at")
+    if not started:
+        return {"rounds": 0, "fixed_rounds": 0, "reduction_pct": 0.0}
+    fixed_rounds = int((now - started) // max(1, tuning.discovery_interval_sec)) + 1
+    rounds = state["round"]
+    return {
+        "rounds": rounds,
+        "fixed_rounds": fixed_rounds,
+        # 모듈은 discover마다 put_status를 1회 보내므로 put_status 절감률도 동일
+        "reduction_pct": round(100.0 * (1.0 - rounds / fixed_rounds), 1) if fixed_rounds else 0.0,
+    }
+
+def _discover_payloads() -> list[bytes]:
+    # http_port 힌트를 포함한 JSON (구형 호환을 위해 평문 discover도 함께 전송)
+    # wire: 서버가 받을 수 있는 바이너리 상태 형식 버전. 지원 펌웨어는 이 버전으로 UDP 응답
+    op: Dict[str, Any] = {"op": "discover", "http_port": SERVER_PORT}
+    if WIRE_ENABLED:
+        op["wire"] = WIRE_VERSION
+    return [
+        json.dumps(op, separators=(",", ":")).encode("utf-8"),
+        b"discover",
+    ]
+
+def _send_discover(sock: socket.socket, addr: str, kind: str) -> None:
+    for payload in _discover_payloads():
+        try:
+            sock.sendto(payload, (addr, DEVICE_UDP_PORT))
+            discovery_stats[f"{kind}_packets"] += 1
+        except Exception as se:
+            print(f"[UDP] discover send error ({addr}):", se)
+
+# ========================
+# 상태 바이너리 형식 (discover 응답 UDP / put_status 본문)
+# ========================
+# JSON 대신 고정 헤더 + id/group 문자열. 서버가 discover의 "wire"로 지원 버전을 알리고,
+# 펌웨어는 그 버전 이하로만 보냄 (wire가 없는 discover/평문 discover에는 기존 JSON)
+WIRE_ENABLED = os.getenv("WIRE_ENABLED", "1").lower() in ("1", "true", "yes")
+WIRE_MAGIC = b"AS"
+WIRE_VERSION = 1
+# magic, version, flags, seq, ip, port, udp_port, temp, mode, fan, room_temp x10, id 길이 (뒤에 id, group 길이, group)
+_WIRE_HEADER = struct.Struct("!2sBBI4sHHBBBhB")
+_WIRE_FLAG_POWER = 0x01
+_WIRE_FLAG_SWING = 0x02
+_WIRE_FLAG_STATE = 0x04
+_WIRE_MODES = ("cool", "hot")
+_WIRE_FANS = ("auto", "low", "medium", "high")
+_WIRE_NO_ROOM = -32768
+# 이 범위 안에서 직전 seq보다 작거나 같으면 중복/순서 뒤바뀐 패킷으로 보고 무시 (재부팅으로 seq가 바뀐 경우는 허용)
+_WIRE_SEQ_WINDOW = 16
+
+def encode_wire_status(dev_id: str, ip: str, port: int, state: Dict[str, Any] | None, seq: int,
+                       udp_port: int = 0, group: str = "") -> bytes:
+    """상태 1건을 바이너리 형식으로 (펌웨어 pushStatusWire와 같은 배치, 중계기/테스트용)"""
+    flags = 0
+    temp = mode = fan = 0
+    room = _WIRE_NO_ROOM
+    if state:
+        flags |= _WIRE_FLAG_STATE
+        if state.get("power"):
+            flags |= _WIRE_FLAG_POWER
+        if state.get("swing") in (True, "on", 1, "1", "true"):
+            flags |= _WIRE_FLAG_SWING
+        temp = int(state.get("temp") or 0)
+        mode = 1 if state.get("mode") == "hot" else 0
+        fan = _WIRE_FANS.index(state["fan"]) if state.get("fan") in _WIRE_FANS else 0
+        if state.get("room_temp") is not None:
+            room = int(round(float(state["room_temp"]) * 10))
+    raw_id = dev_id.encode("utf-8")[:255]
+    raw_group = group.encode("utf-8")[:255]
+    header = _WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, flags, seq & 0xFFFFFFFF, socket.inet_aton(ip),
+                               port, udp_port, temp, mode, fan, room, len(raw_id))
+    return header + raw_id + bytes([len(raw_group)]) + raw_group
+
+def decode_wire_status(data: bytes):
+    """바이너리 상태 → (id, ip, port, udp_port, group, seq, state). 형식/버전이 맞지 않으면 None
+    memoryview에서 바로 unpack (JSON 파싱, 중간 dict 없음). 모르는 상위 버전은 v1 헤더까지만 읽음"""
+    view = memoryview(data)
+    size = len(view)
+    if size < _WIRE_HEADER.size:
+        return None
+    magic, version, flags, seq, ip, port, udp_port, temp, mode, fan, room, id_len = _WIRE_HEADER.unpack_from(view, 0)
+    if magic != WIRE_MAGIC or version < 1:
+        return None
+    pos = _WIRE_HEADER.size + id_len
+    if id_len == 0 or pos > size:
+        return None
+    dev_id = bytes(view[_WIRE_HEADER.size:pos]).decode("utf-8", "replace")
+    group = ""
+    if pos < size:
+        group_len = view[pos]
+        group = bytes(view[pos + 1:pos + 1 + group_len]).decode("utf-8", "replace")
+    state = None
+    if flags & _WIRE_FLAG_STATE:
+        state = {
+            "power": bool(flags & _WIRE_FLAG_POWER),
+            "mode": _WIRE_MODES[mode] if mode < len(_WIRE_MODES) else "cool",
+            "temp": temp,
+            "fan": _WIRE_FANS[fan] if fan < len(_WIRE_FANS) else "auto",
+            "swing": bool(flags & _WIRE_FLAG_SWING),
+            "room_temp": None if room == _WIRE_NO_ROOM else room / 10.0,
+        }
+    return dev_id, socket.inet_ntoa(ip), port, udp_port, group, seq, state
+
+def _wire_item(decoded: tuple, src_ip: str | None) -> tuple | None:
+    """decode_wire_status 결과 → 상태 반영 항목 (id, state, ip, port, udp_port, group, seq). 상태가 없으면 None"""
+    dev_id, ip, port, udp_port, group, seq, state = decoded
+    if state is None:
+        return None
+    return (dev_id, state, src_ip if ip == "0.0.0.0" else ip, port, udp_port, group, seq)
+
+def apply_wire_status(decoded: tuple, src_ip: str | None) -> str | None:
+    """decode_wire_status 결과 1건을 장치 목록에 반영 (팔로워는 리더로 전달). 반영된 장치 id 반환"""
+    discovery_stats["wire_packets"] += 1
+    item = _wire_item(decoded, src_ip)
+    if item is None:
+        return None
+    dev_id, state, ip, port, udp_port, group, seq = item
+    if cluster_state["role"] == "follower":
+        resp = cluster_call("ingest", id=dev_id, state=state, ip=ip, port=port, udp_port=udp_port, group=group, seq=seq)
+        return dev_id if (resp or {}).get("ok") else None
+    return dev_id if apply_status_report(dev_id, state, ip, port, udp_port, group, seq) else None
+
+# ========================
+# UDP 수신 전처리 (JSON 디코드 전에 자기 패킷/잡음 제거)
+# ========================
+# 수신 포트(4210)에는 서버 자신이 보낸 discover/그룹 명령 브로드캐스트와 다른 시스템의 패킷도 들어옴
+UDP_PREFILTER_ENABLED = os.getenv("UDP_PREFILTER_ENABLED", "1").lower() in ("1", "true", "yes")
+UDP_PACKET_MIN_BYTES = 10      # 가장 짧은 응답 {"id":"x"}
+UDP_PACKET_MAX_BYTES = int(os.getenv("UDP_PACKET_MAX_BYTES", "1024"))
+# 응답이 아닌 것이 확실한 페이로드 (서버/다른 서버가 보내는 discover, whois, 명령)
+_UDP_NON_RESPONSE_PREFIXES = (b'{"op":"discover"', b'{"op": "discover"', b'{"op":"set"', b"discover", b"whois")
+# 자기 인터페이스 주소 (udp_listener가 discover 대상을 다시 만들 때 갱신)
+udp_own_ips: frozenset = frozenset()
+udp_drop_stats: Dict[str, int] = {"self": 0, "non_response": 0, "too_small": 0, "too_large": 0, "unknown_format": 0}
+
+def refresh_udp_own_ips() -> frozenset:
+    global udp_own_ips
+    udp_own_ips = frozenset(i["ip"] for i in list_ipv4_interfaces())
+    return udp_own_ips
+
+def udp_prefilter(data: bytes, src_ip: str) -> str | None:
+    """버릴 패킷이면 이유, 처리할 패킷이면 None (앞 몇 바이트와 길이만 봄)"""
+    size = len(data)
+    if size > UDP_PACKET_MAX_BYTES:
+        return "too_large"
+    if src_ip in udp_own_ips:
+        return "self"
+    if data.startswith(_UDP_NON_RESPONSE_PREFIXES):
+        return "non_response"
+    if size < UDP_PACKET_MIN_BYTES:
+        return "too_small"
+    # 모듈 응답은 JSON 객체 또는 바이너리 형식뿐
+    if data[0] != 0x7B and data[:2] != WIRE_MAGIC:
+        return "unknown_format"
+    return None
 
 # ========================
 # UDP 수신 스레드
 # ========================
+def _handle_udp_packet(data: bytes, addr) -> str | None:
+    """discover 응답 패킷 1개를 장치 목록에 반영. 반영된 장치 id 반환"""
+    if UDP_PREFILTER_ENABLED:
+        reason = udp_prefilter(data, addr[0])
+        if reason is not None:
+            udp_drop_stats[reason] += 1
+            return None
+    if data[:2] == WIRE_MAGIC:
+        decoded = decode_wire_status(data)
+        return apply_wire_status(decoded, addr[0]) if decoded is not None else None
+    try:
+        msg = json.loads(data.decode("utf-8").strip())
+    except Exception:
+        # JSON이 아니면 무시 (예: 타 시스템 패킷)
+        return None
+    if not isinstance(msg, dict):
+        return None
+    dev_id = msg.get("id")
+    if not dev_id:
+        return None
+    discovery_stats["udp_responses"] += 1
+    with devices_lock:
+        old = devices.get(dev_id, {})
+        entry = old.copy()
+        entry.pop("unverified", None)
+        entry.pop("restored_at", None)
+        entry.update({
+            "id": dev_id,
+            "ip": msg.get("ip", addr[0]),
+            "port": int(msg.get("port", 80)),
+            "last_seen": clock.time(),
+        })
+        # 상태 캐시 수신 시 저장
+        if "state" in msg and isinstance(msg.get("state"), dict):
+            entry["state"] = msg.get("state")
+            entry["state_last_seen"] = clock.time()
+        _apply_capabilities(entry, msg.get("udp_port"), msg.get("group"))
+        _bump_rev(old, entry)
+        devices[dev_id] = entry
+        _shm_publish(entry)
+    # 응답 로그 출력
+    try:
+        st = msg.get("state") if isinstance(msg.get("state"), dict) else None
+        has_state = "yes" if st else "no"
+        power = None if not st else ("on" if st.get("power") else "off")
+        mode = None if not st else st.get("mode")
+        temp = None if not st else st.get("temp")
+        extra = ""
+        if st is not None:
+            extra = f" power={power} mode={mode} temp={temp}"
+        print(f"[UDP] resp id={dev_id} from {entry['ip']}:{entry['port']} state={has_state}{extra}")
+    except Exception:
+        pass
+    return dev_id
+
+
 def udp_listener():
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     # 브로드캐스트 활성화 및 타임아웃 설정
@@ -136,47 +1317,21 @@ def udp_listener():
     except Exception:
         pass
     sock.bind((UDP_LISTEN_IP, UDP_LISTEN_PORT))
-    print(f"[UDP] Listening on port {UDP_LISTEN_PORT} (broadcast discover every {DISCOVERY_INTERVAL_SEC}s)")
+    print(f"[UDP] Listening on port {UDP_LISTEN_PORT} (broadcast discover every {tuning.discovery_broadcast_interval_sec}s)")
 
-    last_discover = 0.0
+    targets_built_at = 0.0
+    last_sweep = 0.0
 
-    while True:
+    # 웜 스타트: 저장된 장치 목록을 복원하고, 해당 장치들로 즉시 유니캐스트 discover
+    if REGISTRY_SNAPSHOT_ENABLED:
+        for entry in load_registry_snapshot():
+            _send_discover(sock, entry["ip"], "unicast")
+
+    while not _shutdown_event.is_set():
         try:
-            data, addr = sock.recvfrom(2048)
-            try:
-                msg = json.loads(data.decode("utf-8").strip())
-            except Exception:
-                # JSON이 아니면 무시 (예: 타 시스템 패킷)
-                msg = None
-            if msg:
-                dev_id = msg.get("id")
-                if dev_id:
-                    with devices_lock:
-                        entry = devices.get(dev_id, {}).copy()
-                        entry.update({
-                            "id": dev_id,
-                            "ip": msg.get("ip", addr[0]),
-                            "port": int(msg.get("port", 80)),
-                            "last_seen": time.time(),
-                        })
-                        # 상태 캐시 수신 시 저장
-                        if "state" in msg and isinstance(msg.get("state"), dict):
-                            entry["state"] = msg.get("state")
-                            entry["state_last_seen"] = time.time()
-                        devices[dev_id] = entry
-                        # 응답 로그 출력
-                        try:
-                            st = msg.get("state") if isinstance(msg.get("state"), dict) else None
-                            has_state = "yes" if st else "no"
-                            power = None if not st else ("on" if st.get("power") else "off")
-                            mode = None if not st else st.get("mode")
-                            temp = None if not st else st.get("temp")
-                            extra = ""
-                            if st is not None:
-                                extra = f" power={power} mode={mode} temp={temp}"
-                            print(f"[UDP] resp id={dev_id} from {entry['ip']}:{entry['port']} state={has_state}{extra}")
-                        except Exception:
-                            pass
+            # 최대 크기보다 1바이트 크게 받아 잘린 대형 패킷도 too_large로 구분
+            data, addr = sock.recvfrom(max(2048, UDP_PACKET_MAX_BYTES + 1))
+            _handle_udp_packet(data, addr)
         except Exception as e:
             # 타임아웃은 조용히 무시
             if isinstance(e, socket.timeout):
@@ -184,21 +1339,73 @@ def udp_listener():
             else:
                 print("[UDP] error:", e)
 
-        # 주기적으로 discover 브로드캐스트 전송
-        now = time.time()
-        if now - last_discover >= DISCOVERY_INTERVAL_SEC:
-            try:
-                # http_port 힌트를 포함한 JSON 브로드캐스트 (구형 호환을 위해 평문 discover도 허용)
-                msg = json.dumps({"op": "discover", "http_port": SERVER_PORT}).encode("utf-8")
-                sock.sendto(msg, ("255.255.255.255", UDP_LISTEN_PORT))
-                # 구형 호환: 단순 문자열도 함께 송신 (선택)
+        now = clock.time()
+        # 이번 반복에서 쓸 설정 (다시 읽기로 바뀌어도 반복 중에는 같은 값)
+        cfg = tuning
+        if discovery_reconfigure.is_set():
+            # discover 설정 변경: 대상 주기를 새 값으로 다시 만들고, 적응형 주기를 새 범위로 맞춤
+            discovery_reconfigure.clear()
+            targets_built_at = 0.0
+            interval = min(cfg.discovery_max_interval_sec, max(cfg.discovery_min_interval_sec, discovery_state["interval_sec"]))
+            discovery_state["interval_sec"] = interval
+            discovery_state["next_round_at"] = min(discovery_state["next_round_at"], discovery_state["last_round_at"] + interval)
+        # 인터페이스/서브넷 주기적 재탐색 (기존 대상의 마지막 전송 시각은 유지)
+        if now - targets_built_at >= DISCOVERY_IFACE_REFRESH_SEC:
+            previous = {t["subnet"]: t["last_sent"] for t in discovery_targets}
+            targets = build_discover_targets()
+            refresh_udp_own_ips()
+            for t in targets:
+                t["last_sent"] = previous.get(t["subnet"], 0.0)
+            if [t["subnet"] for t in targets] != list(previous.keys()):
+                print("[UDP] discover targets: " + ", ".join(f"{t['subnet']}->{t['addr']} ({t['interval_sec']}s)" for t in targets))
+            discovery_targets[:] = targets
+            targets_built_at = now
+
+        # 서브넷별 주기에 맞춰 directed broadcast 전송 (적응형이면 주기 고정 대상만)
+        for t in discovery_targets:
+            if cfg.discovery_adaptive and not t.get("fixed"):
+                continue
+            if now - t["last_sent"] >= t["interval_sec"]:
+                _send_discover(sock, t["addr"], "broadcast")
+                t["last_sent"] = now
+
+        # 적응형 라운드: 변동에 따라 주기를 조절하고, 누락 장치는 유니캐스트로 재확인
+        if cfg.discovery_adaptive and now >= discovery_state["next_round_at"]:
+            # 주기 고정 서브넷의 장치는 자체 주기로 discover 되므로 변동 판단에서 제외
+            fixed_nets = [ipaddress.IPv4Network(t["subnet"]) for t in discovery_targets if t.get("fixed")]
+            with devices_lock:
+                snapshot = [(k, float(v.get("last_seen") or 0.0), v.get("ip")) for k, v in devices.items()]
+            seen: Dict[str, float] = {}
+            ips: Dict[str, str] = {}
+            for dev_id, ts, ip in snapshot:
                 try:
-                    sock.sendto(b"discover", ("255.255.255.255", UDP_LISTEN_PORT))
-                except Exception:
+                    if fixed_nets and ip and any(ipaddress.IPv4Address(ip) in n for n in fixed_nets):
+                        continue
+                except ValueError:
                     pass
-            except Exception as se:
-                print("[UDP] discover send error:", se)
-            last_discover = now
+                seen[dev_id] = ts
+                ips[dev_id] = ip
+            prev_interval = discovery_state["interval_sec"]
+            plan = plan_discovery_round(discovery_state, now, seen)
+            for t in discovery_targets:
+                if not t.get("fixed"):
+                    _send_discover(sock, t["addr"], "broadcast")
+                    t["last_sent"] = now
+            for dev_id in plan["missing"]:
+                if ips.get(dev_id):
+                    _send_discover(sock, ips[dev_id], "unicast")
+            if plan["interval_sec"] != prev_interval:
+                print(f"[UDP] adaptive discover interval {prev_interval}s -> {plan['interval_sec']}s (new={len(plan['new'])} missing={len(plan['missing'])} gone={len(plan['gone'])})")
+
+        # 알려진 장치로 유니캐스트 discover (브로드캐스트보다 짧은 주기로 빠르게 재확인)
+        if cfg.discovery_unicast_sweep and now - last_sweep >= cfg.discovery_interval_sec:
+            with devices_lock:
+                known_ips = {d.get("ip") for d in devices.values() if d.get("ip")}
+            for ip in known_ips:
+                _send_discover(sock, ip, "unicast")
+            last_sweep = now
+    sock.close()
+    print("[UDP] listener stopped")
 
 
 # ========================
@@ -209,24 +1416,285 @@ def compute_broadcast_health(dev: Dict[str, Any]) -> Dict[str, Any]:
     last_seen = dev.get("last_seen")
     if not last_seen:
         return {"ok": False, "error": "no_recent_response", "age_sec": None, "method": "broadcast"}
-    age = int(max(0, time.time() - float(last_seen)))
-    return {
-        "ok": age <= HEALTH_OK_MAX_AGE_SEC,
+    age = int(max(0, clock.time() - float(last_seen)))
+    threshold = tuning.health_ok_max_age_sec
+    health = {
+        "ok": age <= threshold,
         "age_sec": age,
-        "threshold_sec": HEALTH_OK_MAX_AGE_SEC,
+        "threshold_sec": threshold,
         "method": "broadcast",
     }
+    if dev.get("unverified"):
+        # 스냅샷에서 복원된 뒤 아직 응답이 없는 장치
+        health["unverified"] = True
+    h = health_scores.get(dev["id"])
+    if h is not None and h.get("score") is not None:
+        health["score"] = h["score"]
+        health["success_rate"] = round(h["success"], 3)
+        health["latency_ms"] = None if h["latency_ms"] is None else round(h["latency_ms"], 1)
+        # 브로드캐스트 응답이 끊겨도 최근 점검/명령이 성공했으면 정상
+        last_ok = h.get("last_ok")
+        if not health["ok"] and not h["fails_in_row"] and last_ok and clock.time() - last_ok <= threshold:
+            health["ok"] = True
+            health["method"] = "probe"
+    return health
 
 
- 
+# ========================
+# UDP 명령 채널 (HTTP /ac/set 대신 UDP 1패킷, ack 없으면 HTTP로 전송)
+# ========================
+# 펌웨어가 put_status에 udp_port를 알린 장치에만 사용. 서버 → 장치 {"op":"set","seq":N,"to":id,...}
+# 장치 → 서버 {"op":"ack","seq":N,"id":id,"state":{...}}. 같은 seq 재전송은 장치가 IR 없이 ack만 다시 보냄
+UDP_COMMANDS_ENABLED = os.getenv("UDP_COMMANDS_ENABLED", "0").lower() in ("1", "true", "yes")
+UDP_CMD_ATTEMPTS = int(os.getenv("UDP_CMD_ATTEMPTS", "3"))                  # 총 전송 횟수 (재전송 포함)
+UDP_CMD_ACK_TIMEOUT_SEC = float(os.getenv("UDP_CMD_ACK_TIMEOUT_SEC", "0.3"))  # 첫 ack 대기, 재전송마다 2배
+# 그룹 명령(브로드캐스트 1패킷) 전송마다 전체 ack를 기다리는 시간
+UDP_CMD_GROUP_WAIT_SEC = float(os.getenv("UDP_CMD_GROUP_WAIT_SEC", "1.0"))
+# 그룹 명령을 보낼 주소 (쉼표 구분 "주소[:포트]", 멀티캐스트 주소 가능). 비우면 discover 대상 브로드캐스트 주소
+UDP_CMD_GROUP_ADDRS = os.getenv("UDP_CMD_GROUP_ADDRS", "")
+
+udp_cmd_lock = threading.Lock()
+_udp_cmd_sock: socket.socket | None = None
+_udp_cmd_thread: threading.Thread | None = None
+# 재시작 후 장치에 남은 마지막 seq와 겹치지 않도록 임의 값에서 시작
+_udp_cmd_seq = itertools.count(random.randint(1, 1 << 30))
+# seq -> {"expect": ack를 기다리는 장치 id 집합, "acks": {id: state}, "event": 전부 도착 시 set}
+_udp_cmd_waiters: Dict[int, Dict[str, Any]] = {}
+udp_cmd_stats: Dict[str, int] = {"sent": 0, "retransmits": 0, "group_sent": 0, "acks": 0, "late_acks": 0, "fallbacks": 0}
+
+def _udp_cmd_socket() -> socket.socket:
+    """명령 전송용 소켓 (임시 포트). 처음 사용할 때 만들고 ack 수신 스레드를 시작"""
+    global _udp_cmd_sock, _udp_cmd_thread
+    with udp_cmd_lock:
+        if _udp_cmd_sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.settimeout(0.5)
+            sock.bind((UDP_LISTEN_IP, 0))
+            _udp_cmd_sock = sock
+            _udp_cmd_thread = threading.Thread(target=_udp_cmd_recv_loop, args=(sock,), daemon=True)
+            _udp_cmd_thread.start()
+        return _udp_cmd_sock
+
+def _udp_cmd_payload(seq: int, params: Dict[str, Any], to: str | None = None, group: str | None = None) -> bytes:
+    msg: Dict[str, Any] = {"op": "set", "seq": seq}
+    if group:
+        msg["group"] = group
+    else:
+        msg["to"] = to or "*"
+    msg.update(params)
+    return json.dumps(msg, separators=(",", ":")).encode("utf-8")
+
+def _apply_observed_state(dev_id: str, state: Dict[str, Any]) -> None:
+    # 장치가 직접 알려준 상태(명령 ack, HTTP 상태 조회)를 바로 반영 (팔로워는 리더로 전달)
+    if cluster_state["role"] == "follower":
+        with devices_lock:
+            dev = devices.get(dev_id)
+        if dev is not None:
+            cluster_call("ingest", id=dev_id, state=state, ip=dev.get("ip"), port=dev.get("port") or 80,
+                         udp_port=dev.get("udp_port"), group=dev.get("group"))
+        return
+    now = clock.time()
+    with devices_lock:
+        old = devices.get(dev_id)
+        if old is None:
+            return
+        entry = old.copy()
+        entry.pop("unverified", None)
+        entry.pop("restored_at", None)
+        entry.update({"state": state, "state_last_seen": now, "last_seen": now})
+        _bump_rev(old, entry)
+        devices[dev_id] = entry
+        _shm_publish(entry)
+
+def _udp_cmd_recv_loop(sock: socket.socket):
+    while not _shutdown_event.is_set():
+        try:
+            data, _addr = sock.recvfrom(2048)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            continue
+        if not isinstance(msg, dict) or msg.get("op") != "ack" or not msg.get("id"):
+            continue
+        dev_id = str(msg["id"])
+        with udp_cmd_lock:
+            waiter = _udp_cmd_waiters.get(msg.get("seq"))
+            if waiter is None or dev_id not in waiter["expect"]:
+                udp_cmd_stats["late_acks"] += 1
+                continue
+            udp_cmd_stats["acks"] += 1
+            waiter["acks"][dev_id] = msg.get("state")
+            if len(waiter["acks"]) >= len(waiter["expect"]):
+                waiter["event"].set()
+        if isinstance(msg.get("state"), dict):
+            _apply_observed_state(dev_id, msg["state"])
+
+def _udp_cmd_begin(expect: set[str], lane: str | None = None) -> tuple[int, Dict[str, Any]]:
+    # lane: 그룹 명령만 지정 (디스패처를 거치지 않으므로 선점은 _udp_group_preempt로)
+    seq = next(_udp_cmd_seq) & 0xFFFFFFFF
+    waiter = {"expect": expect, "acks": {}, "event": threading.Event(), "lane": lane, "preempted": {}}
+    with udp_cmd_lock:
+        _udp_cmd_waiters[seq] = waiter
+    return seq, waiter
+
+def _udp_group_preempt(dev_id: str, lane: str) -> None:
+    """더 높은 lane 명령이 들어온 장치를 진행 중인 하위 lane 그룹 명령에서 제외 (dispatch_lock 하에서 호출)
+    그룹 명령은 브로드캐스트라 특정 장치만 빼고 재전송할 수 없으므로, 그룹 루프는 이를 보고 재전송을 멈춤"""
+    rank = DISPATCH_LANES.index(lane)
+    with udp_cmd_lock:
+        for waiter in _udp_cmd_waiters.values():
+            group_lane = waiter["lane"]
+            if group_lane is None or DISPATCH_LANES.index(group_lane) <= rank:
+                continue
+            if dev_id in waiter["expect"] and dev_id not in waiter["acks"]:
+                waiter["expect"].discard(dev_id)
+                waiter["preempted"][dev_id] = lane
+                waiter["event"].set()
+
+def _udp_cmd_end(seq: int):
+    with udp_cmd_lock:
+        _udp_cmd_waiters.pop(seq, None)
+
+def udp_send_command(dev: Dict[str, Any], params: Dict[str, Any],
+                     cancel: threading.Event | None = None) -> Dict[str, Any] | None:
+    """장치 1대에 UDP 명령 전송 (ack 없으면 간격을 늘려 재전송). ack를 받으면 결과, 끝내 없으면 None
+    cancel이 set되면(선점) 재전송을 멈추고 preempted 결과 반환 (HTTP로 넘기지 않음)"""
+    sock = _udp_cmd_socket()
+    addr = (dev["ip"], int(dev["udp_port"]))
+    seq, waiter = _udp_cmd_begin({dev["id"]})
+    payload = _udp_cmd_payload(seq, params, to=dev["id"])
+    results = []
+    try:
+        for i in range(max(1, UDP_CMD_ATTEMPTS)):
+            if i > 0 and _drain_expired.is_set():
+                break
+            if i > 0 and cancel is not None and cancel.is_set():
+                results.append({"ok": False, "error": "preempted", "attempt": i + 1, "via": "udp"})
+                return {"ok": False, "error": "preempted", "attempts": i, "via": "udp", "all_results": results}
+            with _trace_span("udp_cmd_attempt", device=dev.get("id"), attempt=i + 1, seq=seq) as span:
+                try:
+                    sock.sendto(payload, addr)
+                    udp_cmd_stats["retransmits" if i else "sent"] += 1
+                except OSError as e:
+                    span["error"] = str(e)
+                    results.append({"ok": False, "error": str(e), "attempt": i + 1, "via": "udp"})
+                    break
+                acked = waiter["event"].wait(UDP_CMD_ACK_TIMEOUT_SEC * (2 ** i))
+                span["acked"] = acked
+            results.append({"ok": acked, "attempt": i + 1, "via": "udp"})
+            if acked:
+                return {
+                    "ok": True,
+                    "status_code": 200,
+                    "body": "",
+                    "attempts": i + 1,
+                    "via": "udp",
+                    "state": waiter["acks"].get(dev["id"]),
+                    "all_results": results,
+                }
+    finally:
+        _udp_cmd_end(seq)
+    return None
+
+def _udp_cmd_group_addrs() -> list[tuple[str, int]]:
+    addrs: list[tuple[str, int]] = []
+    if UDP_CMD_GROUP_ADDRS.strip():
+        for item in UDP_CMD_GROUP_ADDRS.split(","):
+            host, _, port = item.strip().partition(":")
+            if host:
+                addrs.append((host, int(port or DEVICE_UDP_PORT)))
+        return addrs
+    targets = list(discovery_targets) or build_discover_targets()
+    return [(t["addr"], DEVICE_UDP_PORT) for t in targets]
+
+def udp_group_command(devs: list[Dict[str, Any]], params: Dict[str, Any], group: str | None = None) -> tuple[Dict[str, Dict[str, Any]], list[Dict[str, Any]]]:
+    """브로드캐스트(또는 멀티캐스트) 1패킷으로 여러 장치에 명령.
+    group이 없으면 네트워크의 모든 장치("to":"*"), 있으면 펌웨어 GROUP이 같은 장치가 적용.
+    UDP 지원 장치의 ack가 모두 오거나 재전송이 끝날 때까지 기다린 뒤 (ack한 장치 결과, 나머지 장치) 반환
+    """
+    capable = [d for d in devs if d.get("udp_port")]
+    if not UDP_COMMANDS_ENABLED or not capable:
+        return {}, devs
+    addrs = _udp_cmd_group_addrs()
+    if not addrs:
+        return {}, devs
+    sock = _udp_cmd_socket()
+    seq, waiter = _udp_cmd_begin({d["id"] for d in capable}, lane=_dispatch_lane.get())
+    payload = _udp_cmd_payload(seq, params, group=group)
+    sent = 0
+    try:
+        for i in range(max(1, UDP_CMD_ATTEMPTS)):
+            if i > 0 and _drain_expired.is_set():
+                break
+            with _trace_span("udp_group_send", attempt=i + 1, seq=seq, expect=len(capable)) as span:
+                for addr in addrs:
+                    try:
+                        sock.sendto(payload, addr)
+                        udp_cmd_stats["group_sent"] += 1
+                    except OSError as e:
+                        print(f"[UDP] group command send error ({addr[0]}):", e)
+                sent = i + 1
+                done = waiter["event"].wait(UDP_CMD_GROUP_WAIT_SEC)
+                span["acks"] = len(waiter["acks"])
+            # 선점된 장치가 있으면 재전송하지 않음: 첫 패킷을 놓친 그 장치가 재전송을 받아 새 명령을 덮어쓸 수 있음
+            # (남은 장치는 아래 장치별 전송으로)
+            if done:
+                break
+    finally:
+        _udp_cmd_end(seq)
+    with udp_cmd_lock:
+        acks = dict(waiter["acks"])
+        preempted = dict(waiter["preempted"])
+    results = {
+        dev_id: {"ok": True, "status_code": 200, "body": "", "attempts": sent, "via": "udp_group", "state": state}
+        for dev_id, state in acks.items()
+    }
+    # 선점된 장치는 장치별 전송에서도 제외 (하위 lane 명령이 나중에 실행되면 새 명령을 덮어씀)
+    for dev_id, by in preempted.items():
+        results.setdefault(dev_id, {"ok": False, "error": "preempted", "preempted_by": by, "via": "udp_group"})
+    rest = [d for d in devs if d["id"] not in results]
+    print(f"[UDP] group command seq={seq} group={group or '*'} acked={len(acks)}/{len(capable)} "
+          f"preempted={len(preempted)} fallback={len(rest)}")
+    return results, rest
+
+def _shutdown_udp_commands():
+    global _udp_cmd_sock
+    with udp_cmd_lock:
+        sock, _udp_cmd_sock = _udp_cmd_sock, None
+    if sock is not None:
+        if _udp_cmd_thread is not None:
+            _udp_cmd_thread.join(timeout=1.0)
+        sock.close()
+
+
+# UDP 포트 바인딩은 start_owner_services에서 (import만으로는 시작하지 않음). 0이면 수신 스레드 생략
+UDP_LISTENER_AUTOSTART = os.getenv("UDP_LISTENER_AUTOSTART", "1").lower() in ("1", "true", "yes")
 
 listener_thread = threading.Thread(target=udp_listener, daemon=True)
-listener_thread.start()
 
 # ========================
 # FastAPI 서버
 # ========================
-app = FastAPI(title="IR Remote Server")
+@contextlib.asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    # 백그라운드 작업은 import가 아니라 서버 시작 시에만 (create_app으로 만든 인스턴스도 동일)
+    start_background_services()
+    # uvicorn이 소켓을 열고 요청을 받기 직전 (첫 바이트까지의 시간)
+    startup_mark("http_ready")
+    lifecycle["state"] = "running"
+    print(f"[Startup] HTTP ready in {startup_phases[-1][1]:.0f}ms")
+    try:
+        yield
+    finally:
+        # uvicorn이 진행 중 요청을 끝낸 뒤 호출. drain은 블로킹이라 스레드에서
+        await asyncio.get_running_loop().run_in_executor(None, run_shutdown, "lifespan")
+
+app = FastAPI(title="IR Remote Server", lifespan=_lifespan)
 
 # CORS 설정
 app.add_middleware(
@@ -237,49 +1705,324 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if TRACE_ENABLED:
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        """요청별 span 수집 후 가장 느린 요청 N개를 /debug/slow 용으로 보관"""
+        trace = _trace_begin(request.method, request.url.path, request.url.query)
+        token = _current_trace.set(trace)
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            _current_trace.reset(token)
+            _trace_end(trace, status_code)
+
+@app.get("/debug/slow")
+def debug_slow(limit: int = 0):
+    """가장 느렸던 요청 목록 (느린 순). TRACE_ENABLED=1 일 때만 수집"""
+    with _trace_lock:
+        items = sorted(_slow_heap, key=lambda it: it[0], reverse=True)
+    records = [rec for _, _, rec in items]
+    if limit > 0:
+        records = records[:limit]
+    return {
+        "enabled": TRACE_ENABLED,
+        "keep": TRACE_SLOW_KEEP,
+        "profile_threshold_ms": TRACE_PROFILE_THRESHOLD_MS,
+        "requests": records,
+    }
+
+@app.get("/dispatch")
+def dispatch_view():
+    """명령 디스패처 lane별 한도/대기/전송 중 수와 대기 시간 분위수(ms). 멀티 프로세스 모드에서는 리더의 디스패처"""
+    if cluster_state["role"] == "follower":
+        return leader_view("dispatch")
+    return dispatch_status()
+
+@app.get("/ready")
+def readiness():
+    """준비 상태: 요청 처리 가능하면 200, 시작/종료 중이면 503 (백그라운드 초기화는 참고용)"""
+    ready = lifecycle["state"] == "running"
+    if cluster_state["role"] == "follower":
+        # 팔로워는 리더의 장치 목록을 한 번이라도 받아야 준비 완료
+        ready = ready and cluster_state["last_sync"] is not None
+    body = {
+        "ready": ready,
+        "state": lifecycle["state"],
+        "role": cluster_state["role"],
+        "tasks": {name: task["state"] for name, task in startup_tasks.items()},
+    }
+    return json_bytes_response(_json_bytes(body), 200 if ready else 503)
+
+@app.get("/startup")
+def startup_report():
+    """시작 단계별 소요 시간(ms)과 백그라운드 초기화 작업 결과"""
+    phases = []
+    prev = 0.0
+    for name, at_ms in startup_phases:
+        phases.append({"phase": name, "at_ms": at_ms, "took_ms": round(at_ms - prev, 1)})
+        prev = at_ms
+    return {"phases": phases, "tasks": startup_tasks}
+
+@app.get("/config")
+def get_config():
+    """현재 적용 중인 런타임 설정 값과 키별 출처(default/env/file)"""
+    return {
+        "path": CONFIG_PATH,
+        "version": config_state["version"],
+        "loaded_at": config_state["loaded_at"],
+        "last_error": config_state["last_error"],
+        "last_changes": config_state["last_changes"],
+        "values": {f.name.upper(): getattr(tuning, f.name) for f in dataclasses.fields(Tuning)},
+        "sources": tuning_sources,
+    }
+
+@app.post("/config/reload")
+def config_reload():
+    """설정 파일을 다시 읽어 적용 (검증 실패 시 400, 기존 값 유지)"""
+    result = reload_config("api")
+    if not result["ok"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    if cluster_state["role"] != "standalone" and hasattr(signal, "SIGHUP"):
+        # 다른 워커와 부모(재시작되는 워커가 물려받을 값)에도 적용
+        os.kill(os.getppid(), signal.SIGHUP)
+    return result
+
 # 정적 파일 서빙 (웹 인터페이스) - API 엔드포인트 이후에 마운트
 
 # ========================
 # Unicast state ingest API (from modules)
 # ========================
-@app.post("/devices/put_status")
-async def ingest_status(request: Request):
-    """모듈이 브로드캐스트 수신 후 상태를 유니캐스트(HTTP POST)로 보내는 엔드포인트"""
+def _apply_capabilities(entry: Dict[str, Any], udp_port: Any, group: Any) -> None:
+    # UDP 명령 포트와 그룹은 펌웨어가 알릴 때만 유지 (구형 펌웨어로 바뀌면 제거)
     try:
-        payload = await request.json()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"invalid json: {e}")
+        udp_port = int(udp_port or 0)
+    except (TypeError, ValueError):
+        udp_port = 0
+    if 0 < udp_port < 65536:
+        entry["udp_port"] = udp_port
+    else:
+        entry.pop("udp_port", None)
+    if group:
+        entry["group"] = str(group)
+    else:
+        entry.pop("group", None)
+
+def _apply_status_locked(now: float, dev_id: str, state: Dict[str, Any], ip: str | None, port: int,
+                         udp_port: Any = None, group: Any = None, seq: int | None = None) -> bool:
+    # devices_lock을 잡은 상태에서 호출
+    old = devices.get(dev_id, {})
+    if seq is not None and old.get("wire_seq") is not None:
+        if (old["wire_seq"] - seq) & 0xFFFFFFFF < _WIRE_SEQ_WINDOW:
+            discovery_stats["wire_stale"] += 1
+            return False
+    entry = old.copy()
+    entry.pop("unverified", None)
+    entry.pop("restored_at", None)
+    entry.update({
+        "id": dev_id,
+        "ip": ip or entry.get("ip"),
+        "port": port,
+        "last_seen": now,              # 헬스 판단 기준
+        "state": state,
+        "state_last_seen": now,        # 상태 캐시 기준
+    })
+    _apply_capabilities(entry, udp_port, group)
+    if seq is not None:
+        entry["wire_seq"] = seq
+    _bump_rev(old, entry)
+    devices[dev_id] = entry
+    _shm_publish(entry)
+    return True
+
+def apply_status_report(dev_id: str, state: Dict[str, Any], ip: str | None, port: int,
+                        udp_port: int | None = None, group: str | None = None, seq: int | None = None) -> bool:
+    """모듈이 보낸 상태 1건을 장치 목록에 반영. seq(바이너리 형식)가 직전 이하인 중복/지연 패킷이면 False"""
+    discovery_stats["put_status"] += 1
+    with _traced_lock(devices_lock, "devices"):
+        return _apply_status_locked(clock.time(), dev_id, state, ip, port, udp_port, group, seq)
+
+def apply_status_batch(items: list[tuple]) -> int:
+    """상태 여러 건을 락 1번으로 반영. 항목은 (id, state, ip, port, udp_port, group, seq). 반영한 수 반환"""
+    discovery_stats["put_status"] += len(items)
+    now = clock.time()
+    applied = 0
+    with _traced_lock(devices_lock, "devices"):
+        for item in items:
+            if _apply_status_locked(now, *item):
+                applied += 1
+    return applied
+
+# ========================
+# 상태 수신 큐 (discover 직후 put_status 폭주 대응)
+# ========================
+# 요청은 큐에 넣고 바로 202로 응답, 전용 스레드가 모아서 한 번에 반영 (팔로워는 리더로 묶어서 전달)
+INGEST_QUEUE_ENABLED = os.getenv("INGEST_QUEUE_ENABLED", "1").lower() in ("1", "true", "yes")
+INGEST_QUEUE_MAX = int(os.getenv("INGEST_QUEUE_MAX", "10000"))
+INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "500"))
+# 첫 항목 이후 같은 배치로 더 모으는 시간
+INGEST_BATCH_WAIT_MS = int(os.getenv("INGEST_BATCH_WAIT_MS", "20"))
+# 벌크 요청 1건당 최대 항목 수
+INGEST_BULK_MAX = int(os.getenv("INGEST_BULK_MAX", "5000"))
+
+ingest_queue: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_MAX)
+_ingest_thread: threading.Thread | None = None
+_ingest_thread_lock = threading.Lock()
+ingest_stats: Dict[str, int] = {"queued": 0, "applied": 0, "batches": 0, "max_batch": 0, "overflow_sync": 0, "forward_errors": 0}
+
+def _status_item(payload: Any, client_host: str | None) -> tuple:
+    """JSON 상태 1건 → 큐 항목. id/state가 없으면 ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("status must be an object")
     dev_id = payload.get("id")
     state = payload.get("state")
     if not dev_id or not isinstance(state, dict):
-        raise HTTPException(status_code=400, detail="missing id or state")
-
-    client_host = request.client.host if request.client else None
-    now = time.time()
+        raise ValueError("missing id or state")
     ip = payload.get("ip") or client_host
     port = int(payload.get("port", 80))
-
-    with devices_lock:
-        entry = devices.get(dev_id, {}).copy()
-        entry.update({
-            "id": dev_id,
-            "ip": ip or entry.get("ip"),
-            "port": port,
-            "last_seen": now,              # 헬스 판단 기준
-            "state": state,
-            "state_last_seen": now,        # 상태 캐시 기준
-        })
-        devices[dev_id] = entry
-    try:
+    return (str(dev_id), state, ip, port, payload.get("udp_port"), payload.get("group"), None)
+
+def _ingest_flush(batch: list[tuple]) -> int:
+    if cluster_state["role"] == "follower":
+        resp = cluster_call("ingest_batch", timeout=5.0, items=[list(item) for item in batch])
+        if not (resp or {}).get("ok"):
+            ingest_stats["forward_errors"] += 1
+            print(f"[Ingest] leader unavailable, dropped {len(batch)} status reports (next discover will resend)")
+            return 0
+        applied = int(resp.get("applied", 0))
+    else:
+        applied = apply_status_batch(batch)
+    ingest_stats["applied"] += applied
+    ingest_stats["batches"] += 1
+    ingest_stats["max_batch"] = max(ingest_stats["max_batch"], len(batch))
+    if len(batch) == 1:
+        dev_id, state, ip, port = batch[0][:4]
         power = "on" if bool(state.get("power")) else "off"
-        mode = state.get("mode")
-        temp = state.get("temp")
-        method = request.method if hasattr(request, "method") else "HTTP"
-        print(f"[HTTP] {method} state id={dev_id} from {ip}:{port} power={power} mode={mode} temp={temp}")
-    except Exception:
-        pass
+        print(f"[HTTP] state id={dev_id} from {ip}:{port} power={power} mode={state.get('mode')} temp={state.get('temp')}")
+    else:
+        print(f"[Ingest] applied {applied}/{len(batch)} status reports (queue={ingest_queue.qsize()})")
+    return applied
+
+def _ingest_loop():
+    wait_sec = max(0, INGEST_BATCH_WAIT_MS) / 1000.0
+    while True:
+        try:
+            first = ingest_queue.get(timeout=0.5)
+        except queue.Empty:
+            if _shutdown_event.is_set():
+                break
+            continue
+        batch = [first]
+        deadline = time.monotonic() + wait_sec
+        while len(batch) < INGEST_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(ingest_queue.get(timeout=remaining) if remaining > 0 else ingest_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _ingest_flush(batch)
+        except Exception as e:
+            print(f"[Ingest] batch apply failed: {e}")
+
+def enqueue_status(items: list[tuple]) -> int:
+    """큐에 넣을 수 있는 만큼 넣고 넣은 수 반환 (블로킹 없음). 큐가 꽉 차서 못 넣은 나머지는 호출한 쪽이 반영"""
+    global _ingest_thread
+    if _ingest_thread is None:
+        with _ingest_thread_lock:
+            if _ingest_thread is None:
+                _ingest_thread = threading.Thread(target=_ingest_loop, daemon=True)
+                _ingest_thread.start()
+    for i, item in enumerate(items):
+        try:
+            ingest_queue.put_nowait(item)
+        except queue.Full:
+            ingest_stats["overflow_sync"] += len(items) - i
+            return i
+        ingest_stats["queued"] += 1
+    return len(items)
+
+async def submit_status(items: list[tuple]) -> bool:
+    """수신한 상태 반영 요청 (이벤트 루프에서 호출). 큐로 넘겼으면 True, 바로 반영했으면 False
+    바로 반영은 devices_lock 대기나 팔로워의 리더 호출(최대 5초)로 블로킹되므로 스레드 풀에서 실행"""
+    rest, queued = items, False
+    if INGEST_QUEUE_ENABLED and lifecycle["state"] not in ("draining", "stopped"):
+        rest, queued = items[enqueue_status(items):], True
+    if rest:
+        await asyncio.get_running_loop().run_in_executor(None, _ingest_flush, rest)
+    return queued
+
+def _shutdown_ingest_queue():
+    # 수신 스레드는 _shutdown_event를 보고 큐가 빌 때까지 처리한 뒤 종료. 남은 항목은 여기서 반영
+    if _ingest_thread is not None:
+        _ingest_thread.join(timeout=2.0)
+    leftover = []
+    while True:
+        try:
+            leftover.append(ingest_queue.get_nowait())
+        except queue.Empty:
+            break
+    if leftover:
+        _ingest_flush(leftover)
+
+@app.post("/devices/put_status", status_code=202)
+async def ingest_status(request: Request, response: Response):
+    """모듈이 브로드캐스트 수신 후 상태를 유니캐스트(HTTP POST)로 보내는 엔드포인트 (JSON 또는 바이너리 형식)
+    큐에 넣고 202로 바로 응답 (장치 목록 반영은 배치로)"""
+    body = await request.body()
+    client_host = request.client.host if request.client else None
+    if body[:2] == WIRE_MAGIC:
+        decoded = decode_wire_status(body)
+        if decoded is None:
+            raise HTTPException(status_code=400, detail="invalid wire packet")
+        discovery_stats["wire_packets"] += 1
+        item = _wire_item(decoded, client_host)
+        if item is None:
+            return {"ok": True}
+    else:
+        try:
+            item = _status_item(json.loads(body), client_host)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"invalid json: {e}")
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if not await submit_status([item]):
+        response.status_code = 200
     return {"ok": True}
 
+@app.post("/devices/put_status/bulk", status_code=202)
+async def ingest_status_bulk(request: Request, response: Response):
+    """중계기/게이트웨이가 여러 모듈 상태를 한 번에 보내는 엔드포인트
+    본문: [{"id","ip","port","state",...}, ...] 또는 {"devices": [...]}. 잘못된 항목만 제외하고 나머지는 반영"""
+    try:
+        payload = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"invalid json: {e}")
+    records = payload.get("devices") if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="expected a list of status objects")
+    if len(records) > INGEST_BULK_MAX:
+        raise HTTPException(status_code=413, detail=f"too many entries (max {INGEST_BULK_MAX})")
+    client_host = request.client.host if request.client else None
+    items = []
+    rejected = []
+    for idx, rec in enumerate(records):
+        try:
+            # 요청 주소는 중계기 주소이므로 모듈 ip는 항목에 있어야 함
+            item = _status_item(rec, None)
+            if not item[2]:
+                raise ValueError("missing ip")
+            items.append(item)
+        except (TypeError, ValueError) as e:
+            rejected.append({"index": idx, "error": str(e)})
+    if items and not await submit_status(items):
+        response.status_code = 200
+    print(f"[HTTP] bulk status from {client_host}: accepted={len(items)} rejected={len(rejected)}")
+    return {"ok": not rejected, "accepted": len(items), "rejected": rejected}
+
 class AcCommand(BaseModel):
     power: str | None = None
     mode: str | None = None
@@ -309,9 +2052,10 @@ class ScheduleItem(BaseModel):
     weekday: int | None = None  # 0=월 ... 6=일
     start_time_min: int  # 0..1439
     end_time_min: int    # 0..1439
+    scene: str | None = None  # 지정 시 ON은 mode/temp 대신 장면 실행
 
 def _db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db_connect() if db_connect is not None else sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -333,6 +2077,25 @@ def _create_schema(conn: sqlite3.Connection):
             end_time_min INTEGER NOT NULL DEFAULT 1020
         )
     """)
+    # 예약 발생 선점 기록 (여러 프로세스/재시작 사이에서 같은 발생을 한 번만 발송)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_dispatch (
+            sid INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            occurrence TEXT NOT NULL,
+            owner_pid INTEGER,
+            claimed_at REAL NOT NULL,
+            PRIMARY KEY (sid, action, occurrence)
+        )
+    """)
+    # 장면: 장치/그룹별 명령 묶음 (commands는 {"devices": {id: cmd}, "groups": {group: cmd}} JSON)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scenes (
+            name TEXT PRIMARY KEY,
+            commands TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
     # 1..7 기본 레코드 보장
     for i in range(1, 8):
         cur.execute("INSERT OR IGNORE INTO schedules(id) VALUES (?)", (i,))
@@ -364,21 +2127,23 @@ def _recreate_db_with_backup():
     except Exception as e:
         print(f"[ScheduleDB] Recreate failed: {e}")
 
-def init_db():
-    """DB 무결성 검사 후, 손상 시 새로 생성하여 서버가 중단되지 않도록."""
+def init_db(check_integrity: bool = True):
+    """DB 무결성 검사 후, 손상 시 새로 생성하여 서버가 중단되지 않도록.
+    check_integrity=False면 스키마/마이그레이션만 (시작 시 전체 검사는 check_db_integrity로 백그라운드 실행)"""
     try:
         conn = _db()
         try:
-            # 무결성 검사
             cur = conn.cursor()
-            cur.execute("PRAGMA integrity_check;")
-            row = cur.fetchone()
-            ok = (row and str(row[0]).lower() == "ok")
-            if not ok:
-                print(f"[ScheduleDB] integrity_check failed: {row[0] if row else 'unknown'}")
-                conn.close()
-                _recreate_db_with_backup()
-                return
+            if check_integrity:
+                # 무결성 검사
+                cur.execute("PRAGMA integrity_check;")
+                row = cur.fetchone()
+                ok = (row and str(row[0]).lower() == "ok")
+                if not ok:
+                    print(f"[ScheduleDB] integrity_check failed: {row[0] if row else 'unknown'}")
+                    conn.close()
+                    _recreate_db_with_backup()
+                    return
             # 스키마/기본 레코드 보장
             _create_schema(conn)
             # 마이그레이션: start_date / end_date 컬럼 추가(if missing) 및 백필
@@ -389,6 +2154,9 @@ def init_db():
                     cur.execute("ALTER TABLE schedules ADD COLUMN start_date TEXT")
                 if "end_date" not in cols:
                     cur.execute("ALTER TABLE schedules ADD COLUMN end_date TEXT")
+                # 시작(ON) 시 all_on 대신 실행할 장면 이름
+                if "scene" not in cols:
+                    cur.execute("ALTER TABLE schedules ADD COLUMN scene TEXT")
                 conn.commit()
                 # once 스케줄의 date를 start/end로 백필(없을 때만)
                 cur.execute("""
@@ -412,6 +2180,22 @@ def init_db():
         print(f"[ScheduleDB] Unexpected error on init: {e}")
         _recreate_db_with_backup()
 
+def check_db_integrity() -> bool:
+    """전체 DB 무결성 검사 (시간이 걸리므로 서버 시작 후 백그라운드에서). 손상 시 백업 후 재생성"""
+    try:
+        conn = _db()
+        try:
+            row = conn.execute("PRAGMA integrity_check;").fetchone()
+        finally:
+            conn.close()
+        if row and str(row[0]).lower() == "ok":
+            return True
+        print(f"[ScheduleDB] integrity_check failed: {row[0] if row else 'unknown'}")
+    except sqlite3.DatabaseError as e:
+        print(f"[ScheduleDB] integrity_check error: {e}")
+    _recreate_db_with_backup()
+    return False
+
 def row_to_schedule(row: sqlite3.Row) -> dict:
     return {
         "id": row["id"],
@@ -423,6 +2207,7 @@ def row_to_schedule(row: sqlite3.Row) -> dict:
         "date": row["date"],
         "start_date": row["start_date"] if "start_date" in row.keys() else None,
         "end_date": row["end_date"] if "end_date" in row.keys() else None,
+        "scene": row["scene"] if "scene" in row.keys() else None,
         "weekday": row["weekday"],
         "start_time_min": row["start_time_min"],
         "end_time_min": row["end_time_min"],
@@ -473,17 +2258,21 @@ def make_schedule_summary(schedule_type: str, date: str | None, start_date: str
 
 @app.get("/schedules")
 def list_schedules():
+    return json_bytes_response(_json_bytes(get_all_schedules()))
+
+def get_all_schedules() -> list[dict]:
     try:
-        conn = _db()
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM schedules ORDER BY id")
-            rows = cur.fetchall()
-            return [row_to_schedule(r) for r in rows]
-        finally:
-            conn.close()
+        with _trace_span("db", op="list_schedules"):
+            conn = _db()
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT * FROM schedules ORDER BY id")
+                rows = cur.fetchall()
+            finally:
+                conn.close()
+        return [row_to_schedule(r) for r in rows]
     except sqlite3.DatabaseError as e:
-        print(f"[ScheduleDB] list_schedules error: {e} -> recreating")
+        print(f"[ScheduleDB] get_all_schedules error: {e} -> recreating")
         init_db()
         try:
             conn = _db()
@@ -497,6 +2286,126 @@ def list_schedules():
         except Exception:
             return []
 
+@app.get("/schedules/runtime")
+def schedule_runtime_status():
+    """스케줄러 상태: 마지막 평가, 다음 이벤트, 시계 점프 이력, 누락 처리 정책"""
+    if cluster_state["role"] == "follower":
+        return leader_view("schedule_runtime")
+    return {
+        **schedule_runtime,
+        "catchup_policy": SCHEDULE_CATCHUP_POLICY,
+        "grace_sec": SCHEDULE_GRACE_SEC,
+        "last_sent": {f"{sid}:{action}": occ.isoformat(timespec="minutes") for (sid, action), occ in list(schedule_last_sent.items())},
+    }
+
+class ScheduleRule(BaseModel):
+    """시뮬레이션용 임시 스케줄 규칙 (DB에 저장하지 않음)"""
+    id: int = 0
+    enabled: bool = True
+    mode: str = "cool"
+    temp: int = 24
+    schedule_type: str
+    date: str | None = None
+    start_date: str | None = None
+    end_date: str | None = None
+    weekday: int | None = None
+    start_time_min: int
+    end_time_min: int
+
+class ScheduleSimulation(BaseModel):
+    start_date: str | None = None   # YYYY-MM-DD (기본: 오늘)
+    days: int = 30
+    schedules: list[ScheduleRule] | None = None  # 지정하지 않으면 DB 스케줄 사용
+    include_disabled: bool = False
+    limit: int = 1000               # 반환할 최대 이벤트 수 (집계는 전체 구간 기준)
+
+SCHEDULE_SIMULATE_MAX_DAYS = 3660
+
+def _tagged_occurrences(sch: dict, start: datetime, end: datetime):
+    for at, action in iter_schedule_occurrences(sch, start, end):
+        yield at, 0 if action == "on" else 1, sch["id"], action, sch
+
+def simulate_schedules(schedules: list[dict], start: datetime, end: datetime, limit: int) -> dict:
+    """구간 내 ON/OFF 이벤트를 라이브 스케줄러와 같은 발생 시각 계산으로 산출"""
+    t0 = time.perf_counter()
+    per_schedule: Dict[str, Dict[str, Any]] = {}
+    streams = []
+    total = 0
+    for sch in schedules:
+        if sch["schedule_type"] in ("daily", "weekly"):
+            # 건수는 날짜 산술로 바로 계산 (구간이 날짜 경계라 정확)
+            span = _occurrence_days(sch, start.date(), (end - timedelta(microseconds=1)).date())
+            days = 0 if span is None else (span[1] - span[0]).days // span[2] + 1
+            counts = {"on": days, "off": days}
+            first_min = min(sch["start_time_min"], sch["end_time_min"])
+            last_min = max(sch["start_time_min"], sch["end_time_min"])
+            first_at = _at_minute(span[0], first_min) if span else None
+            last_at = _at_minute(span[1], last_min) if span else None
+        else:
+            occ = schedule_occurrences(sch, start, end)
+            counts = {"on": sum(1 for _, a in occ if a == "on"), "off": sum(1 for _, a in occ if a == "off")}
+            first_at = occ[0][0] if occ else None
+            last_at = occ[-1][0] if occ else None
+        total += counts["on"] + counts["off"]
+        per_schedule[str(sch["id"])] = {
+            **counts,
+            "summary": make_schedule_summary(
+                sch["schedule_type"], sch.get("date"), sch.get("start_date"), sch.get("end_date"),
+                sch.get("weekday"), sch["start_time_min"], sch["end_time_min"],
+            ),
+            "first": first_at.isoformat(timespec="minutes") if first_at else None,
+            "last": last_at.isoformat(timespec="minutes") if last_at else None,
+        }
+        streams.append(_tagged_occurrences(sch, start, end))
+    events = []
+    for at, _, sid, action, sch in itertools.islice(heapq.merge(*streams, key=lambda e: e[:3]), max(0, limit)):
+        item = {"at": at.isoformat(timespec="minutes"), "schedule_id": sid, "action": action}
+        if action == "on":
+            item.update({"mode": sch.get("mode"), "temp": sch.get("temp")})
+        events.append(item)
+    return {
+        "start": start.isoformat(timespec="minutes"),
+        "end": end.isoformat(timespec="minutes"),
+        "schedules": len(schedules),
+        "event_count": total,
+        "per_schedule": per_schedule,
+        "events": events,
+        "truncated": total > len(events),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+    }
+
+@app.post("/schedules/simulate")
+def simulate_schedules_endpoint(payload: ScheduleSimulation):
+    """예약 dry-run: 지정 기간 동안 발송될 ON/OFF 이벤트 목록 (실제 발송 없음)"""
+    if not (1 <= payload.days <= SCHEDULE_SIMULATE_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"days must be 1..{SCHEDULE_SIMULATE_MAX_DAYS}")
+    if payload.start_date:
+        start_d = _parse_date(payload.start_date)
+        if start_d is None:
+            raise HTTPException(status_code=400, detail="invalid start_date")
+    else:
+        start_d = datetime.now().date()
+    if payload.schedules is not None:
+        rules = []
+        for i, rule in enumerate(payload.schedules):
+            if rule.schedule_type not in ("once", "daily", "weekly"):
+                raise HTTPException(status_code=400, detail=f"schedules[{i}]: invalid schedule_type")
+            if not (0 <= rule.start_time_min <= 1439 and 0 <= rule.end_time_min <= 1439):
+                raise HTTPException(status_code=400, detail=f"schedules[{i}]: invalid time")
+            item = rule.model_dump()
+            item["id"] = rule.id or (i + 1)
+            rules.append(item)
+    elif payload.include_disabled:
+        rules = get_all_schedules()
+    else:
+        rules = get_enabled_schedules()
+    start = _at_minute(start_d, 0)
+    return simulate_schedules(rules, start, start + timedelta(days=payload.days), payload.limit)
+
+@app.get("/schedules/simulate")
+def simulate_schedules_get(start_date: str | None = None, days: int = 30, include_disabled: bool = False, limit: int = 1000):
+    return simulate_schedules_endpoint(ScheduleSimulation(start_date=start_date, days=days, include_disabled=include_disabled, limit=limit))
+
 class ScheduleUpdate(BaseModel):
     enabled: bool | None = None
     mode: str | None = None
@@ -508,6 +2417,7 @@ class ScheduleUpdate(BaseModel):
     weekday: int | None = None
     start_time_min: int | None = None
     end_time_min: int | None = None
+    scene: str | None = None   # ""이면 해제
 
 @app.put("/schedules/{sid}")
 def update_schedule(sid: int, payload: ScheduleUpdate):
@@ -535,7 +2445,12 @@ def update_schedule(sid: int, payload: ScheduleUpdate):
         raise HTTPException(status_code=400, detail="invalid start_date")
     if payload.end_date is not None and payload.end_date != "" and not _valid_date(payload.end_date):
         raise HTTPException(status_code=400, detail="invalid end_date")
+    if payload.scene and get_scene(payload.scene) is None:
+        raise HTTPException(status_code=400, detail="unknown scene")
     def _do_update():
+        with _trace_span("db", op="update_schedule", sid=sid):
+            return _do_update_db()
+    def _do_update_db():
         conn = _db()
         try:
             cur = conn.cursor()
@@ -549,6 +2464,9 @@ def update_schedule(sid: int, payload: ScheduleUpdate):
                 if k == "enabled":
                     fields.append("enabled=?")
                     values.append(1 if v else 0)
+                elif k == "scene":
+                    fields.append("scene=?")
+                    values.append(v or None)
                 else:
                     fields.append(f"{k}=?")
                     values.append(v)
@@ -576,14 +2494,19 @@ def update_schedule(sid: int, payload: ScheduleUpdate):
         finally:
             conn.close()
     try:
-        return _do_update()
+        result = _do_update()
     except sqlite3.DatabaseError as e:
         print(f"[ScheduleDB] update_schedule error: {e} -> recreating")
         init_db()
         try:
-            return _do_update()
+            result = _do_update()
         except Exception as e2:
             raise HTTPException(status_code=500, detail=f"DB error after recreate: {e2}")
+    # 스케줄러가 다음 발생 시각을 다시 계산하도록 깨움 (팔로워면 리더의 스케줄러)
+    schedule_wake.set()
+    if cluster_state["role"] == "follower":
+        cluster_call("schedule_wake")
+    return result
 
 def get_enabled_schedules() -> list[dict]:
     try:
@@ -604,166 +2527,378 @@ def get_enabled_schedules() -> list[dict]:
 def minutes_since_midnight(dt: datetime) -> int:
     return dt.hour * 60 + dt.minute
 
-def _within_5min_window(now_min: int, target_min: int) -> bool:
-    # 순환 1440 고려
-    diff = (now_min - target_min) % 1440
-    return 0 <= diff <= 4
-
-# 최근 전송(분) 기록: {(sid, 'on'|'off'): last_minute}
-schedule_last_sent: dict[tuple[int, str], int] = {}
+# ========================
+# 예약 스케줄러 (발생 시각 계산 + 비동기 발송)
+# ========================
+# 예정 시각보다 이 시간(초) 이내로 늦은 이벤트는 정상 발송 (기존 5분 창과 동일)
+SCHEDULE_GRACE_SEC = int(os.getenv("SCHEDULE_GRACE_SEC", "300"))
+# 유예 시간을 넘겨 놓친 이벤트 처리: latest(스케줄별 마지막 이벤트만) | all(모두 순서대로) | none(건너뜀)
+SCHEDULE_CATCHUP_POLICY = os.getenv("SCHEDULE_CATCHUP_POLICY", "latest").lower()
+# 놓친 이벤트를 되짚는 최대 범위(초)
+SCHEDULE_CATCHUP_MAX_SEC = int(os.getenv("SCHEDULE_CATCHUP_MAX_SEC", str(60 * 60 * 6)))
+# 벽시계와 monotonic 시계 차이가 이 값(초)을 넘으면 시계 점프로 판단
+SCHEDULE_CLOCK_JUMP_SEC = int(os.getenv("SCHEDULE_CLOCK_JUMP_SEC", "90"))
+# 다음 이벤트가 멀어도 이 주기(초)로 깨어나 시계 점프를 확인
+SCHEDULE_MAX_SLEEP_SEC = int(os.getenv("SCHEDULE_MAX_SLEEP_SEC", "30"))
+SCHEDULE_DISPATCH_WORKERS = int(os.getenv("SCHEDULE_DISPATCH_WORKERS", "4"))
+# 0이면 예약 스케줄 루프를 시작하지 않음 (같은 DB를 쓰는 다른 인스턴스가 발송을 맡을 때)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# 마지막으로 발송(또는 건너뛴)한 발생 시각: {(sid, 'on'|'off'): datetime}
+schedule_last_sent: dict[tuple[int, str], datetime] = {}
+# 스케줄 변경 시 스케줄러를 즉시 깨우기 위한 이벤트
+schedule_wake = threading.Event()
+schedule_runtime: Dict[str, Any] = {"last_eval": None, "next_event": None, "clock_jumps": [], "skipped": 0, "caught_up": 0}
+# 발송은 평가 루프 밖의 워커들이 실행. 같은 스케줄의 발송(ON→OFF)은 스케줄별 큐에서 제출 순서대로 하나씩,
+# 다른 스케줄끼리는 병렬 (느린 전체 제어가 무관한 스케줄을 막지 않음). 같은 장치의 순서는 디스패처 lane/선점이 담당
+_schedule_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, SCHEDULE_DISPATCH_WORKERS), thread_name_prefix="schedule")
+_schedule_queues: Dict[int, collections.deque] = {}   # 스케줄 id -> 대기 중인 발송 (키가 있으면 워커 1개가 처리 중)
+_schedule_queues_lock = threading.Lock()
 
 def _schedule_send_on(mode: str, temp: int):
     # 예약 시작은 항상 ON + (mode,temp)만 전송
-    all_on(AcCommand(power="on", mode=mode, temp=temp))
+    with dispatch_lane("schedule"):
+        all_on(AcCommand(power="on", mode=mode, temp=temp))
 
 def _schedule_send_off():
-    all_off()
+    with dispatch_lane("schedule"):
+        all_off()
 
-def _schedule_loop():
-    print("[Schedule] Started (every 1 minute)")
+def _parse_date(s: str | None):
+    if not s:
+        return None
+    try:
+        # YYYY-MM-DD는 fromisoformat이 strptime보다 훨씬 빠름
+        return date.fromisoformat(s)
+    except Exception:
+        pass
+    try:
+        return datetime.strptime(s, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+def _at_minute(d, minute: int) -> datetime:
+    return datetime.combine(d, datetime.min.time()) + timedelta(minutes=int(minute))
+
+def _schedule_date_bounds(sch: dict):
+    """(시작일, 종료일) 제한. weekly는 날짜 설정의 영향을 받지 않도록 무시"""
+    if sch["schedule_type"] == "weekly":
+        return None, None
+    return _parse_date(sch.get("start_date") or sch.get("date")), _parse_date(sch.get("end_date") or sch.get("date"))
+
+def _occurrence_days(sch: dict, first, last):
+    """daily/weekly 스케줄이 [first, last] 날짜 구간에서 발생하는 (첫 날짜, 마지막 날짜, 간격일) 또는 None"""
+    sd_d, ed_d = _schedule_date_bounds(sch)
+    if sd_d and sd_d > first:
+        first = sd_d
+    if ed_d and ed_d < last:
+        last = ed_d
+    step = 1
+    if sch["schedule_type"] == "weekly":
+        weekday = sch.get("weekday")
+        if weekday is None:
+            return None
+        first += timedelta(days=(int(weekday) - first.weekday()) % 7)  # 월=0 .. 일=6
+        step = 7
+        last -= timedelta(days=(last.weekday() - int(weekday)) % 7)
+    if first > last:
+        return None
+    return first, last, step
+
+def iter_schedule_occurrences(sch: dict, start: datetime, end: datetime):
+    """[start, end) 구간에서 스케줄의 (발생 시각, 'on'|'off')를 시간순으로 생성
+    분 단위로 순회하지 않고 날짜 산술로 계산 (daily: 1일 간격, weekly: 7일 간격)
+    """
+    st = sch["schedule_type"]
+    s_min = sch["start_time_min"]
+    e_min = sch["end_time_min"]
+    # 같은 날 같은 시각이면 ON 먼저
+    day_events = sorted([(s_min, 0, "on"), (e_min, 1, "off")])
+    if st == "once":
+        # 시작일/종료일 각각 별도 날짜 기준
+        sd_d, ed_d = _schedule_date_bounds(sch)
+        events = []
+        if sd_d:
+            events.append((_at_minute(sd_d, s_min), 0, "on"))
+        if ed_d:
+            events.append((_at_minute(ed_d, e_min), 1, "off"))
+        for at, _, action in sorted(events):
+            if start <= at < end:
+                yield at, action
+    elif st in ("daily", "weekly"):
+        span = _occurrence_days(sch, start.date(), end.date())
+        if span is None:
+            return
+        d, last, step = span
+        while d <= last:
+            for minute, _, action in day_events:
+                at = _at_minute(d, minute)
+                if at >= end:
+                    return
+                if at >= start:
+                    yield at, action
+            d += timedelta(days=step)
+
+def schedule_occurrences(sch: dict, start: datetime, end: datetime) -> list[tuple[datetime, str]]:
+    return list(iter_schedule_occurrences(sch, start, end))
+
+def _select_due_events(schedules: list[dict], window_start: datetime, now: datetime) -> tuple[list, list]:
+    """(발송할 이벤트, 건너뛸 이벤트). 각 항목은 (발생 시각, 스케줄, 'on'|'off')"""
+    due = []
+    for sch in schedules:
+        for occ, action in schedule_occurrences(sch, window_start, now + timedelta(microseconds=1)):
+            last = schedule_last_sent.get((sch["id"], action))
+            if last is not None and occ <= last:
+                continue
+            due.append((occ, sch, action))
+    grace = timedelta(seconds=SCHEDULE_GRACE_SEC)
+    on_time = [e for e in due if now - e[0] <= grace]
+    missed = [e for e in due if now - e[0] > grace]
+    if not missed or SCHEDULE_CATCHUP_POLICY == "all":
+        fire = on_time + missed
+        skip = []
+    elif SCHEDULE_CATCHUP_POLICY == "none":
+        fire, skip = on_time, missed
+    else:
+        # latest: 스케줄별로 가장 최근 이벤트 하나만 (최종 상태만 맞추면 되므로)
+        fire, skip = [], []
+        latest: Dict[int, tuple] = {}
+        for e in on_time + missed:
+            cur = latest.get(e[1]["id"])
+            if cur is None or e[0] > cur[0]:
+                latest[e[1]["id"]] = e
+        keep = {id(e) for e in latest.values()}
+        for e in on_time + missed:
+            (fire if id(e) in keep or e in on_time else skip).append(e)
+    fire.sort(key=lambda e: (e[0], 0 if e[2] == "on" else 1))
+    return fire, skip
+
+SCHEDULE_DISPATCH_KEEP_SEC = 60 * 60 * 24 * 7  # 선점 기록 보관 기간
+
+def claim_schedule_event(sid: int, action: str, occurrence: datetime) -> bool:
+    """발생 1건을 DB에 선점 기록. 이미 선점된 발생(이전 리더/재시작 전 프로세스)이면 False"""
+    try:
+        conn = _db()
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO schedule_dispatch(sid, action, occurrence, owner_pid, claimed_at) VALUES (?,?,?,?,?)",
+                (sid, action, occurrence.isoformat(timespec="minutes"), os.getpid(), time.time()),
+            )
+            claimed = cur.rowcount == 1
+            conn.execute("DELETE FROM schedule_dispatch WHERE claimed_at < ?", (time.time() - SCHEDULE_DISPATCH_KEEP_SEC,))
+            conn.commit()
+            return claimed
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        # 기록 실패로 예약이 누락되지 않도록 발송 쪽으로 처리
+        print(f"[Schedule] claim #{sid} {action} failed: {e}")
+        return True
+
+def _dispatch_schedule_event(sch: dict, action: str, occurrence: datetime, late_sec: int):
+    sid = sch["id"]
+    time_min = minutes_since_midnight(occurrence)
+    try:
+        if action == "on":
+            scene = get_scene(sch["scene"]) if sch.get("scene") else None
+            if scene is not None:
+                print(f"[Schedule] #{sid} ON dispatch (scene={scene['name']} late={late_sec}s)")
+                write_action_log("schedule_on", {"schedule_id": sid, "scene": scene["name"], "time_min": time_min, "late_sec": late_sec})
+                with dispatch_lane("schedule"):
+                    execute_scene(scene["commands"], scene["name"], log_event="schedule_scene")
+                return
+            if sch.get("scene"):
+                # 장면이 삭제된 경우 기존 mode/temp 동작으로
+                print(f"[Schedule] #{sid} scene '{sch['scene']}' not found -> mode/temp")
+            print(f"[Schedule] #{sid} ON dispatch (mode={sch['mode']} temp={sch['temp']} late={late_sec}s)")
+            write_action_log("schedule_on", {"schedule_id": sid, "mode": sch["mode"], "temp": sch["temp"], "time_min": time_min, "late_sec": late_sec})
+            _schedule_send_on(sch["mode"], sch["temp"])
+        else:
+            print(f"[Schedule] #{sid} OFF dispatch (late={late_sec}s)")
+            write_action_log("schedule_off", {"schedule_id": sid, "time_min": time_min, "late_sec": late_sec})
+            _schedule_send_off()
+            # 1회 예약은 OFF 실행 후 비활성화
+            if sch["schedule_type"] == "once":
+                try:
+                    update_schedule(sid, ScheduleUpdate(enabled=False))
+                    write_action_log("schedule_once_disabled", {"schedule_id": sid})
+                    print(f"[Schedule] #{sid} once disabled after OFF")
+                except Exception as _e:
+                    print(f"[Schedule] #{sid} disable failed: {_e}")
+    except Exception as e:
+        print(f"[Schedule] #{sid} {action} dispatch error: {e}")
+
+def _schedule_drain(sid: int):
     while True:
+        with _schedule_queues_lock:
+            q = _schedule_queues[sid]
+            if not q:
+                del _schedule_queues[sid]
+                return
+            fut, args = q.popleft()
+        if not fut.set_running_or_notify_cancel():
+            continue
         try:
-            now = datetime.now()
-            now_min = minutes_since_midnight(now)
-            weekday = (now.weekday())  # 월=0 .. 일=6
-            today_str = now.strftime("%Y-%m-%d")
+            fut.set_result(_dispatch_schedule_event(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+
+def _submit_schedule_event(sch: dict, action: str, occurrence: datetime, late_sec: int) -> concurrent.futures.Future:
+    """스케줄별 직렬 큐에 발송 추가. 그 스케줄을 처리 중인 워커가 없으면 워커 하나를 붙임"""
+    sid = sch["id"]
+    fut: concurrent.futures.Future = concurrent.futures.Future()
+    with _schedule_queues_lock:
+        q = _schedule_queues.get(sid)
+        if q is not None:
+            q.append((fut, (sch, action, occurrence, late_sec)))
+            return fut
+        _schedule_queues[sid] = collections.deque([(fut, (sch, action, occurrence, late_sec))])
+    _schedule_pool.submit(_schedule_drain, sid)
+    return fut
+
+def dispatch_due_events(fire: list, now: datetime) -> list[concurrent.futures.Future]:
+    """_select_due_events의 발송 목록을 선점 기록 후 발송 큐에 넣음 (스케줄마다 발생 시각, ON→OFF 순서대로 실행됨)"""
+    futures = []
+    for occ, sch, action in fire:
+        late_sec = int((now - occ).total_seconds())
+        if late_sec > SCHEDULE_GRACE_SEC:
+            schedule_runtime["caught_up"] += 1
+        schedule_last_sent[(sch["id"], action)] = occ
+        if not claim_schedule_event(sch["id"], action, occ):
+            print(f"[Schedule] #{sch['id']} {action.upper()} at {occ:%Y-%m-%d %H:%M} already dispatched -> skip")
+            continue
+        # 비동기 발송: 느린 전체 제어가 다음 스케줄 평가를 막지 않음
+        futures.append(_submit_schedule_event(sch, action, occ, late_sec))
+    return futures
 
-            schedules = get_enabled_schedules()
-            for sch in schedules:
-                sid = sch["id"]
-                st = sch["schedule_type"]
-                s_min = sch["start_time_min"]
-                e_min = sch["end_time_min"]
-                do_on = False
-                do_off = False
-                # 날짜 범위 제한 (옵션)
-                sd = sch.get("start_date") or sch.get("date")
-                ed = sch.get("end_date") or sch.get("date")
-                # weekly는 날짜 설정의 영향을 받지 않도록 무시
-                if st == "weekly":
-                    sd = None
-                    ed = None
-                def _parse_date(s: str | None):
-                    if not s:
-                        return None
-                    try:
-                        return datetime.strptime(s, "%Y-%m-%d").date()
-                    except Exception:
-                        return None
-                sd_d = _parse_date(sd)
-                ed_d = _parse_date(ed)
-                today_d = now.date()
-                # 유효 기간 이탈 시 스킵
-                if sd_d and today_d < sd_d:
-                    continue
-                if ed_d and today_d > ed_d:
-                    continue
+def _schedule_loop():
+    print(f"[Schedule] Started (event-driven, catch-up={SCHEDULE_CATCHUP_POLICY})")
+    last_wall: datetime | None = None
+    last_mono = 0.0
+    while not _shutdown_event.is_set():
+        sleep_sec = float(SCHEDULE_MAX_SLEEP_SEC)
+        try:
+            now = datetime.now()
+            mono = time.monotonic()
+            if last_wall is None:
+                # 시작 직후에는 유예 시간 안의 이벤트만 (재시작 시 중복 발송 방지)
+                window_start = now - timedelta(seconds=SCHEDULE_GRACE_SEC)
+            else:
+                # 벽시계 진행량과 monotonic 진행량 비교로 시계 점프(NTP 보정, 절전 복귀) 감지
+                jump = (now - last_wall).total_seconds() - (mono - last_mono)
+                if abs(jump) > SCHEDULE_CLOCK_JUMP_SEC:
+                    print(f"[Schedule] clock jump detected: {jump:+.0f}s")
+                    write_action_log("schedule_clock_jump", {"jump_sec": round(jump, 1)})
+                    schedule_runtime["clock_jumps"] = (schedule_runtime["clock_jumps"] + [{"at": now.isoformat(timespec="seconds"), "jump_sec": round(jump, 1)}])[-10:]
+                # 뒤로 점프하면 구간이 비어 있고, 이미 보낸 이벤트는 schedule_last_sent로 중복 방지
+                window_start = max(last_wall, now - timedelta(seconds=SCHEDULE_CATCHUP_MAX_SEC))
+            last_wall, last_mono = now, mono
 
-                if st == "daily":
-                    if _within_5min_window(now_min, s_min):
-                        do_on = True
-                    if _within_5min_window(now_min, e_min):
-                        do_off = True
-                elif st == "weekly":
-                    if sch["weekday"] is not None and sch["weekday"] == weekday:
-                        if _within_5min_window(now_min, s_min):
-                            do_on = True
-                        if _within_5min_window(now_min, e_min):
-                            do_off = True
-                elif st == "once":
-                    # 시작일/종료일 각각 별도 날짜 기준
-                    if sd is None and sch["date"]:
-                        sd = sch["date"]
-                    if ed is None and sch["date"]:
-                        ed = sch["date"]
-                    if sd == today_str:
-                        if _within_5min_window(now_min, s_min):
-                            do_on = True
-                    if ed == today_str:
-                        if _within_5min_window(now_min, e_min):
-                            do_off = True
-
-                # 동일 분 중복 방지
-                if do_on:
-                    key = (sid, "on")
-                    if schedule_last_sent.get(key) != now_min:
-                        print(f"[Schedule] #{sid} ON dispatch (mode={sch['mode']} temp={sch['temp']})")
-                        write_action_log("schedule_on", {"schedule_id": sid, "mode": sch["mode"], "temp": sch["temp"], "time_min": now_min})
-                        _schedule_send_on(sch["mode"], sch["temp"])
-                        schedule_last_sent[key] = now_min
-
-                if do_off:
-                    key = (sid, "off")
-                    if schedule_last_sent.get(key) != now_min:
-                        print(f"[Schedule] #{sid} OFF dispatch")
-                        write_action_log("schedule_off", {"schedule_id": sid, "time_min": now_min})
-                        _schedule_send_off()
-                        schedule_last_sent[key] = now_min
-                        # 1회 예약은 OFF 실행 후 비활성화
-                        if st == "once":
-                            try:
-                                update_schedule(sid, ScheduleUpdate(enabled=False))
-                                write_action_log("schedule_once_disabled", {"schedule_id": sid})
-                                print(f"[Schedule] #{sid} once disabled after OFF")
-                            except Exception as _e:
-                                print(f"[Schedule] #{sid} disable failed: {_e}")
+            schedules = get_enabled_schedules()
+            fire, skip = _select_due_events(schedules, window_start, now)
+            for occ, sch, action in skip:
+                print(f"[Schedule] #{sch['id']} {action.upper()} at {occ:%Y-%m-%d %H:%M} missed -> skipped ({SCHEDULE_CATCHUP_POLICY})")
+                write_action_log("schedule_missed", {"schedule_id": sch["id"], "action": action, "occurrence": occ.isoformat(timespec="minutes")})
+                schedule_last_sent[(sch["id"], action)] = max(occ, schedule_last_sent.get((sch["id"], action), occ))
+                schedule_runtime["skipped"] += 1
+            dispatch_due_events(fire, now)
+
+            # 다음 이벤트 시각까지 대기 (최대 SCHEDULE_MAX_SLEEP_SEC)
+            horizon = now + timedelta(seconds=SCHEDULE_MAX_SLEEP_SEC)
+            upcoming = [
+                occ for sch in schedules
+                for occ, _ in schedule_occurrences(sch, now + timedelta(microseconds=1), horizon)
+            ]
+            next_event = min(upcoming) if upcoming else None
+            if next_event is not None:
+                sleep_sec = max(0.05, (next_event - now).total_seconds() + 0.01)
+            schedule_runtime["last_eval"] = now.isoformat(timespec="seconds")
+            schedule_runtime["next_event"] = next_event.isoformat(timespec="seconds") if next_event else None
         except Exception as e:
             print(f"[Schedule] Error: {e}")
 
-        # 다음 분까지 대기 (초를 0으로 맞추는 간단한 로직)
-        time_to_sleep = 60 - datetime.now().second
-        if time_to_sleep <= 0:
-            time_to_sleep = 60
-        time.sleep(time_to_sleep)
+        schedule_wake.wait(timeout=min(sleep_sec, SCHEDULE_MAX_SLEEP_SEC))
+        schedule_wake.clear()
+    print("[Schedule] Stopped")
 
 def cleanup_devices():
-    now = time.time()
-    with devices_lock:
-        expired = [k for k, v in devices.items() if now - v["last_seen"] > DEVICE_TIMEOUT_SEC]
+    now = clock.time()
+    timeout_sec = tuning.device_timeout_sec
+    with _traced_lock(devices_lock, "devices"):
+        expired = [
+            k for k, v in devices.items()
+            if now - max(v["last_seen"], v.get("restored_at", 0.0)) > timeout_sec
+        ]
         for k in expired:
             devices.pop(k, None)
+            _shm_remove(k)
 
 
 def get_device(device_id: str) -> Dict[str, Any]:
     cleanup_devices()
-    with devices_lock:
+    with _traced_lock(devices_lock, "devices"):
         dev = devices.get(device_id)
     if not dev:
         raise HTTPException(status_code=404, detail=f"Device {device_id} not found")
     return dev
 
 
-def send_ac_command(dev: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+def send_ac_command(dev: Dict[str, Any], params: Dict[str, Any], attempts: int | None = None,
+                    cancel: threading.Event | None = None) -> Dict[str, Any]:
     """GET 요청으로 명령 전달
     - 기본 1회 전송
-    - 실패 시에만 재시도 (AC_SEND_ATTEMPTS로 총 시도 횟수 제어)
+    - 실패 시에만 재시도 (AC_SEND_ATTEMPTS로 총 시도 횟수 제어, attempts로 호출별 지정 가능)
+    - cancel이 set되면 남은 재시도 중단 (같은 장치에 우선순위 높은 명령이 들어온 경우)
     - 간격은 AC_SEND_INTERVAL_SEC를 기반으로 지수 백오프(AC_RETRY_BACKOFF) + 지터(AC_RETRY_JITTER_MS)
+    - UDP_COMMANDS_ENABLED이고 장치가 UDP 명령을 지원하면 UDP로 먼저 보내고, ack가 없을 때만 HTTP
     """
+    token = _inflight_begin(dev, params)
     try:
+        if UDP_COMMANDS_ENABLED and dev.get("udp_port"):
+            udp_result = udp_send_command(dev, params, cancel)
+            if udp_result is not None:
+                return udp_result
+            udp_cmd_stats["fallbacks"] += 1
         url = f"http://{dev['ip']}:{dev['port']}{HTTP_PATH_SET}"
         results = []
-        attempts = max(1, AC_SEND_ATTEMPTS)  # 총 시도 횟수
-        base_interval = max(0.0, AC_SEND_INTERVAL_SEC)
-        backoff = AC_RETRY_BACKOFF if AC_RETRY_BACKOFF >= 1.0 else 1.0
-        jitter_ms = max(0, AC_RETRY_JITTER_MS)
+        # 재시도 설정은 시작 시점의 Tuning 1개에서 (전송 도중 다시 읽어도 섞이지 않음)
+        t = tuning
+        if attempts is None:
+            attempts = t.ac_send_attempts  # 총 시도 횟수
+        base_interval = t.ac_send_interval_sec
+        backoff = t.ac_retry_backoff
+        jitter_ms = t.ac_retry_jitter_ms
 
         for i in range(attempts):
-            try:
-                resp = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
-                results.append({
-                    "ok": resp.ok,
-                    "status_code": resp.status_code,
-                    "attempt": i + 1
-                })
-                # 성공하면 즉시 중단 (추가 재시도 없음)
-                if resp.ok and 200 <= resp.status_code < 300:
-                    break
-            except Exception as e:
-                results.append({
-                    "ok": False,
-                    "error": str(e),
-                    "attempt": i + 1
-                })
+            # 종료 drain 기한이 지나면 재시도 중단 (남은 명령은 저장되어 재시작 후 재전송)
+            if i > 0 and _drain_expired.is_set():
+                results.append({"ok": False, "error": "shutdown", "attempt": i + 1})
+                break
+            if i > 0 and cancel is not None and cancel.is_set():
+                results.append({"ok": False, "error": "preempted", "attempt": i + 1})
+                break
+            with _trace_span("ac_send_attempt", device=dev.get("id"), attempt=i + 1) as span:
+                t0 = time.perf_counter()
+                try:
+                    resp = http_transport.get(url, params=params, timeout=t.http_timeout)
+                    results.append({
+                        "ok": resp.ok,
+                        "status_code": resp.status_code,
+                        "attempt": i + 1
+                    })
+                    span["status_code"] = resp.status_code
+                except Exception as e:
+                    results.append({
+                        "ok": False,
+                        "error": str(e),
+                        "attempt": i + 1
+                    })
+                    span["error"] = str(e)
+                record_health_sample(dev["id"], bool(results[-1]["ok"]), (time.perf_counter() - t0) * 1000.0, "send")
+            # 성공하면 즉시 중단 (추가 재시도 없음)
+            last = results[-1]
+            if last.get("ok") and 200 <= last.get("status_code", 0) < 300:
+                break
             # 실패했고, 마지막 시도가 아니면 대기 후 재시도
             if i < attempts - 1:
                 # 지수 백오프 + 지터
@@ -771,7 +2906,9 @@ def send_ac_command(dev: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, An
                 if jitter_ms > 0:
                     delay += random.uniform(0, jitter_ms / 1000.0)
                 if delay > 0:
-                    time.sleep(delay)
+                    with _trace_span("backoff_sleep", device=dev.get("id"), attempt=i + 1, delay_ms=round(delay * 1000.0, 1)):
+                        # 종료 drain 기한이 지나면 대기를 끊음
+                        _drain_expired.wait(delay)
         
         # 마지막 결과 반환
         last_result = results[-1] if results else {"ok": False, "error": "No attempts made"}
@@ -780,17 +2917,206 @@ def send_ac_command(dev: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, An
             "status_code": last_result.get("status_code", 0),
             "body": last_result.get("body", ""),
             "attempts": len(results),
+            "via": "http",
             "all_results": results
         }
     except Exception as e:
         return {"ok": False, "error": str(e)}
+    finally:
+        _inflight_end(token)
+
+
+# ========================
+# 명령 디스패처 (우선순위 lane별 동시 전송 한도, 대기 중인 하위 명령 선점)
+# ========================
+# interactive: /devices/{id}/ac/set, batch: /devices/control·/all/on·/all/off, schedule: 예약 발송·재시작 후 재전송
+# 빈 슬롯이 생기면 높은 lane의 대기 명령부터 시작. 하위 lane은 DISPATCH_INTERACTIVE_RESERVE만큼 슬롯을 남겨 둠
+DISPATCH_LANES = ("interactive", "batch", "schedule")
+DISPATCH_MAX_CONCURRENCY = int(os.getenv("DISPATCH_MAX_CONCURRENCY", "32"))
+DISPATCH_INTERACTIVE_RESERVE = int(os.getenv("DISPATCH_INTERACTIVE_RESERVE", "4"))
+DISPATCH_LANE_LIMITS = {
+    "interactive": int(os.getenv("DISPATCH_INTERACTIVE_MAX", str(DISPATCH_MAX_CONCURRENCY))),
+    "batch": int(os.getenv("DISPATCH_BATCH_MAX", "16")),
+    "schedule": int(os.getenv("DISPATCH_SCHEDULE_MAX", "16")),
+}
+DISPATCH_WAIT_SAMPLES = 2048   # lane별 대기 시간 표본 수 (최근 것만)
+
+# 현재 요청/작업의 lane (예약 발송 스레드는 dispatch_lane("schedule")로 감쌈)
+_dispatch_lane: contextvars.ContextVar[str] = contextvars.ContextVar("dispatch_lane", default="batch")
+dispatch_lock = threading.Lock()
+_dispatch_queues: Dict[str, collections.deque] = {lane: collections.deque() for lane in DISPATCH_LANES}
+_dispatch_running: Dict[str, int] = {lane: 0 for lane in DISPATCH_LANES}
+_dispatch_active: Dict[str, list[Dict[str, Any]]] = {}     # 장치 id -> 전송 중인 작업
+_dispatch_waits: Dict[str, collections.deque] = {lane: collections.deque(maxlen=DISPATCH_WAIT_SAMPLES) for lane in DISPATCH_LANES}
+dispatch_stats: Dict[str, Dict[str, int]] = {
+    lane: {"submitted": 0, "completed": 0, "preempted": 0, "cancelled": 0} for lane in DISPATCH_LANES
+}
+_dispatch_executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+@contextlib.contextmanager
+def dispatch_lane(lane: str):
+    token = _dispatch_lane.set(lane)
+    try:
+        yield
+    finally:
+        _dispatch_lane.reset(token)
+
+def _dispatch_can_start(lane: str) -> bool:
+    total = sum(_dispatch_running.values())
+    if total >= DISPATCH_MAX_CONCURRENCY or _dispatch_running[lane] >= DISPATCH_LANE_LIMITS[lane]:
+        return False
+    return lane == "interactive" or total < DISPATCH_MAX_CONCURRENCY - DISPATCH_INTERACTIVE_RESERVE
+
+def _dispatch_pump_locked() -> None:
+    global _dispatch_executor
+    for lane in DISPATCH_LANES:
+        q = _dispatch_queues[lane]
+        while q and _dispatch_can_start(lane):
+            job = q.popleft()
+            # 기다리다 취소된 작업은 건너뜀
+            if not job["future"].set_running_or_notify_cancel():
+                dispatch_stats[lane]["cancelled"] += 1
+                continue
+            _dispatch_running[lane] += 1
+            job["started"] = time.monotonic()
+            _dispatch_waits[lane].append((job["started"] - job["enqueued"]) * 1000.0)
+            _dispatch_active.setdefault(job["dev"]["id"], []).append(job)
+            if _dispatch_executor is None:
+                _dispatch_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, DISPATCH_MAX_CONCURRENCY), thread_name_prefix="dispatch")
+            _dispatch_executor.submit(_dispatch_run, job)
+
+def _dispatch_run(job: Dict[str, Any]) -> None:
+    fut = job["future"]
+    try:
+        fut.set_result(job["ctx"].run(send_ac_command, job["dev"], job["params"], job["attempts"], job["cancel"]))
+    except BaseException as e:
+        fut.set_exception(e)
+    finally:
+        with dispatch_lock:
+            lane = job["lane"]
+            _dispatch_running[lane] -= 1
+            dispatch_stats[lane]["completed"] += 1
+            active = _dispatch_active.get(job["dev"]["id"])
+            if active is not None:
+                active.remove(job)
+                if not active:
+                    _dispatch_active.pop(job["dev"]["id"], None)
+            _dispatch_pump_locked()
+
+def _dispatch_preempt_locked(dev_id: str, lane: str) -> None:
+    # 같은 장치의 하위 lane 명령은 나중에 실행되면 새 명령을 덮어쓰므로: 대기 중이면 취소, 전송 중이면 재시도 중단
+    rank = DISPATCH_LANES.index(lane)
+    for lower in DISPATCH_LANES[rank + 1:]:
+        q = _dispatch_queues[lower]
+        victims = [job for job in q if job["dev"]["id"] == dev_id]
+        for job in victims:
+            q.remove(job)
+            if job["future"].set_running_or_notify_cancel():
+                job["future"].set_result({"ok": False, "error": "preempted", "preempted_by": lane})
+                dispatch_stats[lower]["preempted"] += 1
+    for job in _dispatch_active.get(dev_id, ()):
+        if DISPATCH_LANES.index(job["lane"]) > rank:
+            job["cancel"].set()
+    _udp_group_preempt(dev_id, lane)
+
+def _dispatch_submit(dev: Dict[str, Any], params: Dict[str, Any], attempts: int | None, lane: str | None) -> Dict[str, Any]:
+    lane = lane or _dispatch_lane.get()
+    if lane not in _dispatch_queues:
+        raise ValueError(f"unknown dispatch lane: {lane}")
+    job = {
+        "lane": lane, "dev": dev, "params": params, "attempts": attempts,
+        "future": concurrent.futures.Future(), "cancel": threading.Event(),
+        "ctx": contextvars.copy_context(), "enqueued": time.monotonic(), "started": None,
+    }
+    with dispatch_lock:
+        dispatch_stats[lane]["submitted"] += 1
+        _dispatch_preempt_locked(dev["id"], lane)
+        _dispatch_queues[lane].append(job)
+        _dispatch_pump_locked()
+    return job
+
+def dispatch_command(dev: Dict[str, Any], params: Dict[str, Any], attempts: int | None = None,
+                     lane: str | None = None) -> concurrent.futures.Future:
+    """send_ac_command를 lane 우선순위에 맞춰 실행. 결과는 Future로 (lane 생략 시 현재 컨텍스트의 lane)"""
+    return _dispatch_submit(dev, params, attempts, lane)["future"]
+
+def run_fanout(devs: list[Dict[str, Any]], params: Dict[str, Any] | None, timeout_sec: float,
+               lane: str | None = None, params_by_id: Dict[str, Dict[str, Any]] | None = None) -> Dict[str, Dict[str, Any]]:
+    """여러 장치에 명령을 병렬 전송 (health 점수 순). 전송 시작 후 timeout_sec 안에 끝나지 않은 장치는 timeout으로 표기
+    params_by_id가 있으면 장치별 명령 (장면), 없으면 모든 장치에 params.
+    lane 한도 때문에 대기한 시간은 timeout에 넣지 않음: 대기만 하던 장치도 끝까지 전송됨"""
+    jobs: Dict[concurrent.futures.Future, Dict[str, Any]] = {}
+    for dev, attempts in plan_fanout(devs):
+        dev_params = params_by_id[dev["id"]] if params_by_id is not None else params
+        job = _dispatch_submit(dev, dev_params, attempts, lane)
+        jobs[job["future"]] = job
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = set(jobs)
+    while pending:
+        # 가장 먼저 끝나야 하는 전송 중 작업의 마감까지 대기. 아직 아무것도 시작 전이면 timeout_sec
+        # (그 뒤에 시작하는 작업의 마감은 항상 그보다 늦음)
+        now = time.monotonic()
+        deadlines = [jobs[f]["started"] + timeout_sec for f in pending if jobs[f]["started"] is not None]
+        wait_sec = max(0.0, min(deadlines) - now) if deadlines else max(timeout_sec, 0.01)
+        done, pending = concurrent.futures.wait(pending, timeout=wait_sec, return_when=concurrent.futures.ALL_COMPLETED)
+        for fut in done:
+            try:
+                results[jobs[fut]["dev"]["id"]] = fut.result()
+            except Exception as e:
+                results[jobs[fut]["dev"]["id"]] = {"ok": False, "error": str(e)}
+        # 마감이 지난 전송 중 작업만 timeout으로 표기 (전송 자체는 끝까지 실행됨)
+        now = time.monotonic()
+        expired = {f for f in pending if jobs[f]["started"] is not None and now - jobs[f]["started"] >= timeout_sec}
+        for fut in expired:
+            results[jobs[fut]["dev"]["id"]] = {"ok": False, "error": "timeout", "timeout_sec": timeout_sec}
+        pending -= expired
+    return results
+
+def _wait_percentiles(samples) -> Dict[str, float | None]:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    pick = lambda pct: round(ordered[min(len(ordered) - 1, int(pct / 100.0 * (len(ordered) - 1) + 0.5))], 2)
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": round(ordered[-1], 2)}
+
+def dispatch_status() -> Dict[str, Any]:
+    with dispatch_lock:
+        lanes = {
+            lane: {
+                "limit": DISPATCH_LANE_LIMITS[lane],
+                "running": _dispatch_running[lane],
+                "queued": len(_dispatch_queues[lane]),
+                **dispatch_stats[lane],
+                "wait_ms": _wait_percentiles(_dispatch_waits[lane]),
+            }
+            for lane in DISPATCH_LANES
+        }
+    return {
+        "max_concurrency": DISPATCH_MAX_CONCURRENCY,
+        "interactive_reserve": DISPATCH_INTERACTIVE_RESERVE,
+        "lanes": lanes,
+        "idempotency": {"keys": len(_idem_entries), "ttl_sec": IDEMPOTENCY_TTL_SEC, **idempotency_stats},
+    }
+
+def _shutdown_dispatcher():
+    # drain 이후에도 대기 중인 명령은 종료로 표기 (전송 중인 명령은 drain에서 처리됨)
+    with dispatch_lock:
+        for lane in DISPATCH_LANES:
+            q = _dispatch_queues[lane]
+            while q:
+                job = q.popleft()
+                if job["future"].set_running_or_notify_cancel():
+                    job["future"].set_result({"ok": False, "error": "shutdown"})
+    if _dispatch_executor is not None:
+        _dispatch_executor.shutdown(wait=False)
 
 
 def get_device_health(dev: Dict[str, Any]) -> Dict[str, Any]:
     """장치 health check"""
     try:
         url = f"http://{dev['ip']}:{dev['port']}/health"
-        resp = requests.get(url, timeout=HTTP_TIMEOUT)
+        resp = http_transport.get(url, timeout=tuning.http_timeout)
         return {"ok": resp.ok, "status_code": resp.status_code}
     except Exception as e:
         return {"ok": False, "error": str(e)}
@@ -800,7 +3126,7 @@ def get_device_state(dev: Dict[str, Any]) -> Dict[str, Any]:
     """장치 상태 조회"""
     try:
         url = f"http://{dev['ip']}:{dev['port']}/ac/state"
-        resp = requests.get(url, timeout=HTTP_TIMEOUT)
+        resp = http_transport.get(url, timeout=tuning.http_timeout)
         if resp.ok:
             return {"ok": True, "state": resp.json()}
         return {"ok": False, "status_code": resp.status_code}
@@ -808,6 +3134,243 @@ def get_device_state(dev: Dict[str, Any]) -> Dict[str, Any]:
         return {"ok": False, "error": str(e)}
 
 
+# ========================
+# 장치 상태 읽기 (캐시 우선, 장치별 single-flight, 백그라운드 갱신)
+# ========================
+# 동시에 같은 장치를 조회하면 HTTP 요청 1개를 공유. 성공한 결과는 장치 목록의 상태 캐시에 반영
+STATE_REFRESH_WORKERS = int(os.getenv("STATE_REFRESH_WORKERS", "8"))
+# 백그라운드 갱신을 같은 장치에 다시 시도하기까지 최소 간격(초). 응답 없는 장치로 매 조회마다 요청하지 않도록
+STATE_REFRESH_MIN_INTERVAL_SEC = float(os.getenv("STATE_REFRESH_MIN_INTERVAL_SEC", "30"))
+
+_state_flights: Dict[str, concurrent.futures.Future] = {}
+_state_flights_lock = threading.Lock()
+_state_refresh_last: Dict[str, float] = {}
+_state_executor: concurrent.futures.ThreadPoolExecutor | None = None
+state_read_stats: Dict[str, int] = {"cache_hits": 0, "live_fetches": 0, "coalesced": 0, "background_refreshes": 0, "stale_served": 0}
+
+def _fetch_state_into_cache(dev: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        result = get_device_state(dev)
+        if result.get("ok") and isinstance(result.get("state"), dict):
+            _apply_observed_state(dev["id"], result["state"])
+        return result
+    finally:
+        with _state_flights_lock:
+            _state_flights.pop(dev["id"], None)
+
+def fetch_state_live(dev: Dict[str, Any]) -> concurrent.futures.Future:
+    """장치 상태 HTTP 조회 (single-flight). 진행 중인 조회가 있으면 그 Future를 공유"""
+    global _state_executor
+    dev_id = dev["id"]
+    with _state_flights_lock:
+        fut = _state_flights.get(dev_id)
+        if fut is not None:
+            state_read_stats["coalesced"] += 1
+            return fut
+        if _state_executor is None:
+            _state_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, STATE_REFRESH_WORKERS), thread_name_prefix="state")
+        state_read_stats["live_fetches"] += 1
+        _state_refresh_last[dev_id] = time.monotonic()
+        fut = _state_executor.submit(_fetch_state_into_cache, dev)
+        _state_flights[dev_id] = fut
+    return fut
+
+def refresh_state_background(dev: Dict[str, Any]) -> bool:
+    """오래된 상태 캐시를 기다리지 않고 갱신 요청. 최근에 시도했으면 생략하고 False"""
+    with _state_flights_lock:
+        if dev["id"] in _state_flights:
+            return True
+        last = _state_refresh_last.get(dev["id"])
+        if last is not None and time.monotonic() - last < STATE_REFRESH_MIN_INTERVAL_SEC:
+            return False
+    state_read_stats["background_refreshes"] += 1
+    fetch_state_live(dev)
+    return True
+
+def read_device_state(dev: Dict[str, Any], max_age: float | None = None) -> Dict[str, Any]:
+    """상태 캐시가 max_age초 이내면 캐시, 아니면 HTTP 조회 (동시 조회는 1건으로 합침).
+    max_age가 None이면 STATE_OK_MAX_AGE_SEC, 0이면 항상 조회. 조회 실패 시 캐시가 있으면 stale로 표시해 반환"""
+    t = tuning
+    if max_age is None:
+        max_age = t.state_ok_max_age_sec
+    cached = dev.get("state")
+    age = None
+    if cached is not None and dev.get("state_last_seen"):
+        age = max(0.0, clock.time() - float(dev["state_last_seen"]))
+        if age <= max_age:
+            state_read_stats["cache_hits"] += 1
+            return {"ok": True, "state": cached, "source": "cache", "age_sec": int(age)}
+    fut = fetch_state_live(dev)
+    try:
+        result = fut.result(timeout=t.http_timeout + 1.0)
+    except concurrent.futures.TimeoutError:
+        result = {"ok": False, "error": "timeout"}
+    if result.get("ok"):
+        return {**result, "source": "live", "age_sec": 0}
+    if cached is not None:
+        state_read_stats["stale_served"] += 1
+        return {"ok": True, "state": cached, "source": "cache", "stale": True, "age_sec": None if age is None else int(age),
+                "live_error": result.get("error") or result.get("status_code")}
+    return {**result, "source": "live"}
+
+def _shutdown_state_reads():
+    if _state_executor is not None:
+        _state_executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ========================
+# 능동 health 점검 (장치별 위험도에 맞춘 주기, 지연/성공률 EWMA 점수)
+# ========================
+# 장치 /health를 백그라운드로 점검. 실패가 잦은 장치는 자주, 안정된 장치는 드물게.
+# 명령 전송 결과도 같은 점수에 반영하므로 최근에 명령을 받은 장치는 점검이 미뤄짐
+HEALTH_PROBE_ENABLED = os.getenv("HEALTH_PROBE_ENABLED", "1").lower() in ("1", "true", "yes")
+HEALTH_PROBE_MIN_INTERVAL_SEC = float(os.getenv("HEALTH_PROBE_MIN_INTERVAL_SEC", "15"))
+HEALTH_PROBE_MAX_INTERVAL_SEC = float(os.getenv("HEALTH_PROBE_MAX_INTERVAL_SEC", "300"))
+# 초당 최대 점검 수. 점검을 시간축에 고르게 펼쳐 장치가 많아도 한꺼번에 몰리지 않게
+HEALTH_PROBE_RATE_PER_SEC = float(os.getenv("HEALTH_PROBE_RATE_PER_SEC", "5"))
+HEALTH_PROBE_WORKERS = int(os.getenv("HEALTH_PROBE_WORKERS", "4"))
+HEALTH_EWMA_ALPHA = 0.3
+HEALTH_LATENCY_REF_MS = 200.0   # 이 지연까지는 점수 감점 없음
+HEALTH_UNKNOWN_SCORE = 0.5      # 아직 표본이 없는 장치의 정렬용 점수
+# 이 점수 이하인 장치는 일괄 전송에서 맨 뒤로, 재시도 없이 1회만 전송
+HEALTH_LOW_SCORE = float(os.getenv("HEALTH_LOW_SCORE", "0.2"))
+
+health_lock = threading.Lock()
+# id -> {"success", "latency_ms", "score", "samples", "fails_in_row", "last_ok", "last_fail", "next_probe"}
+health_scores: Dict[str, Dict[str, Any]] = {}
+health_version = 0   # 점수가 바뀔 때마다 증가 (팔로워 동기화용)
+health_probe_stats: Dict[str, int] = {"probes": 0, "probe_failures": 0, "send_samples": 0}
+
+def _health_score(h: Dict[str, Any]) -> float:
+    lat = h.get("latency_ms")
+    lat_factor = 1.0 if lat is None or lat <= HEALTH_LATENCY_REF_MS else HEALTH_LATENCY_REF_MS / lat
+    return round(h["success"] * lat_factor, 3)
+
+def _probe_interval(h: Dict[str, Any]) -> float:
+    # 점수 1.0이면 최대 주기, 0.5 이하이면 최소 주기
+    lo, hi = HEALTH_PROBE_MIN_INTERVAL_SEC, max(HEALTH_PROBE_MIN_INTERVAL_SEC, HEALTH_PROBE_MAX_INTERVAL_SEC)
+    if h["fails_in_row"]:
+        # 연속 실패는 최소 주기에서 시작해 2배씩 (꺼진 장치를 계속 최소 주기로 두드리지 않게, 최대 8배)
+        interval = min(hi, lo * min(8, 2 ** (h["fails_in_row"] - 1)))
+    else:
+        interval = hi - (hi - lo) * min(1.0, (1.0 - h["score"]) * 2.0)
+    # 같은 시각에 등록된 장치들이 계속 같이 점검되지 않도록 ±20% 지터
+    return interval * random.uniform(0.8, 1.2)
+
+def record_health_sample(dev_id: str, ok: bool, latency_ms: float | None = None, source: str = "probe") -> None:
+    """점검/명령 전송 결과 1건을 EWMA 점수에 반영하고 다음 점검 시각을 정함"""
+    global health_version
+    now = clock.time()
+    a = HEALTH_EWMA_ALPHA
+    with health_lock:
+        h = health_scores.get(dev_id)
+        if h is None or not h["samples"]:
+            # 첫 표본은 그대로 (_next_probe_due가 만든 예약용 항목 포함)
+            h = {"success": 1.0 if ok else 0.0, "latency_ms": None, "samples": 0, "fails_in_row": 0}
+            health_scores[dev_id] = h
+        else:
+            h["success"] = (1 - a) * h["success"] + a * (1.0 if ok else 0.0)
+        # 지연은 성공한 응답만 (실패는 대부분 타임아웃이라 성공률로 반영)
+        if ok and latency_ms is not None:
+            h["latency_ms"] = latency_ms if h["latency_ms"] is None else (1 - a) * h["latency_ms"] + a * latency_ms
+        h["samples"] += 1
+        h["fails_in_row"] = 0 if ok else h["fails_in_row"] + 1
+        h["last_ok" if ok else "last_fail"] = now
+        h["source"] = source
+        h["score"] = _health_score(h)
+        h["next_probe"] = now + _probe_interval(h)
+        health_version += 1
+    if source != "probe":
+        health_probe_stats["send_samples"] += 1
+
+def health_score_of(dev_id: str) -> float | None:
+    h = health_scores.get(dev_id)
+    return None if h is None else h.get("score")
+
+def plan_fanout(devs: list[Dict[str, Any]]) -> list[tuple[Dict[str, Any], int | None]]:
+    """일괄 전송 순서와 장치별 시도 횟수. 점수 높은 장치부터 보내고,
+    점수가 HEALTH_LOW_SCORE 이하인 장치는 맨 뒤에 재시도 없이 1회 (None이면 설정값)"""
+    scored = [(dev, health_score_of(dev["id"])) for dev in devs]
+    scored.sort(key=lambda item: -(HEALTH_UNKNOWN_SCORE if item[1] is None else item[1]))
+    return [(dev, 1 if score is not None and score <= HEALTH_LOW_SCORE else None) for dev, score in scored]
+
+def probe_device(dev: Dict[str, Any]) -> Dict[str, Any]:
+    """/health 점검 1회 (지연 측정 후 점수 반영)"""
+    t0 = time.perf_counter()
+    result = get_device_health(dev)
+    latency_ms = (time.perf_counter() - t0) * 1000.0
+    ok = bool(result.get("ok"))
+    record_health_sample(dev["id"], ok, latency_ms)
+    health_probe_stats["probes"] += 1
+    if not ok:
+        health_probe_stats["probe_failures"] += 1
+    return {**result, "latency_ms": round(latency_ms, 1)}
+
+def _next_probe_due(now: float, busy: set) -> Dict[str, Any] | None:
+    """점검 시각이 가장 많이 지난 장치 1개. 처음 보는 장치는 최소 주기 안의 임의 시각으로 예약해 분산"""
+    with devices_lock:
+        devs = list(devices.values())
+    best, best_due = None, None
+    with health_lock:
+        for dev in devs:
+            if dev["id"] in busy:
+                continue
+            h = health_scores.get(dev["id"])
+            if h is None:
+                h = {"success": 1.0, "latency_ms": None, "samples": 0, "fails_in_row": 0, "score": None,
+                     "next_probe": now + random.uniform(0, HEALTH_PROBE_MIN_INTERVAL_SEC)}
+                health_scores[dev["id"]] = h
+            due = h["next_probe"]
+            if due <= now and (best_due is None or due < best_due):
+                best, best_due = dev, due
+        # 사라진 장치 정리
+        if len(health_scores) > len(devs):
+            live = {dev["id"] for dev in devs}
+            for dev_id in [k for k in health_scores if k not in live]:
+                health_scores.pop(dev_id, None)
+    return best
+
+def _health_probe_loop():
+    tick = 1.0 / max(0.1, HEALTH_PROBE_RATE_PER_SEC)
+    workers = max(1, HEALTH_PROBE_WORKERS)
+    busy: set = set()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe")
+
+    def _run(dev):
+        try:
+            probe_device(dev)
+        finally:
+            busy.discard(dev["id"])
+
+    try:
+        while not _shutdown_event.wait(tick):
+            if len(busy) >= workers:
+                continue
+            dev = _next_probe_due(clock.time(), busy)
+            if dev is None:
+                continue
+            busy.add(dev["id"])
+            executor.submit(_run, dev)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def export_health_scores() -> Dict[str, list]:
+    # 팔로워 동기화용 압축 형식: id -> [score, success, latency_ms, fails_in_row, last_ok]
+    with health_lock:
+        return {
+            k: [h.get("score"), round(h["success"], 3), None if h["latency_ms"] is None else round(h["latency_ms"], 1),
+                h["fails_in_row"], h.get("last_ok")]
+            for k, h in health_scores.items() if h["samples"]
+        }
+
+def import_health_scores(data: Dict[str, list]) -> None:
+    with health_lock:
+        health_scores.clear()
+        for dev_id, (score, success, latency_ms, fails_in_row, last_ok) in data.items():
+            health_scores[dev_id] = {"score": score, "success": success, "latency_ms": latency_ms, "samples": 1,
+                                     "fails_in_row": fails_in_row, "last_ok": last_ok, "next_probe": float("inf")}
+
+
 # ========================
 # 서버 시계 동기화
 # ========================
@@ -884,9 +3447,14 @@ def _time_sync_loop():
         print("[TimeSync] Disabled by TIME_SYNC_ENABLED=0")
         return
     print(f"[TimeSync] Enabled: interval={TIME_SYNC_INTERVAL_SEC}s server={NTP_SERVER}")
+    if _shutdown_event.wait(TIME_SYNC_START_DELAY_SEC):
+        return
     while True:
         try:
-            result = sync_system_time(NTP_SERVER)
+            with startup_task("time_sync", once=True) as task:
+                result = sync_system_time(NTP_SERVER)
+                if task is not None and not result.get("ok"):
+                    task["state"] = "failed"
             status = "ok" if result.get("ok") else "fail"
             print(f"[TimeSync] Sync {status}: {result.get('server')}")
             if not result.get("ok"):
@@ -894,74 +3462,219 @@ def _time_sync_loop():
         except Exception as e:
             print(f"[TimeSync] Error: {e}")
         # 다음 주기까지 대기
-        time.sleep(TIME_SYNC_INTERVAL_SEC)
+        if _shutdown_event.wait(TIME_SYNC_INTERVAL_SEC):
+            return
 
 
 @app.get("/devices")
 def list_devices():
     cleanup_devices()
-    with devices_lock:
+    with _traced_lock(devices_lock, "devices"):
         return list(devices.values())
 
 
+@app.get("/discovery")
+def get_discovery():
+    """discover 대상 서브넷과 전송 통계"""
+    if cluster_state["role"] == "follower":
+        return leader_view("discovery")
+    now = clock.time()
+    t = tuning
+    return {
+        "targets": [
+            {**t, "last_sent_age_sec": int(now - t["last_sent"]) if t["last_sent"] else None}
+            for t in list(discovery_targets)
+        ],
+        "adaptive": {
+            "enabled": t.discovery_adaptive,
+            "interval_sec": discovery_state["interval_sec"] if t.discovery_adaptive else t.discovery_broadcast_interval_sec,
+            "min_interval_sec": t.discovery_min_interval_sec,
+            "max_interval_sec": t.discovery_max_interval_sec,
+            "stable_rounds": discovery_state["stable_rounds"],
+            "last_plan": discovery_state["last_plan"],
+            "load": discovery_load_report(discovery_state, now),
+        },
+        "unicast_sweep": t.discovery_unicast_sweep,
+        "unicast_interval_sec": t.discovery_interval_sec,
+        "stats": dict(discovery_stats),
+        "udp_commands": {"enabled": UDP_COMMANDS_ENABLED, **udp_cmd_stats},
+        "udp_drops": {"enabled": UDP_PREFILTER_ENABLED, "own_ips": sorted(udp_own_ips), **udp_drop_stats},
+        "ingest": {"queue_enabled": INGEST_QUEUE_ENABLED, "queue_size": ingest_queue.qsize(), **ingest_stats},
+        "state_reads": {"inflight": len(_state_flights), **state_read_stats},
+        "health_probe": {"enabled": HEALTH_PROBE_ENABLED, "tracked": len(health_scores), **health_probe_stats},
+    }
+
+
 @app.get("/devices/{device_id}/health")
-def get_health(device_id: str):
+def get_health(device_id: str, probe: bool = False):
+    """브로드캐스트/점검 점수 기반 health. probe=1이면 모듈 /health를 바로 점검한 뒤 반영"""
     dev = get_device(device_id)
+    probe_result = probe_device(dev) if probe else None
     result = compute_broadcast_health(dev)
+    if probe_result is not None:
+        result["probe"] = probe_result
     return {"device": dev["id"], "health": result}
 
 
 @app.get("/devices/{device_id}/ac/state")
-def get_state(device_id: str):
+def get_state(device_id: str, max_age: float | None = None):
+    """상태 조회. max_age초 이내의 캐시가 있으면 캐시 (기본 STATE_OK_MAX_AGE_SEC, 0이면 모듈에 직접 조회)"""
+    if max_age is not None and max_age < 0:
+        raise HTTPException(status_code=400, detail="max_age must be >= 0")
     dev = get_device(device_id)
-    result = get_device_state(dev)
+    result = read_device_state(dev, max_age)
     return {"device": dev["id"], **result}
 
 
-@app.get("/devices/get_status")
-def get_all_status():
-    """모든 장치의 상태를 한번에 조회"""
+def _status_state(dev: Dict[str, Any], health: Dict[str, Any], now_ts: float) -> tuple[Any, int | None, bool]:
+    """(상태, 상태 연령, 캐시 사용 여부). 캐시가 오래됐으면 필요 시 백그라운드 HTTP 갱신 요청"""
+    state_obj = None
+    state_age_sec = None
+    from_cache = False
+    if "state" in dev and "state_last_seen" in dev:
+        state_age_sec = int(max(0, now_ts - float(dev.get("state_last_seen", 0))))
+        if state_age_sec <= tuning.state_ok_max_age_sec:
+            state_obj = dev.get("state")
+            from_cache = True
+    # 필요 시에만 HTTP fallback (구형 펌웨어 호환), 기본 비활성
+    # 요청 안에서 기다리지 않고 백그라운드로 갱신 (다음 조회부터 캐시로 응답)
+    if state_obj is None and tuning.state_http_fallback and health.get("ok"):
+        refresh_state_background(dev)
+    return state_obj, state_age_sec, from_cache
+
+def build_status_entry(dev: Dict[str, Any], now_ts: float) -> Dict[str, Any]:
+    # 브로드캐스트 기반 health 계산
+    health = compute_broadcast_health(dev)
+    # 상태 캐시 사용 (브로드캐스트 응답에 포함된 최신 상태)
+    state_obj, state_age_sec, _ = _status_state(dev, health, now_ts)
+    return {
+        "id": dev["id"],
+        "ip": dev["ip"],
+        "port": dev["port"],
+        "last_seen": dev.get("last_seen"),
+        "last_seen_age_sec": int(max(0, now_ts - float(dev.get("last_seen", 0)))) if dev.get("last_seen") else None,
+        "health": health,
+        "state": state_obj,
+        "state_last_seen": dev.get("state_last_seen"),
+        "state_last_seen_age_sec": state_age_sec,
+        "unverified": bool(dev.get("unverified")),
+    }
+
+def build_status_list() -> list[Dict[str, Any]]:
     cleanup_devices()
-    with devices_lock:
+    with _traced_lock(devices_lock, "devices"):
         devs = list(devices.values())
-    
-    status_list = []
-    now_ts = time.time()
+    now_ts = clock.time()
+    return [build_status_entry(dev, now_ts) for dev in devs]
+
+# 장치별 직렬화 조각 캐시: id -> (rev, head, state, tail). rev가 바뀐 장치만 다시 직렬화
+_status_fragments: Dict[str, tuple[int, bytes, bytes, bytes]] = {}
+
+def _status_fragment(dev: Dict[str, Any]) -> tuple[int, bytes, bytes, bytes]:
+    """장치의 (rev, head, state, tail) 조각. rev가 바뀐 경우에만 다시 직렬화"""
+    dev_id = dev["id"]
+    rev = dev.get("rev", 0)
+    frag = _status_fragments.get(dev_id)
+    if frag is None or frag[0] != rev:
+        head = _json_bytes({"id": dev_id, "ip": dev["ip"], "port": dev["port"]})[:-1]
+        state_b = _json_bytes(dev["state"]) if "state" in dev else b"null"
+        tail = b',"unverified":true}' if dev.get("unverified") else b',"unverified":false}'
+        frag = (rev, head, state_b, tail)
+        _status_fragments[dev_id] = frag
+    return frag
+
+def _status_entry_join(dev: Dict[str, Any], frag: tuple, health: Dict[str, Any], state_out: bytes,
+                       state_age_sec: int | None, now_ts: float) -> bytes:
+    """캐시된 조각과 시간 의존 부분(last_seen 연령, health, 상태 연령)을 이어 붙여 항목 1개 완성"""
+    _, head, _, tail = frag
+    last_seen = dev.get("last_seen")
+    last_seen_age = int(max(0, now_ts - float(last_seen))) if last_seen else None
+    return b"".join((
+        head,
+        b',"last_seen":', _json_bytes(last_seen),
+        b',"last_seen_age_sec":', _json_bytes(last_seen_age),
+        b',"health":', _json_bytes(health),
+        b',"state":', state_out,
+        b',"state_last_seen":', _json_bytes(dev.get("state_last_seen")),
+        b',"state_last_seen_age_sec":', _json_bytes(state_age_sec),
+        tail,
+    ))
+
+def _status_entry_bytes(dev: Dict[str, Any], now_ts: float) -> bytes:
+    """build_status_entry와 같은 내용을 바이트로. 고정 부분은 캐시, 시간 의존 부분만 매번 직렬화"""
+    frag = _status_fragment(dev)
+    health = compute_broadcast_health(dev)
+    state_obj, state_age_sec, from_cache = _status_state(dev, health, now_ts)
+    state_out = frag[2] if from_cache else _json_bytes(state_obj)
+    return _status_entry_join(dev, frag, health, state_out, state_age_sec, now_ts)
+
+def _prune_status_fragments(devs: list[Dict[str, Any]]) -> None:
+    # 사라진 장치의 조각 정리
+    if len(_status_fragments) > 2 * len(devs) + 16:
+        live = {dev["id"] for dev in devs}
+        for dev_id in [k for k in _status_fragments if k not in live]:
+            _status_fragments.pop(dev_id, None)
+
+def build_status_payload() -> bytes:
+    """/devices/status 응답 본문 (장치별 조각을 이어 붙임)"""
+    cleanup_devices()
+    with _traced_lock(devices_lock, "devices"):
+        devs = list(devices.values())
+    now_ts = clock.time()
+    body = b"[" + b",".join(_status_entry_bytes(dev, now_ts) for dev in devs) + b"]"
+    _prune_status_fragments(devs)
+    return body
+
+def build_status_delta(since: int) -> bytes:
+    """/devices/status?since= 응답 본문: since(registry 버전) 이후 rev가 바뀐 장치만 전체 항목으로 보냄
+
+    health/상태 만료는 시간에 따라 바뀌고 rev에 잡히지 않으므로 모든 장치에 대해 id 목록으로만 보냄
+    - changed: 바뀐 장치 항목 (state는 만료 여부와 관계없이 캐시 원본)
+    - down: health.ok가 false인 장치 id, stale: 상태 캐시가 만료되어 표시하지 않을 장치 id
+    - count: 전체 장치 수. 클라이언트가 가진 장치 수와 다르면(삭제 발생) since=0으로 다시 받음
+    since가 현재 버전보다 크면(서버 재시작, 버전이 뒤처진 워커) 전체(full)를 보냄
+    """
+    cleanup_devices()
+    with _traced_lock(devices_lock, "devices"):
+        devs = list(devices.values())
+        version = registry_version
+    full = since <= 0 or since > version
+    now_ts = clock.time()
+    changed: list[bytes] = []
+    down: list[str] = []
+    stale: list[str] = []
     for dev in devs:
-        # 브로드캐스트 기반 health 계산
         health = compute_broadcast_health(dev)
-        # 상태 캐시 사용 (브로드캐스트 응답에 포함된 최신 상태)
-        state_obj = None
-        state_age_sec = None
-        if "state" in dev and "state_last_seen" in dev:
-            state_age_sec = int(max(0, now_ts - float(dev.get("state_last_seen", 0))))
-            if state_age_sec <= STATE_OK_MAX_AGE_SEC:
-                state_obj = dev.get("state")
-        # 필요 시에만 HTTP fallback (구형 펌웨어 호환), 기본 비활성
-        if state_obj is None and STATE_HTTP_FALLBACK and health.get("ok"):
-            http_state = get_device_state(dev)
-            if http_state.get("ok"):
-                state_obj = http_state.get("state")
-                state_age_sec = 0
-        
-        status = {
-            "id": dev["id"],
-            "ip": dev["ip"],
-            "port": dev["port"],
-            "last_seen": dev.get("last_seen"),
-            "last_seen_age_sec": int(max(0, now_ts - float(dev.get("last_seen", 0)))) if dev.get("last_seen") else None,
-            "health": health,
-            "state": state_obj,
-            "state_last_seen": dev.get("state_last_seen"),
-            "state_last_seen_age_sec": state_age_sec,
-        }
-        status_list.append(status)
-    return status_list
+        state_obj, state_age_sec, from_cache = _status_state(dev, health, now_ts)
+        if not health.get("ok"):
+            down.append(dev["id"])
+        if not from_cache and "state" in dev:
+            stale.append(dev["id"])
+        if full or dev.get("rev", 0) > since:
+            frag = _status_fragment(dev)
+            changed.append(_status_entry_join(dev, frag, health, frag[2], state_age_sec, now_ts))
+    _prune_status_fragments(devs)
+    return b"".join((
+        b'{"version":', _json_bytes(version),
+        b',"full":', b"true" if full else b"false",
+        b',"count":', _json_bytes(len(devs)),
+        b',"changed":[', b",".join(changed),
+        b'],"down":', _json_bytes(down),
+        b',"stale":', _json_bytes(stale),
+        b"}",
+    ))
+
+@app.get("/devices/get_status")
+def get_all_status(since: int | None = None):
+    """모든 장치의 상태를 한번에 조회. since(이전 응답의 version)를 주면 그 이후 바뀐 장치만 (build_status_delta)"""
+    if since is not None:
+        return json_bytes_response(build_status_delta(since))
+    return json_bytes_response(build_status_payload())
 
 # Web 호환용 별칭 (기존 프론트가 /devices/status를 호출)
 @app.get("/devices/status")
-def get_all_status_alias():
-    return get_all_status()
+def get_all_status_alias(since: int | None = None):
+    return get_all_status(since)
 
 
 @app.post("/time/sync")
@@ -987,14 +3700,187 @@ def webhook():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ========================
+# Idempotency-Key (클라이언트 재시도가 명령을 다시 보내지 않도록)
+# ========================
+# 같은 키의 요청이 실행 중이면 그 결과를 함께 기다리고, 끝난 뒤 IDEMPOTENCY_TTL_SEC 안의 재요청은 저장된 결과로 응답.
+# 키 표는 프로세스 하나(리더)에만 두고 팔로워는 클러스터 소켓으로 조회 (어느 워커로 재시도가 와도 같은 결과)
+IDEMPOTENCY_TTL_SEC = float(os.getenv("IDEMPOTENCY_TTL_SEC", "300"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "1024"))
+# 실행 중인 같은 키 요청을 기다리는 최대 시간(초). 넘으면 409
+IDEMPOTENCY_WAIT_SEC = float(os.getenv("IDEMPOTENCY_WAIT_SEC", "30"))
+IDEMPOTENCY_KEY_MAX_LEN = 255
+
+_idem_lock = threading.Lock()
+# key -> {"fp": 요청 지문, "future": (상태, 결과)를 받을 Future, "done_at": 완료 시각(monotonic) 또는 None}
+_idem_entries: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()
+idempotency_stats: Dict[str, int] = {"executed": 0, "replayed": 0, "attached": 0, "conflicts": 0}
+
+def _idem_fingerprint(op: str, payload: Any) -> str:
+    return hashlib.sha256(json.dumps([op, payload], sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+def _idem_begin_local(key: str, fp: str) -> tuple[str, Any]:
+    """("new", None) 호출자가 실행 | ("done", 결과) | ("inflight", Future) | ("conflict", None) 같은 키에 다른 요청"""
+    now = time.monotonic()
+    with _idem_lock:
+        entry = _idem_entries.get(key)
+        if entry is not None and entry["done_at"] is not None and now - entry["done_at"] > IDEMPOTENCY_TTL_SEC:
+            _idem_entries.pop(key, None)
+            entry = None
+        if entry is None:
+            _idem_entries[key] = {"fp": fp, "future": concurrent.futures.Future(), "done_at": None}
+            # 오래된 완료 항목부터 정리 (실행 중인 항목은 남김)
+            if len(_idem_entries) > IDEMPOTENCY_MAX_KEYS:
+                for old_key in [k for k, e in _idem_entries.items() if e["done_at"] is not None][:len(_idem_entries) - IDEMPOTENCY_MAX_KEYS]:
+                    _idem_entries.pop(old_key, None)
+            return "new", None
+        if entry["fp"] != fp:
+            return "conflict", None
+        _idem_entries.move_to_end(key)
+        if entry["done_at"] is not None:
+            return "done", entry["future"].result()[1]
+        return "inflight", entry["future"]
+
+def _idem_finish_local(key: str, result: Any = None, failed: bool = False) -> None:
+    # 실패(예외)는 저장하지 않음: 기다리던 요청은 다시 실행
+    with _idem_lock:
+        entry = _idem_entries.get(key)
+        if entry is None or entry["done_at"] is not None:
+            return
+        if failed:
+            _idem_entries.pop(key, None)
+        else:
+            entry["done_at"] = time.monotonic()
+    entry["future"].set_result(("gone", None) if failed else ("done", result))
+
+def _idem_wait_local(fut: concurrent.futures.Future, timeout: float) -> tuple[str, Any]:
+    try:
+        return fut.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        return "inflight", None
+
+def _cluster_op_idem_begin(msg: Dict[str, Any]) -> Dict[str, Any]:
+    state, data = _idem_begin_local(msg["key"], msg["fp"])
+    return {"state": state, "result": data if state == "done" else None}
+
+def _cluster_op_idem_wait(msg: Dict[str, Any]) -> Dict[str, Any]:
+    # 클러스터 요청 타임아웃(2초) 안에서 기다림. 팔로워가 반복 호출
+    with _idem_lock:
+        entry = _idem_entries.get(msg["key"])
+    if entry is None:
+        return {"state": "gone"}
+    state, result = _idem_wait_local(entry["future"], min(1.5, float(msg.get("timeout") or 1.5)))
+    return {"state": state, "result": result}
+
+def _cluster_op_idem_finish(msg: Dict[str, Any]) -> Dict[str, Any]:
+    _idem_finish_local(msg["key"], msg.get("result"), bool(msg.get("failed")))
+    return {"ok": True}
+
+def run_idempotent(key: str | None, op: str, payload: Any, fn, response: Response | None = None):
+    """Idempotency-Key가 있으면 같은 키의 중복 요청을 한 번만 실행. 없으면 fn() 그대로"""
+    if not key:
+        return fn()
+    if len(key) > IDEMPOTENCY_KEY_MAX_LEN:
+        raise HTTPException(status_code=400, detail="Idempotency-Key too long")
+    key = f"{op}:{key}"
+    fp = _idem_fingerprint(op, payload)
+    remote = cluster_state["role"] == "follower"
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SEC
+    while True:
+        if remote:
+            resp = cluster_call("idem_begin", key=key, fp=fp)
+            if resp is None or "state" not in resp:
+                # 리더에 닿지 않으면 중복 제거 없이 실행
+                return fn()
+            state, data = resp["state"], resp.get("result")
+        else:
+            state, data = _idem_begin_local(key, fp)
+        if state == "conflict":
+            idempotency_stats["conflicts"] += 1
+            raise HTTPException(status_code=422, detail="Idempotency-Key was used for a different request")
+        if state == "inflight":
+            idempotency_stats["attached"] += 1
+            while state == "inflight" and time.monotonic() < deadline:
+                if remote:
+                    resp = cluster_call("idem_wait", key=key, timeout=1.5) or {"state": "gone"}
+                    state, data = resp.get("state", "gone"), resp.get("result")
+                else:
+                    state, data = _idem_wait_local(data, max(0.0, deadline - time.monotonic()))
+            if state == "inflight":
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            if state == "gone":
+                # 먼저 온 요청이 실패함: 이 요청이 다시 실행
+                continue
+        if state == "done":
+            idempotency_stats["replayed"] += 1
+            if response is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+            return data
+        break
+    idempotency_stats["executed"] += 1
+    try:
+        result = fn()
+    except BaseException:
+        if remote:
+            cluster_call("idem_finish", key=key, failed=True)
+        else:
+            _idem_finish_local(key, failed=True)
+        raise
+    if remote:
+        cluster_call("idem_finish", key=key, result=result)
+    else:
+        _idem_finish_local(key, result)
+    return result
+
+# ========================
+# 제어 명령의 리더 전달 (멀티 프로세스 모드)
+# ========================
+# 팔로워가 받은 제어 명령은 리더에서 실행: lane별 동시 전송 한도/선점, UDP 그룹 명령(ack 수신)이 클러스터 전체에 하나
+_LEADER_COMMANDS = {
+    "set_ac": lambda a: set_ac(a["device_id"], AcCommand(**a["cmd"])),
+    "batch": lambda a: _handle_batch_request(BatchAcCommand(**a["payload"]), a["log_prefix"]),
+    "all_on": lambda a: all_on(AcCommand(**a["cmd"]) if a.get("cmd") is not None else None, a.get("group")),
+    "all_off": lambda a: all_off(a.get("group")),
+    "scene": lambda a: execute_scene(a["commands"], a.get("name"), a.get("log_event") or "user_scene"),
+}
+
+def leader_command(command: str, **args) -> Any:
+    """팔로워: 명령을 리더로 보내 실행하고 결과 반환 (리더의 HTTPException은 같은 상태 코드로)"""
+    resp = cluster_call("command", timeout=CLUSTER_COMMAND_TIMEOUT_SEC, command=command, args=args)
+    if resp is None:
+        raise HTTPException(status_code=503, detail="leader unavailable", headers={"Retry-After": "2"})
+    if "http_error" in resp:
+        raise HTTPException(status_code=resp["http_error"]["status"], detail=resp["http_error"]["detail"])
+    if "error" in resp:
+        raise HTTPException(status_code=500, detail=f"leader command failed: {resp['error']}")
+    return resp["result"]
+
+def _cluster_op_command(msg: Dict[str, Any]) -> Dict[str, Any]:
+    fn = _LEADER_COMMANDS.get(msg.get("command"))
+    if fn is None:
+        return {"error": f"unknown command: {msg.get('command')}"}
+    try:
+        return {"result": fn(msg.get("args") or {})}
+    except HTTPException as e:
+        return {"http_error": {"status": e.status_code, "detail": e.detail}}
+
+
 @app.post("/devices/{device_id}/ac/set")
+def set_ac_endpoint(device_id: str, cmd: AcCommand, response: Response,
+                    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    return run_idempotent(idempotency_key, "set_ac", [device_id, cmd.model_dump(exclude_unset=True)],
+                          lambda: set_ac(device_id, cmd), response)
+
 def set_ac(device_id: str, cmd: AcCommand):
+    require_accepting_commands()
+    if cluster_state["role"] == "follower":
+        return leader_command("set_ac", device_id=device_id, cmd=cmd.model_dump(exclude_unset=True))
     dev = get_device(device_id)
     params = {k: v for k, v in cmd.model_dump(exclude_unset=True).items() if v is not None}
     if not params:
         raise HTTPException(status_code=400, detail="No parameters given")
     write_action_log("user_set_ac", {"device_id": device_id, "params": params})
-    result = send_ac_command(dev, params)
+    result = dispatch_command(dev, params, lane="interactive").result()
     try:
         write_action_log("user_set_ac_result", {"device_id": device_id, "ok": result.get("ok", False), "status_code": result.get("status_code", 0)})
     except Exception:
@@ -1032,7 +3918,7 @@ def _extract_command_params(cmd: AcCommand | dict | None) -> dict:
 def _execute_batch_command(unique_ids: list[str], params: dict) -> dict:
     """여러 장치에 병렬로 명령을 전송하고 결과를 요약."""
     cleanup_devices()
-    with devices_lock:
+    with _traced_lock(devices_lock, "devices"):
         dev_map = dict(devices)
 
     target_devs: list[Dict[str, Any]] = []
@@ -1054,41 +3940,8 @@ def _execute_batch_command(unique_ids: list[str], params: dict) -> dict:
     }
 
     if target_devs:
-        max_workers = min(16, max(1, len(target_devs)))
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
-        try:
-            future_to_id: Dict[concurrent.futures.Future, str] = {}
-            for dev in target_devs:
-                fut = executor.submit(send_ac_command, dev, params)
-                future_to_id[fut] = dev["id"]
-
-            done, not_done = concurrent.futures.wait(
-                list(future_to_id.keys()),
-                timeout=ALL_CMD_PER_DEVICE_TIMEOUT_SEC,
-                return_when=concurrent.futures.ALL_COMPLETED,
-            )
-
-            for fut in list(done):
-                dev_id = future_to_id.get(fut)
-                if dev_id is None:
-                    continue
-                try:
-                    results[dev_id] = fut.result()
-                except Exception as e:
-                    results[dev_id] = {"ok": False, "error": str(e)}
-
-            for fut in list(not_done):
-                dev_id = future_to_id.get(fut)
-                if dev_id is None:
-                    continue
-                fut.cancel()
-                results[dev_id] = {
-                    "ok": False,
-                    "error": "timeout",
-                    "timeout_sec": ALL_CMD_PER_DEVICE_TIMEOUT_SEC,
-                }
-        finally:
-            executor.shutdown(wait=False, cancel_futures=True)
+        # 실행 중 설정이 바뀌어도 이번 전송은 시작 시점 값으로
+        results = run_fanout(target_devs, params, tuning.all_cmd_per_device_timeout_sec)
 
     ok_cnt = sum(1 for v in results.values() if v.get("ok"))
     summary["succeeded"] = ok_cnt
@@ -1105,6 +3958,9 @@ def _execute_batch_command(unique_ids: list[str], params: dict) -> dict:
 
 
 def _handle_batch_request(payload: BatchAcCommand, log_prefix: str) -> dict:
+    require_accepting_commands()
+    if cluster_state["role"] == "follower":
+        return leader_command("batch", payload=payload.model_dump(exclude_unset=True), log_prefix=log_prefix)
     unique_ids = _normalize_device_ids(payload.device_ids)
     params = _extract_command_params(payload.command)
     if not unique_ids:
@@ -1138,18 +3994,36 @@ def _handle_batch_request(payload: BatchAcCommand, log_prefix: str) -> dict:
 
 
 @app.post("/devices/batch/ac/set")
-def set_ac_batch(payload: BatchAcCommand):
-    return _handle_batch_request(payload, "user_set_ac_batch")
+def set_ac_batch(payload: BatchAcCommand, response: Response,
+                 idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    return run_idempotent(idempotency_key, "batch", payload.model_dump(exclude_unset=True),
+                          lambda: _handle_batch_request(payload, "user_set_ac_batch"), response)
 
 
 @app.post("/devices/control")
-def control_devices(payload: BatchAcCommand):
+def control_devices(payload: BatchAcCommand, response: Response,
+                    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
     """선택된 장치에 대해 병렬로 명령을 전송하는 통합 엔드포인트."""
-    return _handle_batch_request(payload, "user_control_devices")
+    return run_idempotent(idempotency_key, "batch", payload.model_dump(exclude_unset=True),
+                          lambda: _handle_batch_request(payload, "user_control_devices"), response)
+
+
+def _filter_group(devs: list[Dict[str, Any]], group: str | None) -> list[Dict[str, Any]]:
+    if not group:
+        return devs
+    return [d for d in devs if str(d.get("group") or "").lower() == group.lower()]
 
 
 @app.post("/all/on")
-def all_on(cmd: AcCommand | None = None):
+def all_on_endpoint(response: Response, cmd: AcCommand | None = None, group: str | None = None,
+                    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    return run_idempotent(idempotency_key, "all_on", [cmd.model_dump(exclude_unset=True) if cmd is not None else None, group],
+                          lambda: all_on(cmd, group), response)
+
+def all_on(cmd: AcCommand | None = None, group: str | None = None):
+    require_accepting_commands()
+    if cluster_state["role"] == "follower":
+        return leader_command("all_on", cmd=cmd.model_dump(exclude_unset=True) if cmd is not None else None, group=group)
     # 기본값: power=on. 추가로 전달된 필드(mode/temp/fan/swing)가 있으면 병합하여 전송
     base = {"power": "on"}
     try:
@@ -1160,52 +4034,20 @@ def all_on(cmd: AcCommand | None = None):
         params = {**base, **(extra or {})}
     except Exception:
         params = dict(base)
-    write_action_log("user_all_on", {"command": params})
+    write_action_log("user_all_on", {"command": params, "group": group})
     cleanup_devices()
-    with devices_lock:
-        devs = list(devices.values())
+    with _traced_lock(devices_lock, "devices"):
+        devs = _filter_group(list(devices.values()), group)
 
     # 장치별 명령을 병렬 전송 (쓰레드) + per-device 타임아웃
     results: Dict[str, Dict[str, Any]] = {}
     if not devs:
         return {"command": params, "results": results}
+    # UDP 지원 장치는 브로드캐스트 1패킷으로 먼저 처리하고, ack 없는 장치만 장치별 전송
+    results, devs = udp_group_command(devs, params, group)
 
-    max_workers = min(16, max(1, len(devs)))
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
-    try:
-        future_to_id: Dict[concurrent.futures.Future, str] = {}
-        for dev in devs:
-            fut = executor.submit(send_ac_command, dev, params)
-            future_to_id[fut] = dev["id"]
-
-        # 지정된 타임아웃 동안 완료된 작업만 수집
-        done, not_done = concurrent.futures.wait(
-            list(future_to_id.keys()),
-            timeout=ALL_CMD_PER_DEVICE_TIMEOUT_SEC,
-            return_when=concurrent.futures.ALL_COMPLETED
-        )
-
-        # 이미 끝난 작업은 결과 수집
-        for fut in list(done):
-            dev_id = future_to_id.get(fut)
-            if dev_id is None:
-                continue
-            try:
-                results[dev_id] = fut.result()
-            except Exception as e:
-                results[dev_id] = {"ok": False, "error": str(e)}
-
-        # 타임아웃된 작업은 timeout으로 표기
-        # 추가로 취소 시도 (이미 실행 중인 작업은 취소되지 않을 수 있음)
-        for fut in list(not_done):
-            dev_id = future_to_id.get(fut)
-            if dev_id is None:
-                continue
-            fut.cancel()
-            results[dev_id] = {"ok": False, "error": "timeout", "timeout_sec": ALL_CMD_PER_DEVICE_TIMEOUT_SEC}
-    finally:
-        # 대기하지 않고 종료, 실행 중인 작업은 가능한 한 취소 시도
-        executor.shutdown(wait=False, cancel_futures=True)
+    # 실행 중 설정이 바뀌어도 이번 전송은 시작 시점 값으로
+    results.update(run_fanout(devs, params, tuning.all_cmd_per_device_timeout_sec))
 
     try:
         ok_cnt = sum(1 for v in results.values() if v.get("ok"))
@@ -1217,49 +4059,28 @@ def all_on(cmd: AcCommand | None = None):
 
 
 @app.post("/all/off")
-def all_off():
+def all_off_endpoint(response: Response, group: str | None = None,
+                     idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    return run_idempotent(idempotency_key, "all_off", group, lambda: all_off(group), response)
+
+def all_off(group: str | None = None):
+    require_accepting_commands()
+    if cluster_state["role"] == "follower":
+        return leader_command("all_off", group=group)
     # power=off만 전송하여 각 모듈의 기존 모드/온도 값은 유지
     params = {"power": "off"}
-    write_action_log("user_all_off", {})
+    write_action_log("user_all_off", {"group": group} if group else {})
     cleanup_devices()
-    with devices_lock:
-        devs = list(devices.values())
+    with _traced_lock(devices_lock, "devices"):
+        devs = _filter_group(list(devices.values()), group)
 
     results: Dict[str, Dict[str, Any]] = {}
     if not devs:
         return {"command": params, "results": results}
+    results, devs = udp_group_command(devs, params, group)
 
-    max_workers = min(16, max(1, len(devs)))
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
-    try:
-        future_to_id: Dict[concurrent.futures.Future, str] = {}
-        for dev in devs:
-            fut = executor.submit(send_ac_command, dev, params)
-            future_to_id[fut] = dev["id"]
-
-        done, not_done = concurrent.futures.wait(
-            list(future_to_id.keys()),
-            timeout=ALL_CMD_PER_DEVICE_TIMEOUT_SEC,
-            return_when=concurrent.futures.ALL_COMPLETED
-        )
-
-        for fut in list(done):
-            dev_id = future_to_id.get(fut)
-            if dev_id is None:
-                continue
-            try:
-                results[dev_id] = fut.result()
-            except Exception as e:
-                results[dev_id] = {"ok": False, "error": str(e)}
-
-        for fut in list(not_done):
-            dev_id = future_to_id.get(fut)
-            if dev_id is None:
-                continue
-            fut.cancel()
-            results[dev_id] = {"ok": False, "error": "timeout", "timeout_sec": ALL_CMD_PER_DEVICE_TIMEOUT_SEC}
-    finally:
-        executor.shutdown(wait=False, cancel_futures=True)
+    # 실행 중 설정이 바뀌어도 이번 전송은 시작 시점 값으로
+    results.update(run_fanout(devs, params, tuning.all_cmd_per_device_timeout_sec))
 
     try:
         ok_cnt = sum(1 for v in results.values() if v.get("ok"))
@@ -1270,69 +4091,681 @@ def all_off():
     return {"command": params, "results": results}
 
 
+# ========================
+# 장면 (장치/그룹별로 다른 명령을 한 번에)
+# ========================
+# {"devices": {id: 명령}, "groups": {그룹: 명령}}. 그룹 "*"는 모든 장치, 장치 지정이 그룹 지정보다 우선
+# 저장된 장면은 SQLite(scenes)에 두고 메모리에 캐시. 다른 워커 프로세스의 변경은 SCENE_CACHE_TTL_SEC 안에 반영
+SCENE_CACHE_TTL_SEC = float(os.getenv("SCENE_CACHE_TTL_SEC", "5"))
+_SCENE_NAME_RE = re.compile(r"^[\w.-]{1,64}$")
+
+class SceneCommands(BaseModel):
+    devices: Dict[str, AcCommand] = {}
+    groups: Dict[str, AcCommand] = {}
+
+scene_lock = threading.Lock()
+_scene_cache: Dict[str, Dict[str, Any]] | None = None
+_scene_cache_at = 0.0
+
+def _scene_commands_dict(payload: SceneCommands) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """요청 모델 -> 저장/실행 형식. 빈 명령은 400"""
+    out: Dict[str, Dict[str, Dict[str, Any]]] = {"devices": {}, "groups": {}}
+    for kind in ("devices", "groups"):
+        for key, cmd in getattr(payload, kind).items():
+            params = _extract_command_params(cmd)
+            if not params:
+                raise HTTPException(status_code=400, detail=f"empty command for {kind[:-1]} '{key}'")
+            out[kind][str(key)] = params
+    if not out["devices"] and not out["groups"]:
+        raise HTTPException(status_code=400, detail="scene has no commands")
+    return out
+
+def load_scenes(force: bool = False) -> Dict[str, Dict[str, Any]]:
+    """저장된 장면 전체 (캐시). force=True면 DB에서 다시 읽음"""
+    global _scene_cache, _scene_cache_at
+    with scene_lock:
+        if not force and _scene_cache is not None and time.monotonic() - _scene_cache_at < SCENE_CACHE_TTL_SEC:
+            return _scene_cache
+    with _trace_span("db", op="load_scenes"):
+        conn = _db()
+        try:
+            rows = conn.execute("SELECT name, commands, updated_at FROM scenes ORDER BY name").fetchall()
+        finally:
+            conn.close()
+    scenes = {}
+    for row in rows:
+        try:
+            scenes[row["name"]] = {"name": row["name"], "commands": json.loads(row["commands"]), "updated_at": row["updated_at"]}
+        except ValueError as e:
+            print(f"[Scene] '{row['name']}' unreadable: {e}")
+    with scene_lock:
+        _scene_cache, _scene_cache_at = scenes, time.monotonic()
+    return scenes
+
+def get_scene(name: str) -> Dict[str, Any] | None:
+    return load_scenes().get(name)
+
+def resolve_scene(commands: Dict[str, Dict[str, Dict[str, Any]]]) -> tuple[list[Dict[str, Any]], Dict[str, Dict[str, Any]], list[str]]:
+    """(대상 장치, 장치별 명령, 없는 장치 id). 그룹 명령을 먼저 펼치고 장치 지정으로 덮어씀"""
+    cleanup_devices()
+    with _traced_lock(devices_lock, "devices"):
+        dev_map = dict(devices)
+    params_by_id: Dict[str, Dict[str, Any]] = {}
+    groups = commands.get("groups") or {}
+    if groups:
+        lowered = {str(g).lower(): params for g, params in groups.items()}
+        for dev in dev_map.values():
+            params = lowered.get(str(dev.get("group") or "").lower()) or lowered.get("*")
+            if params is not None:
+                params_by_id[dev["id"]] = params
+    missing = []
+    for dev_id, params in (commands.get("devices") or {}).items():
+        if dev_id in dev_map:
+            params_by_id[dev_id] = params
+        else:
+            missing.append(dev_id)
+    return [dev_map[k] for k in params_by_id], params_by_id, missing
+
+def execute_scene(commands: Dict[str, Dict[str, Dict[str, Any]]], name: str | None = None,
+                  log_event: str = "user_scene") -> Dict[str, Any]:
+    """장면 1회 실행: 모든 장치 명령을 한 번의 fan-out으로 동시에 보내고 결과를 한 건의 로그로 기록"""
+    if cluster_state["role"] == "follower":
+        return leader_command("scene", commands=commands, name=name, log_event=log_event)
+    devs, params_by_id, missing = resolve_scene(commands)
+    t0 = time.monotonic()
+    results = run_fanout(devs, None, tuning.all_cmd_per_device_timeout_sec, params_by_id=params_by_id) if devs else {}
+    ok_cnt = sum(1 for v in results.values() if v.get("ok"))
+    summary = {"targets": len(devs), "succeeded": ok_cnt, "failed": len(results) - ok_cnt, "missing": len(missing)}
+    try:
+        write_action_log(log_event, {
+            "scene": name, **summary,
+            "elapsed_ms": round((time.monotonic() - t0) * 1000.0, 1),
+            "failed_ids": sorted(k for k, v in results.items() if not v.get("ok")),
+            "missing_ids": missing,
+        })
+    except Exception:
+        pass
+    return {"scene": name, "commands": params_by_id, "results": results, "missing": missing, "summary": summary}
+
+def _check_scene_name(name: str) -> None:
+    if not _SCENE_NAME_RE.match(name):
+        raise HTTPException(status_code=400, detail="invalid scene name")
+
+@app.get("/scenes")
+def list_scenes():
+    return {"scenes": list(load_scenes().values())}
+
+@app.get("/scenes/{name}")
+def read_scene(name: str):
+    scene = get_scene(name)
+    if scene is None:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    return scene
+
+@app.put("/scenes/{name}")
+def save_scene(name: str, payload: SceneCommands):
+    _check_scene_name(name)
+    commands = _scene_commands_dict(payload)
+    now = time.time()
+    with _trace_span("db", op="save_scene"):
+        conn = _db()
+        try:
+            conn.execute(
+                "INSERT INTO scenes(name, commands, updated_at) VALUES (?,?,?) "
+                "ON CONFLICT(name) DO UPDATE SET commands=excluded.commands, updated_at=excluded.updated_at",
+                (name, json.dumps(commands, ensure_ascii=False), now),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    load_scenes(force=True)
+    write_action_log("scene_saved", {"scene": name, "devices": len(commands["devices"]), "groups": len(commands["groups"])})
+    return {"name": name, "commands": commands, "updated_at": now}
+
+@app.delete("/scenes/{name}")
+def delete_scene(name: str):
+    with _trace_span("db", op="delete_scene"):
+        conn = _db()
+        try:
+            deleted = conn.execute("DELETE FROM scenes WHERE name=?", (name,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+    load_scenes(force=True)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    write_action_log("scene_deleted", {"scene": name})
+    return {"ok": True, "name": name}
+
+@app.post("/scenes/run")
+def run_adhoc_scene(payload: SceneCommands, response: Response,
+                    idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    """저장하지 않고 바로 실행"""
+    def _run():
+        require_accepting_commands()
+        return execute_scene(_scene_commands_dict(payload))
+    return run_idempotent(idempotency_key, "scene", payload.model_dump(exclude_unset=True), _run, response)
+
+@app.post("/scenes/{name}/run")
+def run_scene(name: str, response: Response,
+              idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    def _run():
+        require_accepting_commands()
+        scene = get_scene(name)
+        if scene is None:
+            raise HTTPException(status_code=404, detail="Scene not found")
+        return execute_scene(scene["commands"], name)
+    return run_idempotent(idempotency_key, "scene_run", name, _run, response)
+
+
 # 정적 파일 서빙 (모든 API 엔드포인트 이후에 마운트)
 web_dir = os.path.join(os.path.dirname(__file__), "web")
 
 # 정적 파일 (CSS, JS 등) 서빙 - 특정 파일명만 허용 (API 경로보다 먼저 체크)
 static_files = ["style.css", "api.js", "app.js"]
+# 파일 변경 감시 주기(초). 변경 시 메모리 캐시/압축본/지문 URL을 다시 생성
+STATIC_WATCH_INTERVAL_SEC = float(os.getenv("STATIC_WATCH_INTERVAL_SEC", "2"))
+STATIC_WATCH_ENABLED = os.getenv("STATIC_WATCH_ENABLED", "1").lower() in ("1", "true", "yes")
+# 지문(해시) 포함 URL은 내용이 바뀌면 URL도 바뀌므로 1년 캐시
+STATIC_IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+STATIC_REVALIDATE_CACHE = "no-cache"
+_STATIC_MEDIA_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
+static_assets_lock = threading.Lock()
+static_assets: Dict[str, Dict[str, Any]] = {}
+_static_mtimes: Dict[str, tuple] = {}
+
+def _build_static_asset(name: str, raw: bytes, with_brotli: bool = True) -> Dict[str, Any]:
+    digest = hashlib.sha256(raw).hexdigest()[:12]
+    base, ext = os.path.splitext(name)
+    asset = {
+        "name": name,
+        "media_type": _STATIC_MEDIA_TYPES.get(ext, "application/octet-stream"),
+        "hash": digest,
+        "url": f"/static/{base}.{digest}{ext}",
+        "identity": raw,
+    }
+    # 압축본이 원본보다 작을 때만 보관
+    gz = gzip.compress(raw, compresslevel=9, mtime=0)
+    if len(gz) < len(raw):
+        asset["gzip"] = gz
+    if with_brotli:
+        _add_brotli(asset)
+    return asset
+
+def _add_brotli(asset: Dict[str, Any]):
+    # brotli quality=11은 느려서 시작 시에는 백그라운드에서 (그 전까지는 gzip으로 응답)
+    if BROTLI_AVAILABLE and "br" not in asset:
+        raw = asset["identity"]
+        br = brotli.compress(raw, quality=11)
+        if len(br) < len(raw):
+            asset["br"] = br
+
+def _static_file_mtimes() -> Dict[str, tuple]:
+    result = {}
+    for name in static_files + ["index.html"]:
+        try:
+            st = os.stat(os.path.join(web_dir, name))
+            result[name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+    return result
+
+def load_static_assets(with_brotli: bool = True) -> Dict[str, Dict[str, Any]]:
+    """web/ 파일을 메모리에 적재하고 압축본/지문 URL 생성 (index.html은 지문 URL로 치환)"""
+    global static_assets, _static_mtimes
+    mtimes = _static_file_mtimes()
+    assets: Dict[str, Dict[str, Any]] = {}
+    for name in static_files:
+        try:
+            with open(os.path.join(web_dir, name), "rb") as f:
+                assets[name] = _build_static_asset(name, f.read(), with_brotli)
+        except OSError:
+            continue
+    try:
+        with open(os.path.join(web_dir, "index.html"), "r", encoding="utf-8") as f:
+            html = f.read()
+        # href="/style.css", src="app.js" 등을 지문 URL로 치환
+        def _fingerprint(m: re.Match) -> str:
+            asset = assets.get(m.group(2))
+            return f'{m.group(1)}="{asset["url"]}"' if asset else m.group(0)
+        html = re.sub(r'(href|src)="/?(' + "|".join(re.escape(n) for n in static_files) + r')"', _fingerprint, html)
+        assets["index.html"] = _build_static_asset("index.html", html.encode("utf-8"), with_brotli)
+    except OSError:
+        pass
+    with static_assets_lock:
+        static_assets = assets
+        _static_mtimes = mtimes
+    return assets
+
+def compress_static_brotli():
+    for asset in list(static_assets.values()):
+        _add_brotli(asset)
+
+def _get_static_asset(name: str) -> Dict[str, Any] | None:
+    if not static_assets:
+        load_static_assets()
+    return static_assets.get(name)
+
+def _static_watch_loop():
+    """web/ 파일 변경(mtime/size) 감시 후 캐시 무효화"""
+    while not _shutdown_event.wait(max(0.5, STATIC_WATCH_INTERVAL_SEC)):
+        try:
+            if _static_file_mtimes() != _static_mtimes:
+                load_static_assets()
+                print("[Static] web/ changed -> cache reloaded")
+        except Exception as e:
+            print(f"[Static] reload failed: {e}")
+
+def _accepted_encodings(request: Request) -> set[str]:
+    accepted = set()
+    for token in request.headers.get("accept-encoding", "").split(","):
+        parts = [p.strip() for p in token.split(";")]
+        if not parts[0]:
+            continue
+        q = 1.0
+        for p in parts[1:]:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(parts[0].lower())
+    return accepted
+
+def _etag_matches(request: Request, digest: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    for tag in inm.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        # 인코딩별 ETag("hash-br", "hash-gzip")도 같은 내용으로 취급
+        if tag.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+def serve_static_asset(request: Request, name: str, cache_control: str = STATIC_REVALIDATE_CACHE) -> Response:
+    asset = _get_static_asset(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    accepted = _accepted_encodings(request)
+    encoding = None
+    if "br" in asset and "br" in accepted:
+        encoding = "br"
+    elif "gzip" in asset and "gzip" in accepted:
+        encoding = "gzip"
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": f'"{asset["hash"]}-{encoding}"' if encoding else f'"{asset["hash"]}"',
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request, asset["hash"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset[encoding or "identity"], media_type=asset["media_type"], headers=headers)
+
+@app.get("/static/{filename}")
+async def serve_fingerprinted(filename: str, request: Request):
+    """지문 URL(/static/app.<hash>.js) 서빙. 현재 해시와 같으면 장기 캐시"""
+    base, _, rest = filename.partition(".")
+    digest, _, ext = rest.rpartition(".")
+    name = f"{base}.{ext}"
+    if name not in static_files:
+        raise HTTPException(status_code=404, detail="File not found")
+    asset = _get_static_asset(name)
+    # 이전 버전 해시로 요청하면 최신 내용을 재검증 캐시로 응답
+    immutable = asset is not None and asset["hash"] == digest
+    return serve_static_asset(request, name, STATIC_IMMUTABLE_CACHE if immutable else STATIC_REVALIDATE_CACHE)
 
 @app.get("/style.css")
-async def serve_css():
+async def serve_css(request: Request):
     """CSS 파일 서빙"""
-    if os.path.exists(web_dir):
-        file_path = os.path.join(web_dir, "style.css")
-        if os.path.exists(file_path):
-            return FileResponse(
-                file_path,
-                media_type="text/css",
-                headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"},
-            )
-    raise HTTPException(status_code=404, detail="File not found")
+    return serve_static_asset(request, "style.css")
 
 @app.get("/api.js")
-async def serve_api_js():
+async def serve_api_js(request: Request):
     """api.js 파일 서빙"""
-    if os.path.exists(web_dir):
-        file_path = os.path.join(web_dir, "api.js")
-        if os.path.exists(file_path):
-            return FileResponse(
-                file_path,
-                media_type="application/javascript",
-                headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"},
-            )
-    raise HTTPException(status_code=404, detail="File not found")
+    return serve_static_asset(request, "api.js")
 
 @app.get("/app.js")
-async def serve_app_js():
+async def serve_app_js(request: Request):
     """app.js 파일 서빙"""
-    if os.path.exists(web_dir):
-        file_path = os.path.join(web_dir, "app.js")
-        if os.path.exists(file_path):
-            return FileResponse(
-                file_path,
-                media_type="application/javascript",
-                headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"},
-            )
-    raise HTTPException(status_code=404, detail="File not found")
+    return serve_static_asset(request, "app.js")
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
-    """루트 경로에서 index.html 서빙"""
-    if os.path.exists(web_dir):
-        index_path = os.path.join(web_dir, "index.html")
-        if os.path.exists(index_path):
-            with open(index_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                return HTMLResponse(
-                    content=content,
-                    headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"},
-                )
+async def read_root(request: Request):
+    """루트 경로에서 index.html 서빙 (지문 URL로 치환된 메모리 캐시본)"""
+    if _get_static_asset("index.html") is not None:
+        return serve_static_asset(request, "index.html")
     return HTMLResponse(
         content="<html><body><h1>Web interface not found</h1></body></html>",
         headers={"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"},
     )
 
 
+# ========================
+# 멀티 프로세스 모드 (SERVER_WORKERS >= 2)
+# ========================
+# 모든 워커가 같은 HTTP 소켓을 공유하고, lock 파일(flock)을 잡은 워커 하나가 리더가 되어
+# UDP 수신/스케줄러/스냅샷/시계 동기화를 전담. 나머지(팔로워)는 유닉스 소켓으로 리더의 장치 목록을 받아 HTTP만 처리.
+# 리더가 죽으면 커널이 lock을 풀고 다른 워커가 CLUSTER_ELECTION_INTERVAL_SEC 이내에 승계.
+cluster_state: Dict[str, Any] = {
+    "role": "standalone",   # standalone | leader | follower
+    "worker": None,
+    "pid": os.getpid(),
+    "leader_since": None,
+    "synced_version": -1,
+    "last_sync": None,
+    "sync_errors": 0,
+}
+_cluster_lock_fd: int | None = None
+_cluster_server: socketserver.ThreadingUnixStreamServer | None = None
+_cluster_procs: Dict[int, Any] = {}
+_cluster_http_sock: socket.socket | None = None
+
+def start_owner_services():
+    """프로세스 전체에서 하나만 돌아야 하는 백그라운드 작업 시작 (단일 프로세스 또는 리더)"""
+    if REGISTRY_SHM_ENABLED:
+        try:
+            open_registry_table()
+        except OSError as e:
+            print(f"[Registry] shared table disabled: {e}")
+    if UDP_LISTENER_AUTOSTART and listener_thread.ident is None:
+        listener_thread.start()
+    # 시계 동기화 루프
+    threading.Thread(target=_time_sync_loop, daemon=True).start()
+    # 예약 스케줄 루프
+    if SCHEDULER_ENABLED:
+        threading.Thread(target=_schedule_loop, daemon=True).start()
+    # 장치 목록 스냅샷 주기 저장
+    if REGISTRY_SNAPSHOT_ENABLED:
+        threading.Thread(target=_registry_snapshot_loop, daemon=True).start()
+    # 능동 health 점검
+    if HEALTH_PROBE_ENABLED:
+        threading.Thread(target=_health_probe_loop, daemon=True).start()
+    # 지난 종료 때 끝내지 못한 명령 재전송
+    replay_pending_commands()
+
+def cluster_call(op: str, timeout: float = 2.0, **args) -> Dict[str, Any] | None:
+    """리더에 요청 1건 전송 (줄 단위 JSON). 실패 시 None"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect(CLUSTER_SOCKET_PATH)
+            s.sendall(_json_bytes({"op": op, **args}) + b"\n")
+            with s.makefile("rb") as f:
+                line = f.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError) as e:
+        cluster_state["sync_errors"] += 1
+        if op != "sync":
+            print(f"[Cluster] {op} -> leader failed: {e}")
+        return None
+
+def leader_view(name: str) -> Dict[str, Any]:
+    """리더 프로세스에만 있는 상태(스케줄러/discover)를 조회"""
+    resp = cluster_call("view", name=name)
+    if resp is None or "error" in resp:
+        raise HTTPException(status_code=503, detail="leader unavailable")
+    return resp
+
+def _cluster_op_sync(msg: Dict[str, Any]) -> Dict[str, Any]:
+    # 버전이 같으면 last_seen만, 다르면 전체 장치 목록
+    with devices_lock:
+        if msg.get("since") != registry_version:
+            resp = {"version": registry_version, "devices": list(devices.values())}
+        else:
+            resp = {"version": registry_version, "seen": {k: v.get("last_seen") for k, v in devices.items()}}
+    # health 점수는 바뀌었을 때만
+    if msg.get("health_since") != health_version:
+        resp["health_version"] = health_version
+        resp["health"] = export_health_scores()
+    return resp
+
+def _cluster_op_ingest(msg: Dict[str, Any]) -> Dict[str, Any]:
+    apply_status_report(msg["id"], msg["state"], msg.get("ip"), int(msg.get("port") or 80), msg.get("udp_port"), msg.get("group"), msg.get("seq"))
+    return {"ok": True}
+
+def _cluster_op_ingest_batch(msg: Dict[str, Any]) -> Dict[str, Any]:
+    items = [tuple(item) for item in msg.get("items") or []]
+    return {"ok": True, "applied": apply_status_batch(items)}
+
+def _cluster_op_schedule_wake(msg: Dict[str, Any]) -> Dict[str, Any]:
+    schedule_wake.set()
+    return {"ok": True}
+
+_CLUSTER_VIEWS = {
+    "schedule_runtime": lambda: schedule_runtime_status(),
+    "discovery": lambda: get_discovery(),
+    "dispatch": lambda: dispatch_status(),
+}
+
+def _cluster_op_view(msg: Dict[str, Any]) -> Dict[str, Any]:
+    fn = _CLUSTER_VIEWS.get(msg.get("name"))
+    return fn() if fn else {"error": f"unknown view: {msg.get('name')}"}
+
+_CLUSTER_OPS = {
+    "sync": _cluster_op_sync,
+    "ingest": _cluster_op_ingest,
+    "ingest_batch": _cluster_op_ingest_batch,
+    "schedule_wake": _cluster_op_schedule_wake,
+    "view": _cluster_op_view,
+    "idem_begin": _cluster_op_idem_begin,
+    "idem_wait": _cluster_op_idem_wait,
+    "idem_finish": _cluster_op_idem_finish,
+    "command": _cluster_op_command,
+}
+
+class _ClusterRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                msg = json.loads(line)
+                fn = _CLUSTER_OPS.get(msg.get("op"))
+                resp = fn(msg) if fn else {"error": f"unknown op: {msg.get('op')}"}
+            except Exception as e:
+                resp = {"error": str(e)}
+            self.wfile.write(_json_bytes(resp) + b"\n")
+
+def _start_cluster_server():
+    # lock을 쥔 리더만 여기 도달하므로 남아 있는 소켓 파일은 이전 리더의 것
+    try:
+        os.unlink(CLUSTER_SOCKET_PATH)
+    except FileNotFoundError:
+        pass
+    global _cluster_server
+    server = socketserver.ThreadingUnixStreamServer(CLUSTER_SOCKET_PATH, _ClusterRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _cluster_server = server
+
+def _cluster_sync_once():
+    """팔로워: 리더의 장치 목록을 가져와 로컬 사본 갱신"""
+    global registry_version
+    resp = cluster_call("sync", since=cluster_state["synced_version"], health_since=cluster_state.get("health_version"))
+    if not resp or "version" not in resp:
+        return
+    complete = True
+    with devices_lock:
+        if "devices" in resp:
+            devices.clear()
+            devices.update({d["id"]: d for d in resp["devices"]})
+        else:
+            seen = resp.get("seen") or {}
+            for dev_id in [k for k in devices if k not in seen]:
+                devices.pop(dev_id, None)
+            for dev_id, ts in seen.items():
+                dev = devices.get(dev_id)
+                if dev is None:
+                    complete = False
+                elif dev.get("last_seen") != ts:
+                    devices[dev_id] = {**dev, "last_seen": ts}
+        registry_version = resp["version"]
+    if "health" in resp:
+        import_health_scores(resp["health"])
+        cluster_state["health_version"] = resp.get("health_version")
+    # 사본에 없는 장치가 있으면 다음 주기에 전체 목록 요청
+    cluster_state["synced_version"] = resp["version"] if complete else -1
+    cluster_state["last_sync"] = time.time()
+
+def _become_leader():
+    cluster_state["role"] = "leader"
+    cluster_state["leader_since"] = time.time()
+    os.ftruncate(_cluster_lock_fd, 0)
+    os.write(_cluster_lock_fd, f"{os.getpid()}\n".encode("ascii"))
+    print(f"[Cluster] worker {cluster_state['worker']} (pid {os.getpid()}) elected leader")
+    write_action_log("cluster_leader", {"worker": cluster_state["worker"], "pid": os.getpid()})
+    _start_cluster_server()
+    start_owner_services()
+
+def _cluster_election_loop():
+    global _cluster_lock_fd
+    _cluster_lock_fd = os.open(CLUSTER_LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+    next_try = 0.0
+    while True:
+        now = time.monotonic()
+        if now >= next_try:
+            next_try = now + CLUSTER_ELECTION_INTERVAL_SEC
+            try:
+                fcntl.flock(_cluster_lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                pass
+            else:
+                # lock은 프로세스가 끝날 때까지 유지 (fd를 닫지 않음)
+                _become_leader()
+                return
+        _cluster_sync_once()
+        time.sleep(CLUSTER_SYNC_INTERVAL_SEC)
+
+def _read_leader_pid() -> int | None:
+    try:
+        with open(CLUSTER_LOCK_PATH, "r", encoding="ascii") as f:
+            return int(f.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+@app.get("/cluster")
+def cluster_status():
+    """멀티 프로세스 모드 상태 (이 요청을 처리한 워커 기준)"""
+    last_sync = cluster_state["last_sync"]
+    return {
+        **cluster_state,
+        "enabled": CLUSTER_ENABLED,
+        "workers": SERVER_WORKERS if CLUSTER_ENABLED else 1,
+        "leader_pid": _read_leader_pid() if CLUSTER_ENABLED else os.getpid(),
+        "sync_age_sec": round(time.time() - last_sync, 3) if last_sync else None,
+    }
+
+def _cluster_worker_main(index: int):
+    cluster_state.update(role="follower", worker=index, pid=os.getpid())
+    signal.signal(signal.SIGTERM, _sigterm_to_interrupt)
+    install_sighup_reload()
+    # 선출/정적 파일 감시 스레드는 lifespan 시작 시 (start_background_services)
+    server = uvicorn.Server(uvicorn.Config(app, host=SERVER_HOST, port=SERVER_PORT, log_level="info"))
+    try:
+        server.run(sockets=[_cluster_http_sock])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        run_shutdown(f"worker {index} exit")
+
+def _spawn_cluster_worker(index: int):
+    # fork: 부모가 적재한 DB/정적 파일 캐시와 HTTP 소켓을 그대로 물려받음
+    proc = multiprocessing.get_context("fork").Process(target=_cluster_worker_main, args=(index,), name=f"worker-{index}")
+    proc.start()
+    _cluster_procs[index] = proc
+
+def start_cluster_workers():
+    """HTTP 소켓을 한 번 바인딩하고 워커 프로세스 SERVER_WORKERS개 생성 (다른 스레드 시작 전에 호출)"""
+    global _cluster_http_sock
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((SERVER_HOST, SERVER_PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    _cluster_http_sock = sock
+    for i in range(SERVER_WORKERS):
+        _spawn_cluster_worker(i)
+    print(f"[Cluster] {SERVER_WORKERS} workers started (lock={CLUSTER_LOCK_PATH})")
+
+def supervise_cluster_workers():
+    """종료 신호까지 워커를 감시하고, 죽은 워커는 다시 띄움"""
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _forward_sighup)
+    while not stopping.is_set():
+        for i, proc in list(_cluster_procs.items()):
+            if not proc.is_alive():
+                print(f"[Cluster] worker {i} (pid {proc.pid}) exited with {proc.exitcode} -> respawn")
+                _spawn_cluster_worker(i)
+        stopping.wait(1.0)
+
+def _forward_sighup(signum, frame):
+    # 부모도 다시 읽어야 이후 재시작되는 워커가 새 설정을 물려받음
+    _sighup_reload(signum, frame)
+    for proc in list(_cluster_procs.values()):
+        if proc.is_alive():
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(proc.pid, signal.SIGHUP)
+
+def stop_cluster_workers(timeout_sec: float = SHUTDOWN_DRAIN_SEC + 10.0):
+    for proc in _cluster_procs.values():
+        if proc.is_alive():
+            proc.terminate()
+    deadline = time.time() + timeout_sec
+    for proc in _cluster_procs.values():
+        proc.join(timeout=max(0.1, deadline - time.time()))
+    if _cluster_http_sock is not None:
+        _cluster_http_sock.close()
+
+# ------------------------
+# 종료 훅 (run_shutdown에서 drain 이후 순서대로 실행)
+# ------------------------
+def _shutdown_udp_listener():
+    # 수신 루프는 _shutdown_event를 보고 0.5초 안에 소켓을 닫고 끝남
+    if listener_thread.ident is not None:
+        listener_thread.join(timeout=2.0)
+
+def _shutdown_registry_snapshot():
+    if REGISTRY_SNAPSHOT_ENABLED and cluster_state["role"] != "follower":
+        saved = save_registry_snapshot()
+        print(f"[Registry] snapshot saved ({saved} devices)")
+
+def _shutdown_cluster_server():
+    if _cluster_server is not None:
+        _cluster_server.shutdown()
+        _cluster_server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(CLUSTER_SOCKET_PATH)
+
+def _shutdown_action_log():
+    if action_logger is None:
+        return
+    for handler in action_logger.handlers:
+        handler.flush()
+        handler.close()
+
+add_shutdown_hook("udp_listener", _shutdown_udp_listener)
+add_shutdown_hook("udp_commands", _shutdown_udp_commands)
+add_shutdown_hook("ingest_queue", _shutdown_ingest_queue)
+add_shutdown_hook("state_reads", _shutdown_state_reads)
+add_shutdown_hook("dispatcher", _shutdown_dispatcher)
+add_shutdown_hook("registry_snapshot", _shutdown_registry_snapshot)
+add_shutdown_hook("cluster_server", _shutdown_cluster_server)
+add_shutdown_hook("action_log", _shutdown_action_log)
+
+
 # mDNS 서비스 등록
 zeroconf = None
 service_info = None
@@ -1340,8 +4773,18 @@ service_info = None
 def get_local_ips():
     """로컬 네트워크 IP 주소 목록 가져오기"""
     ips = []
-    
-    # 방법 1: 외부 연결을 통한 IP 감지 (가장 정확)
+
+    # 방법 0: 인터페이스 열거 (다중 NIC/VLAN 모두 포함, 외부 연결 불필요)
+    try:
+        for iface in list_ipv4_interfaces():
+            if iface["ip"] not in ips:
+                ips.append(iface["ip"])
+    except Exception:
+        pass
+    if ips:
+        return ips
+
+    # 방법 1: 외부 연결을 통한 IP 감지
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(("8.8.8.8", 80))
@@ -1388,7 +4831,10 @@ def register_mdns():
         print("[mDNS]    또는: install-dependencies.bat 실행")
         return False
     
+    local_ips: list[str] = []
     try:
+        from zeroconf import ServiceInfo, Zeroconf
+        from zeroconf._exceptions import NonUniqueNameException
         # 모든 로컬 IP 주소 가져오기
         local_ips = get_local_ips()
         primary_ip = local_ips[0] if local_ips else "127.0.0.1"
@@ -1458,11 +4904,38 @@ def register_mdns():
     except Exception as e:
         print(f"[mDNS] ✗ Failed to register service: {e}")
         # traceback은 너무 길어서 간단한 메시지만 출력
-        primary_ip = get_local_ips()[0] if get_local_ips() else "localhost"
+        primary_ip = local_ips[0] if local_ips else "localhost"
         print(f"[mDNS]   서버는 정상 작동하지만 mDNS를 통한 자동 발견이 안 될 수 있습니다.")
         print(f"[mDNS]   IP 주소로 직접 접속하세요: http://{primary_ip}:{SERVER_PORT}/")
         return False
 
+def _print_access_urls():
+    # 추가 접근 안내: 로컬 IP 및 mDNS 주소 출력
+    local_ips = get_local_ips()
+    primary_ip = local_ips[0] if local_ips else "127.0.0.1"
+    print("[Access] 다음 주소로 접속 가능합니다:")
+    print(f"[Access]   http://{primary_ip}:{SERVER_PORT}/")
+    print(f"[Access]   http://{MDNS_HOSTNAME}.local:{SERVER_PORT}/ (mDNS)")
+
+def deferred_startup():
+    """HTTP 응답을 막지 않도록 서버 시작 후 백그라운드에서 실행하는 초기화"""
+    with startup_task("static_brotli"):
+        compress_static_brotli()
+    with startup_task("mdns") as task:
+        if not MDNS_ENABLED:
+            task["state"] = "disabled"
+        elif not ZEROCONF_AVAILABLE:
+            task["state"] = "unavailable"
+        elif not register_mdns():
+            task["state"] = "failed"
+            print("[mDNS] mDNS 등록에 실패했지만 서버는 계속 실행됩니다.")
+    with startup_task("access_info"):
+        _print_access_urls()
+    # 전체 무결성 검사는 DB 크기에 비례하므로 마지막에
+    with startup_task("db_integrity") as task:
+        if not check_db_integrity():
+            task["state"] = "recreated"
+
 def unregister_mdns():
     """mDNS 서비스 해제"""
     global zeroconf, service_info
@@ -1475,40 +4948,127 @@ def unregister_mdns():
         except Exception as e:
             print(f"[mDNS] Failed to unregister service: {e}")
 
+# ========================
+# 앱 팩토리 (테스트/벤치마크/여러 인스턴스용)
+# ========================
+# create_app이 적용한 설정 (None 항목을 모듈 설정으로 채운 사본). ServerConfig는 aircon_server/config.py
+server_config: ServerConfig | None = None
+
+def create_app(config: ServerConfig | None = None) -> FastAPI:
+    """설정/의존성을 모듈 전역에 적용하고 app 반환. 스레드와 소켓은 lifespan 시작 시에만 생성.
+    모듈 하나에 한 번만 호출 가능: 한 프로세스에 여러 인스턴스가 필요하면 aircon_server.create_app 사용
+    (인스턴스마다 모듈을 따로 로드하므로 장치 목록, 락, 큐 등 전역 상태가 섞이지 않음)"""
+    global server_config, SERVER_HOST, SERVER_PORT, UDP_LISTEN_PORT, UDP_LISTENER_AUTOSTART, SCHEDULER_ENABLED
+    global TIME_SYNC_ENABLED, MDNS_ENABLED, REGISTRY_SNAPSHOT_ENABLED, STATIC_WATCH_ENABLED, HEALTH_PROBE_ENABLED, DB_PATH
+    global REGISTRY_SNAPSHOT_PATH, PENDING_COMMANDS_PATH, REGISTRY_SHM_PATH, CLUSTER_SOCKET_PATH, http_transport, clock
+    global devices, db_connect, CONFIG_PATH, tuning, tuning_sources, LOG_DIR, ACTION_LOG_PATH
+    if lifecycle["state"] != "starting":
+        raise RuntimeError("create_app() must be called before the server starts")
+    if server_config is not None:
+        raise RuntimeError("create_app() already applied a config to this module; use aircon_server.create_app")
+    cfg = config or ServerConfig()
+    defaults = {
+        "host": SERVER_HOST, "port": SERVER_PORT, "udp_port": UDP_LISTEN_PORT, "udp_listener": UDP_LISTENER_AUTOSTART,
+        "scheduler": SCHEDULER_ENABLED, "time_sync": TIME_SYNC_ENABLED, "mdns": MDNS_ENABLED,
+        "registry_snapshot": REGISTRY_SNAPSHOT_ENABLED, "static_watch": STATIC_WATCH_ENABLED,
+        "health_probe": HEALTH_PROBE_ENABLED, "db_path": DB_PATH, "snapshot_path": REGISTRY_SNAPSHOT_PATH,
+        "pending_commands_path": PENDING_COMMANDS_PATH, "action_log_path": ACTION_LOG_PATH, "config_path": CONFIG_PATH,
+    }
+    cfg = dataclasses.replace(cfg, **{k: v for k, v in defaults.items() if getattr(cfg, k) is None})
+    SERVER_HOST, SERVER_PORT = cfg.host, int(cfg.port)
+    UDP_LISTEN_PORT = int(cfg.udp_port)
+    UDP_LISTENER_AUTOSTART = cfg.udp_listener
+    SCHEDULER_ENABLED = cfg.scheduler
+    TIME_SYNC_ENABLED = cfg.time_sync
+    MDNS_ENABLED = cfg.mdns
+    REGISTRY_SNAPSHOT_ENABLED = cfg.registry_snapshot
+    STATIC_WATCH_ENABLED = cfg.static_watch
+    HEALTH_PROBE_ENABLED = cfg.health_probe
+    DB_PATH = cfg.db_path
+    REGISTRY_SNAPSHOT_PATH = cfg.snapshot_path
+    PENDING_COMMANDS_PATH = cfg.pending_commands_path
+    ACTION_LOG_PATH = cfg.action_log_path
+    LOG_DIR = os.path.dirname(ACTION_LOG_PATH)
+    if cfg.config_path != CONFIG_PATH:
+        CONFIG_PATH = cfg.config_path
+        tuning, tuning_sources = load_tuning()
+    # 포트별 기본 경로는 바뀐 포트 기준으로 (환경 변수로 지정한 경로는 유지)
+    if "REGISTRY_SHM_PATH" not in os.environ:
+        REGISTRY_SHM_PATH = os.path.join(os.path.dirname(REGISTRY_SHM_PATH), f"aircon-registry-{SERVER_PORT}")
+    if "CLUSTER_SOCKET_PATH" not in os.environ:
+        CLUSTER_SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"aircon-controller-{SERVER_PORT}.sock")
+    http_transport = cfg.transport if cfg.transport is not None else requests
+    clock = cfg.clock if cfg.clock is not None else time
+    if cfg.registry is not None:
+        with devices_lock:
+            devices = cfg.registry
+    db_connect = cfg.store
+    server_config = cfg
+    return app
+
+def start_background_services():
+    """lifespan 시작 시 호출: 역할(단일 프로세스/클러스터 워커)에 맞는 백그라운드 작업 시작"""
+    if cluster_state["role"] == "standalone":
+        # 스케줄 DB 스키마 보장 (전체 무결성 검사는 deferred_startup에서)
+        init_db(check_integrity=False)
+        startup_mark("init_db")
+        # 정적 파일 적재 (brotli 압축은 deferred_startup에서)
+        if not static_assets:
+            load_static_assets(with_brotli=False)
+        startup_mark("static_assets")
+        # UDP 수신 / 시계 동기화 / 예약 스케줄 / 스냅샷 루프 시작
+        start_owner_services()
+        if STATIC_WATCH_ENABLED:
+            threading.Thread(target=_static_watch_loop, daemon=True).start()
+        startup_mark("owner_services")
+        # mDNS 등록, 접속 안내, DB 무결성 검사는 백그라운드에서
+        threading.Thread(target=deferred_startup, daemon=True).start()
+    else:
+        # 클러스터 워커: DB/정적 파일은 fork 전에 부모가 적재. 리더가 되면 start_owner_services
+        threading.Thread(target=_cluster_election_loop, daemon=True).start()
+        if STATIC_WATCH_ENABLED:
+            threading.Thread(target=_static_watch_loop, daemon=True).start()
+        threading.Thread(target=compress_static_brotli, daemon=True).start()
+
+startup_mark("module")
+
 if __name__ == "__main__":
+    if SERVER_WORKERS > 1 and not CLUSTER_ENABLED:
+        print("[Cluster] fcntl을 사용할 수 없는 환경이라 단일 프로세스로 실행합니다.")
     try:
         print(f"[HTTP] Server starting on {SERVER_HOST}:{SERVER_PORT}")
         print(f"[HTTP] Web interface: http://localhost:{SERVER_PORT}/")
         print(f"[UDP] Listening on port {UDP_LISTEN_PORT}")
-        # 스케줄 DB 초기화
-        init_db()
-        # 시계 동기화 루프 시작
-        threading.Thread(target=_time_sync_loop, daemon=True).start()
-        # 예약 스케줄 루프 시작
-        threading.Thread(target=_schedule_loop, daemon=True).start()
-        
-        # mDNS 서비스 등록
-        mdns_success = register_mdns()
-        if not mdns_success:
-            print("[mDNS] mDNS 등록에 실패했지만 서버는 계속 실행됩니다.")
-        
-        # 추가 접근 안내: 로컬 IP 및 mDNS 주소 출력
-        try:
-            local_ips = get_local_ips()
-            primary_ip = local_ips[0] if local_ips else "127.0.0.1"
-            print("[Access] 다음 주소로 접속 가능합니다:")
-            print(f"[Access]   http://{primary_ip}:{SERVER_PORT}/")
-            print(f"[Access]   http://{MDNS_HOSTNAME}.local:{SERVER_PORT}/ (mDNS)")
-        except Exception as _:
-            pass
+        if CLUSTER_ENABLED:
+            # 워커가 물려받도록 fork 전에 DB 스키마 보장 + 정적 파일 적재
+            init_db(check_integrity=False)
+            startup_mark("init_db")
+            load_static_assets(with_brotli=False)
+            startup_mark("static_assets")
+            # 워커 fork는 다른 스레드(mDNS 등)를 시작하기 전에
+            start_cluster_workers()
+            startup_mark("workers_forked")
+            # mDNS 등록, 접속 안내, DB 무결성 검사는 백그라운드에서
+            threading.Thread(target=deferred_startup, daemon=True).start()
         
         print("Press Ctrl+C to stop the server")
         
         try:
-            uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT, log_level="info")
+            if CLUSTER_ENABLED:
+                supervise_cluster_workers()
+            else:
+                # 단일 프로세스: 백그라운드 작업은 lifespan 시작 시 (start_background_services)
+                signal.signal(signal.SIGTERM, _sigterm_to_interrupt)
+                install_sighup_reload()
+                uvicorn.run(create_app(), host=SERVER_HOST, port=SERVER_PORT, log_level="info")
         except KeyboardInterrupt:
             print("\n[HTTP] Server stopping...")
         finally:
+            if CLUSTER_ENABLED:
+                # 각 워커가 자체적으로 drain 후 종료 (리더는 스냅샷 저장)
+                stop_cluster_workers()
+            else:
+                run_shutdown()
             unregister_mdns()
             
     except Exception as e:
@@ -47,7 +47,11 @@ fi
 # 폴백: 기존 프로세스 종료 후 스크립트로 백그라운드 실행
 echo "[배포] 기존 서버 프로세스 종료 시도..."
 pkill -f "control-server.py" >/dev/null 2>&1 || true
-sleep 1
+# 서버는 전송 중 명령을 정리(SHUTDOWN_DRAIN_SEC, 기본 15초)한 뒤 종료하므로 완전히 끝날 때까지 대기
+for _ in $(seq 1 30); do
+  pgrep -f "control-server.py" >/dev/null 2>&1 || break
+  sleep 1
+done
 
 echo "[배포] 서버 재시작 (nohup)..."
 nohup ./start-server.sh >/tmp/wifi-remocon.log 2>&1 &
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""장치 목록 공유 메모리 테이블 리더
+
+control-server.py가 REGISTRY_SHM_ENABLED=1 일 때 장치 목록을 고정 크기 레코드로 mmap 파일에 기록한다.
+같은 호스트의 다른 프로세스(대시보드, 스크립트 등)는 HTTP 호출 없이 이 모듈로 바로 읽을 수 있다.
+
+레이아웃 (little-endian, 아래 SHM_* 정의가 유일한 기준이며 control-server.py도 이 모듈에서 import)
+- 헤더 64바이트: magic "ACRG", 레이아웃 버전, 레코드 크기, 용량, 사용 슬롯 수, registry 버전, 갱신 시각
+- 레코드 96바이트: seq(u32) + 본문. seq가 홀수면 쓰는 중(seqlock), 읽기 전후 seq가 같아야 유효
+
+사용:
+  python3 registry_shm.py                 # 표 형태로 출력
+  python3 registry_shm.py --json          # JSON 배열로 출력
+  python3 registry_shm.py --path /dev/shm/aircon-registry-8000
+
+  from registry_shm import RegistryTable
+  with RegistryTable() as table:
+      for dev in table.read_all():
+          print(dev["id"], dev["state"])
+"""
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+SHM_MAGIC = b"ACRG"
+SHM_LAYOUT_VERSION = 1
+SHM_HEADER = struct.Struct("<4sHHIIQd")          # magic, version, record_size, capacity, count, registry_version, updated_at
+SHM_HEADER_SIZE = 64
+SHM_COUNT = struct.Struct("<I")                  # 헤더 offset SHM_COUNT_OFFSET: 사용한 슬롯 수
+SHM_COUNT_OFFSET = 12
+SHM_VERSION = struct.Struct("<Qd")               # 헤더 offset SHM_VERSION_OFFSET: registry_version, updated_at
+SHM_VERSION_OFFSET = 16
+SHM_SEQ = struct.Struct("<I")
+# flags, power, port, ip, temp, room_temp_x10, rev, last_seen, state_last_seen, id, mode, fan
+SHM_BODY = struct.Struct("<BbH4shhIdd32s8s8s")
+SHM_ID_OFFSET = SHM_SEQ.size + struct.calcsize("<BbH4shhIdd")   # 레코드 내 id 필드 위치
+SHM_RECORD_SIZE = 96
+SHM_FLAG_USED = 0x01
+SHM_FLAG_STATE = 0x02
+SHM_FLAG_UNVERIFIED = 0x04
+SHM_FLAG_SWING = 0x08
+SHM_NO_TEMP = -32768
+
+
+def default_path(port: int = 8000) -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, f"aircon-registry-{port}")
+
+
+def _text(raw: bytes) -> str:
+    return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+def decode_record(body: tuple) -> dict | None:
+    flags, power, port, ip, temp, room_x10, rev, last_seen, state_last_seen, dev_id, mode, fan = body
+    if not flags & SHM_FLAG_USED:
+        return None
+    state = None
+    if flags & SHM_FLAG_STATE:
+        state = {
+            "power": None if power < 0 else bool(power),
+            "mode": _text(mode) or None,
+            "temp": None if temp == SHM_NO_TEMP else temp,
+            "fan": _text(fan) or None,
+            "swing": bool(flags & SHM_FLAG_SWING),
+            "room_temp": None if room_x10 == SHM_NO_TEMP else room_x10 / 10.0,
+        }
+    return {
+        "id": _text(dev_id),
+        "ip": socket.inet_ntoa(ip),
+        "port": port,
+        "last_seen": last_seen or None,
+        "state": state,
+        "state_last_seen": state_last_seen or None,
+        "unverified": bool(flags & SHM_FLAG_UNVERIFIED),
+        "rev": rev,
+    }
+
+
+class RegistryTable:
+    """공유 메모리 장치 테이블 읽기 전용 뷰 (레코드를 mmap에서 바로 unpack)"""
+
+    def __init__(self, path: str | None = None, timeout: float = 0.5):
+        self.path = path or os.getenv("REGISTRY_SHM_PATH") or default_path()
+        self.timeout = timeout
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, _, _, _, _ = SHM_HEADER.unpack_from(self._map, 0)
+        if magic != SHM_MAGIC or version != SHM_LAYOUT_VERSION or record_size != SHM_RECORD_SIZE:
+            self.close()
+            raise ValueError(f"unsupported registry table: magic={magic!r} version={version} record_size={record_size}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def header(self) -> dict:
+        _, version, record_size, capacity, count, registry_version, updated_at = SHM_HEADER.unpack_from(self._map, 0)
+        return {
+            "layout_version": version,
+            "record_size": record_size,
+            "capacity": capacity,
+            "count": count,
+            "registry_version": registry_version,
+            "updated_at": updated_at,
+        }
+
+    def _slot_count(self) -> int:
+        count = SHM_HEADER.unpack_from(self._map, 0)[4]
+        # 서버가 파일을 더 크게 다시 만든 경우에도 매핑된 범위만 읽음
+        return min(count, (len(self._map) - SHM_HEADER_SIZE) // SHM_RECORD_SIZE)
+
+    def read_slot(self, slot: int) -> dict | None:
+        """레코드 1개를 일관된 상태로 읽음 (쓰는 중이면 timeout까지 재시도). 빈 슬롯이면 None"""
+        mm = self._map
+        off = SHM_HEADER_SIZE + slot * SHM_RECORD_SIZE
+        deadline = None
+        while True:
+            seq = SHM_SEQ.unpack_from(mm, off)[0]
+            if not seq & 1:
+                body = SHM_BODY.unpack_from(mm, off + 4)
+                if SHM_SEQ.unpack_from(mm, off)[0] == seq:
+                    return decode_record(body)
+            # 쓰는 중: 쓰는 쪽이 끝낼 수 있도록 양보 후 재시도
+            if deadline is None:
+                deadline = time.monotonic() + self.timeout
+            elif time.monotonic() > deadline:
+                raise TimeoutError(f"slot {slot} kept changing while reading")
+            time.sleep(0)
+
+    def read_all(self) -> list[dict]:
+        records = []
+        for slot in range(self._slot_count()):
+            rec = self.read_slot(slot)
+            if rec is not None:
+                records.append(rec)
+        return records
+
+    def get(self, dev_id: str) -> dict | None:
+        """id로 장치 1개 조회 (id 바이트만 비교한 뒤 일치하는 슬롯만 전체 디코드)"""
+        key = dev_id.encode("utf-8")[:32].ljust(32, b"\0")
+        view = memoryview(self._map)
+        try:
+            for slot in range(self._slot_count()):
+                off = SHM_HEADER_SIZE + slot * SHM_RECORD_SIZE
+                if view[off + SHM_ID_OFFSET:off + SHM_ID_OFFSET + 32] == key:
+                    rec = self.read_slot(slot)
+                    if rec is not None and rec["id"] == dev_id:
+                        return rec
+        finally:
+            view.release()
+        return None
+
+
+def _print_table(records: list[dict]):
+    now = time.time()
+    print(f"{'id':<16} {'addr':<21} {'seen':>6}  {'power':<5} {'mode':<5} {'temp':>4} {'room':>5}")
+    for dev in sorted(records, key=lambda d: d["id"]):
+        st = dev["state"] or {}
+        age = f"{int(now - dev['last_seen'])}s" if dev["last_seen"] else "--"
+        power = "--" if st.get("power") is None else ("ON" if st["power"] else "OFF")
+        room = "--" if st.get("room_temp") is None else f"{st['room_temp']:.1f}"
+        temp = "--" if st.get("temp") is None else str(st["temp"])
+        print(f"{dev['id']:<16} {dev['ip'] + ':' + str(dev['port']):<21} {age:>6}  {power:<5} {st.get('mode') or '--':<5} {temp:>4} {room:>5}")
+
+
+def main(argv: list[str]) -> int:
+    path = None
+    if "--path" in argv:
+        path = argv[argv.index("--path") + 1]
+    try:
+        with RegistryTable(path) as table:
+            records = table.read_all()
+    except FileNotFoundError:
+        print("[오류] 공유 메모리 테이블이 없습니다. 서버를 REGISTRY_SHM_ENABLED=1 로 실행하세요.", file=sys.stderr)
+        return 1
+    if "--json" in argv:
+        print(json.dumps(records, ensure_ascii=False))
+    else:
+        _print_table(records)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
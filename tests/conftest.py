@@ -0,0 +1,25 @@
+"""테스트 공용: 앱 팩토리로 백그라운드 작업 없는 서버 인스턴스 생성 (파일은 모두 tmp_path 아래)"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aircon_server import ServerConfig, create_app
+
+
+@pytest.fixture
+def make_server(tmp_path):
+    """make_server(transport) -> 인스턴스 모듈 (app.state.server). DB 스키마까지 준비"""
+    def make(transport=None):
+        app = create_app(ServerConfig(
+            udp_listener=False, scheduler=False, time_sync=False, mdns=False, registry_snapshot=False,
+            static_watch=False, health_probe=False, transport=transport,
+            db_path=str(tmp_path / "schedules.db"), action_log_path=str(tmp_path / "logs" / "actions.log"),
+            snapshot_path=str(tmp_path / "registry.json"), pending_commands_path=str(tmp_path / "pending.json"),
+        ))
+        srv = app.state.server
+        srv.init_db(check_integrity=False)
+        return srv
+    return make
@@ -0,0 +1,103 @@
+"""Idempotency-Key: 동시 중복은 1회 실행, TTL 안의 재요청은 저장된 결과, 다른 본문은 422, 실패는 저장하지 않음"""
+import threading
+import time
+
+import pytest
+
+
+class CountingTransport:
+    """장치 HTTP 대역. 명령 수를 세고, delay만큼 늦게 응답 (동시 중복 요청이 실행 중에 겹치도록)"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+
+        class _Resp:
+            ok = True
+            status_code = 200
+        return _Resp()
+
+
+def add_device(srv, dev_id="ac-1"):
+    with srv.devices_lock:
+        srv.devices[dev_id] = {"id": dev_id, "ip": "10.0.0.11", "port": 80, "last_seen": time.time()}
+
+
+def set_ac(srv, key, temp=24, device_id="ac-1"):
+    response = srv.Response()
+    result = srv.set_ac_endpoint(device_id, srv.AcCommand(power="on", temp=temp), response, key)
+    return result, response
+
+
+def test_concurrent_duplicates_run_once(make_server):
+    transport = CountingTransport(delay=0.3)
+    srv = make_server(transport)
+    add_device(srv)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        result, _ = set_ac(srv, "k-concurrent")
+        with lock:
+            results.append(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert transport.calls == 1
+    assert len(results) == 5 and all(r == results[0] for r in results)
+    assert srv.idempotency_stats["executed"] == 1
+    assert srv.idempotency_stats["attached"] == 4
+
+
+def test_repeat_within_ttl_is_replayed(make_server):
+    transport = CountingTransport()
+    srv = make_server(transport)
+    add_device(srv)
+    first, first_resp = set_ac(srv, "k-replay")
+    again, again_resp = set_ac(srv, "k-replay")
+    assert transport.calls == 1
+    assert again == first
+    assert "Idempotent-Replayed" not in first_resp.headers
+    assert again_resp.headers["Idempotent-Replayed"] == "true"
+
+    # TTL이 지나면 새 요청으로 실행
+    srv.IDEMPOTENCY_TTL_SEC = 0.05
+    time.sleep(0.1)
+    _, resp = set_ac(srv, "k-replay")
+    assert transport.calls == 2
+    assert "Idempotent-Replayed" not in resp.headers
+
+
+def test_same_key_different_payload_is_422(make_server):
+    transport = CountingTransport()
+    srv = make_server(transport)
+    add_device(srv)
+    set_ac(srv, "k-conflict", temp=24)
+    with pytest.raises(srv.HTTPException) as exc:
+        set_ac(srv, "k-conflict", temp=18)
+    assert exc.value.status_code == 422
+    assert transport.calls == 1
+    assert srv.idempotency_stats["conflicts"] == 1
+
+
+def test_failed_first_attempt_is_not_cached(make_server):
+    transport = CountingTransport()
+    srv = make_server(transport)
+    # 장치가 아직 없어 404로 실패 -> 결과를 저장하지 않으므로 같은 키의 재시도는 다시 실행
+    with pytest.raises(srv.HTTPException) as exc:
+        set_ac(srv, "k-retry")
+    assert exc.value.status_code == 404
+    add_device(srv)
+    result, resp = set_ac(srv, "k-retry")
+    assert result["result"]["ok"] is True
+    assert "Idempotent-Replayed" not in resp.headers
+    assert transport.calls == 1
@@ -0,0 +1,81 @@
+"""예약 발송 순서: 한 번의 평가에서 같은 스케줄의 ON과 OFF가 함께 도래해도 최종 상태는 OFF.
+다른 스케줄의 발송은 서로 기다리지 않고 병렬로 실행"""
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+
+class SlowOnTransport:
+    """장치 HTTP 대역. ON은 늦게, OFF는 바로 반영 (동시에 실행되면 늦게 끝난 ON이 최종 상태가 됨)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.power: dict[str, str] = {}
+
+    def get(self, url, params=None, timeout=None):
+        host = urllib.parse.urlparse(url).hostname
+        if params.get("power") == "on":
+            time.sleep(0.2)
+        with self.lock:
+            self.power[host] = params["power"]
+
+        class _Resp:
+            ok = True
+            status_code = 200
+        return _Resp()
+
+
+def daily_schedule(sid, start):
+    return {
+        "id": sid, "enabled": True, "power": "on", "mode": "cool", "temp": 24, "schedule_type": "daily",
+        "date": None, "start_date": None, "end_date": None, "scene": None, "weekday": None,
+        "start_time_min": start.hour * 60 + start.minute, "end_time_min": start.hour * 60 + start.minute + 1,
+    }
+
+
+def test_on_and_off_due_in_one_pass_end_off(make_server):
+    transport = SlowOnTransport()
+    srv = make_server(transport)
+    srv.SCHEDULE_CATCHUP_POLICY = "all"
+    now_ts = time.time()
+    with srv.devices_lock:
+        for i in range(8):
+            srv.devices[f"ac-{i}"] = {"id": f"ac-{i}", "ip": f"10.0.0.{i + 1}", "port": 80, "last_seen": now_ts}
+
+    now = datetime(2026, 7, 1, 12, 0)
+    fire, skip = srv._select_due_events([daily_schedule(1, now - timedelta(minutes=30))], now - timedelta(hours=1), now)
+    assert [action for _, _, action in fire] == ["on", "off"]
+    assert skip == []
+
+    futures = srv.dispatch_due_events(fire, now)
+    for f in futures:
+        f.result(timeout=30)
+    assert transport.power == {f"10.0.0.{i + 1}": "off" for i in range(8)}
+
+
+def test_different_schedules_dispatch_concurrently(make_server):
+    srv = make_server(SlowOnTransport())
+    srv.SCHEDULE_CATCHUP_POLICY = "all"
+    # 두 스케줄의 ON이 둘 다 실행 중이어야 통과하는 barrier (하나씩 실행되면 timeout으로 깨짐)
+    barrier = threading.Barrier(2, timeout=5)
+    order: list[tuple[int, str]] = []
+    order_lock = threading.Lock()
+
+    def fake_dispatch(sch, action, occurrence, late_sec):
+        if action == "on":
+            barrier.wait()
+        with order_lock:
+            order.append((sch["id"], action))
+
+    srv._dispatch_schedule_event = fake_dispatch
+    now = datetime(2026, 7, 1, 12, 0)
+    schedules = [daily_schedule(1, now - timedelta(minutes=30)), daily_schedule(2, now - timedelta(minutes=30))]
+    fire, _ = srv._select_due_events(schedules, now - timedelta(hours=1), now)
+    assert len(fire) == 4
+
+    for f in srv.dispatch_due_events(fire, now):
+        f.result(timeout=30)
+    assert not barrier.broken
+    for sid in (1, 2):
+        assert [a for s, a in order if s == sid] == ["on", "off"]
@@ -0,0 +1,105 @@
+"""바이너리 상태 형식: 펌웨어 pushStatusWire(arduino.c)와 같은 바이트 배치로 만든 패킷의 디코드,
+UDP 수신 전처리(udp_prefilter)의 버림 사유"""
+import pytest
+
+
+def firmware_packet(version=1, power=True, swing=False, seq=0x01020304, ip=(192, 168, 0, 42), http_port=80,
+                    udp_port=4210, temp=24, heat=False, fan=0, room=None, host=b"ac-101", group=b""):
+    """arduino.c pushStatusWire와 같은 순서로 한 바이트씩 (big-endian, room은 x10 int16, 없으면 -32768)"""
+    room_raw = -32768 if room is None else round(room * 10)
+    room_u16 = room_raw & 0xFFFF
+    pkt = bytearray(b"AS")
+    pkt.append(version)
+    pkt.append(0x04 | (0x01 if power else 0) | (0x02 if swing else 0))
+    pkt += bytes([(seq >> 24) & 0xFF, (seq >> 16) & 0xFF, (seq >> 8) & 0xFF, seq & 0xFF])
+    pkt += bytes(ip)
+    pkt += bytes([http_port >> 8, http_port & 0xFF])
+    pkt += bytes([udp_port >> 8, udp_port & 0xFF])
+    pkt.append(temp)
+    pkt.append(1 if heat else 0)
+    pkt.append(fan)
+    pkt += bytes([room_u16 >> 8, room_u16 & 0xFF])
+    pkt.append(len(host))
+    pkt += host
+    pkt.append(len(group))
+    pkt += group
+    return bytes(pkt)
+
+
+@pytest.fixture
+def srv(make_server):
+    return make_server()
+
+
+def test_header_is_22_bytes(srv):
+    assert srv._WIRE_HEADER.size == 22
+    assert len(firmware_packet(host=b"", group=b"")) == 22 + 1
+
+
+def test_decode_full_packet_with_group_and_negative_room(srv):
+    data = firmware_packet(power=True, swing=True, temp=27, heat=True, fan=2, room=-3.5, group=b"floor-2")
+    dev_id, ip, port, udp_port, group, seq, state = srv.decode_wire_status(data)
+    assert (dev_id, ip, port, udp_port, group, seq) == ("ac-101", "192.168.0.42", 80, 4210, "floor-2", 0x01020304)
+    assert state == {"power": True, "mode": "hot", "temp": 27, "fan": "medium", "swing": True, "room_temp": -3.5}
+
+
+def test_decode_absent_room_and_empty_group(srv):
+    data = firmware_packet(power=False, temp=18, fan=3, room=None)
+    dev_id, _, _, _, group, _, state = srv.decode_wire_status(data)
+    assert dev_id == "ac-101"
+    assert group == ""
+    assert state == {"power": False, "mode": "cool", "temp": 18, "fan": "high", "swing": False, "room_temp": None}
+
+
+def test_decode_matches_encoder(srv):
+    state = {"power": True, "mode": "cool", "temp": 22, "fan": "low", "swing": False, "room_temp": 25.4}
+    encoded = srv.encode_wire_status("ac-101", "192.168.0.42", 80, state, 0x01020304, udp_port=4210, group="g1")
+    assert encoded == firmware_packet(temp=22, fan=1, room=25.4, group=b"g1")
+
+
+def test_unknown_higher_version_reads_v1_fields(srv):
+    # 상위 버전은 v1 헤더/문자열까지만 읽고 뒤에 붙은 필드는 무시
+    data = firmware_packet(version=7, temp=25, room=21.0, group=b"g") + b"\x00\x01future"
+    dev_id, _, _, _, group, _, state = srv.decode_wire_status(data)
+    assert (dev_id, group, state["temp"], state["room_temp"]) == ("ac-101", "g", 25, 21.0)
+
+
+@pytest.mark.parametrize("data", [
+    firmware_packet(version=0),                  # 버전 0
+    b"AX" + firmware_packet()[2:],               # magic 불일치
+    firmware_packet()[:21],                      # 헤더보다 짧음
+    firmware_packet(host=b"")[:22] + b"\x00",    # id 없음
+    firmware_packet()[:25],                      # id가 잘림
+])
+def test_decode_rejects_malformed(srv, data):
+    assert srv.decode_wire_status(data) is None
+
+
+def test_wire_item_uses_source_ip_when_unset(srv):
+    decoded = srv.decode_wire_status(firmware_packet(ip=(0, 0, 0, 0)))
+    item = srv._wire_item(decoded, "10.0.0.7")
+    assert item[0] == "ac-101" and item[2] == "10.0.0.7" and item[3] == 80
+
+
+def test_prefilter_reasons(srv):
+    srv.udp_own_ips = frozenset({"10.0.0.1"})
+    wire = firmware_packet()
+    json_resp = b'{"id":"ac-101","ip":"10.0.0.5","port":80}'
+    assert srv.udp_prefilter(wire, "10.0.0.1") == "self"
+    assert srv.udp_prefilter(b'{"id":1}', "10.0.0.5") == "too_small"
+    assert srv.udp_prefilter(b"{" + b" " * srv.UDP_PACKET_MAX_BYTES + b"}", "10.0.0.5") == "too_large"
+    assert srv.udp_prefilter(b"hello from another system", "10.0.0.5") == "unknown_format"
+    assert srv.udp_prefilter(b'{"op":"discover","http_port":8000}', "10.0.0.5") == "non_response"
+    assert srv.udp_prefilter(wire, "10.0.0.5") is None
+    assert srv.udp_prefilter(json_resp, "10.0.0.5") is None
+
+
+def test_dropped_packets_are_counted_and_not_applied(srv):
+    srv.udp_own_ips = frozenset({"10.0.0.1"})
+    assert srv._handle_udp_packet(firmware_packet(), ("10.0.0.1", 4210)) is None
+    assert srv._handle_udp_packet(b"garbage!!!!!", ("10.0.0.5", 4210)) is None
+    assert srv.udp_drop_stats["self"] == 1
+    assert srv.udp_drop_stats["unknown_format"] == 1
+    assert srv.devices == {}
+    assert srv._handle_udp_packet(firmware_packet(), ("10.0.0.5", 4210)) == "ac-101"
+    assert srv.devices["ac-101"]["ip"] == "192.168.0.42"
@@ -43,6 +43,39 @@ function fetchWithTimeout(url, options = {}, timeoutMs = DEFAULT_API_TIMEOUT_MS)
         .finally(() => clearTimeout(id));
 }
 
+// 제어 명령용 Idempotency-Key (같은 조작의 재시도는 같은 키 → 서버가 한 번만 실행)
+function newIdempotencyKey() {
+    try {
+        if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+            return window.crypto.randomUUID();
+        }
+    } catch (_) {}
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+}
+
+const COMMAND_ATTEMPTS = 2;  // 타임아웃/네트워크 오류 시 같은 키로 다시 시도하는 총 횟수
+
+// 제어 명령 POST: 응답을 못 받으면 같은 Idempotency-Key로 재시도 (서버는 진행 중/완료된 결과를 돌려줌)
+async function postCommand(url, body, idempotencyKey = newIdempotencyKey()) {
+    const options = {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey,
+        },
+    };
+    if (body !== undefined) options.body = JSON.stringify(body);
+    let lastError = null;
+    for (let attempt = 0; attempt < COMMAND_ATTEMPTS; attempt++) {
+        try {
+            return await fetchWithTimeout(url, options);
+        } catch (error) {
+            lastError = error;
+        }
+    }
+    throw lastError;
+}
+
 // API 통신 함수
 const api = {
     // 모든 장치 목록 조회
@@ -97,17 +130,13 @@ const api = {
         };
 
         const endpoints = ['/devices/control', '/devices/batch/ac/set'];
+        // 두 엔드포인트는 서버에서 같은 키 공간: 첫 요청이 늦게 처리돼도 두 번 보내지 않음
+        const idempotencyKey = newIdempotencyKey();
         let lastError = null;
 
         for (const path of endpoints) {
             try {
-                const response = await fetchWithTimeout(`${API_BASE_URL}${path}`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify(payload),
-                });
+                const response = await postCommand(`${API_BASE_URL}${path}`, payload, idempotencyKey);
 
                 if (response.status === 404 || response.status === 405) {
                     lastError = new Error(`Endpoint ${path} is not available`);
@@ -146,6 +175,33 @@ const api = {
             return [];
         }
     },
+    // 바뀐 장치만 조회: since(이전 응답의 version) 이후 변경분. since가 없으면 전체
+    // 응답: { version, full, count, changed: [장치 항목], down: [id], stale: [id] }, 실패 시 null
+    async getStatusDelta(since) {
+        try {
+            const response = await fetchWithTimeout(`${API_BASE_URL}/devices/status?since=${since ?? 0}`);
+            if (!response.ok) {
+                console.error('Failed to fetch status delta:', response.status, response.statusText);
+                return null;
+            }
+            const data = await response.json();
+            if (Array.isArray(data)) {
+                // since를 모르는 구버전 서버: 전체 목록을 델타 형식으로 변환
+                return {
+                    version: null,
+                    full: true,
+                    count: data.length,
+                    changed: data,
+                    down: data.filter(d => !d?.health?.ok).map(d => d.id),
+                    stale: [],
+                };
+            }
+            return data && Array.isArray(data.changed) ? data : null;
+        } catch (error) {
+            console.error('Error fetching status delta:', error);
+            return null;
+        }
+    },
 
     // 특정 장치 상태 조회
     async getDeviceState(deviceId) {
@@ -162,13 +218,7 @@ const api = {
     // 특정 장치 제어
     async setDevice(deviceId, command) {
         try {
-            const response = await fetchWithTimeout(`${API_BASE_URL}/devices/${deviceId}/ac/set`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(command),
-            });
+            const response = await postCommand(`${API_BASE_URL}/devices/${deviceId}/ac/set`, command);
             if (!response.ok) throw new Error('Failed to set device');
             return await response.json();
         } catch (error) {
@@ -180,13 +230,7 @@ const api = {
     // 모든 장치 켜기
     async allOn(command = null) {
         try {
-            const response = await fetchWithTimeout(`${API_BASE_URL}/all/on`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(command || {}),
-            });
+            const response = await postCommand(`${API_BASE_URL}/all/on`, command || {});
             if (!response.ok) throw new Error('Failed to turn on all devices');
             return await response.json();
         } catch (error) {
@@ -198,12 +242,7 @@ const api = {
     // 모든 장치 끄기
     async allOff() {
         try {
-            const response = await fetchWithTimeout(`${API_BASE_URL}/all/off`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-            });
+            const response = await postCommand(`${API_BASE_URL}/all/off`);
             if (!response.ok) throw new Error('Failed to turn off all devices');
             return await response.json();
         } catch (error) {
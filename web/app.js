@@ -31,7 +31,10 @@ const DEVICE_FLOOR = {
 
 // 전역 상태
 let devices = [];
+let deviceById = new Map(); // id -> device (devices와 같은 객체)
 let deviceStatuses = {};
+let rawStatuses = {}; // 서버가 보낸 장치 항목 원본 (델타 응답을 누적)
+let statusVersion = null; // 마지막으로 받은 /devices/status 버전 (다음 폴링의 since, null이면 전체 요청)
 let selectedDeviceIds = []; // 여러 장치 선택 가능
 let pendingDevices = new Set(); // 진행중인 장치 목록
 const GLOBAL_ACTION_TIMEOUT_MS = 10000; // 전체 제어/적용 시 최대 대기 시간
@@ -47,6 +50,26 @@ const HEALTH_TO_HEALTHY_SUCCESSES = 6; // 연속 6번 성공해야 healthy로 
 const HEALTH_MIN_FAILURE_RATIO = 0.7; // 최근 히스토리 중 70% 이상 실패해야 unhealthy
 const HEALTH_MIN_SUCCESS_RATIO = 0.8; // 최근 히스토리 중 80% 이상 성공해야 healthy
 
+// 장치 그리드 렌더링: 카드는 id별로 재사용하고 내용이 바뀐 카드만 다시 그림
+// 장치가 많으면 보이는 행(+여유 행)의 카드만 DOM에 붙임 (가상 스크롤)
+const VIRTUAL_SCROLL_THRESHOLD = 60; // 이보다 장치가 많으면 가상 스크롤
+const VIRTUAL_OVERSCAN_ROWS = 4; // 화면 위/아래로 미리 그려 둘 행 수
+const GRID_COLUMNS = 2;
+const GRID_GAP_PX = 6; // style.css .devices-grid gap
+const cardCache = new Map(); // deviceId -> { el, sig }
+let virtualRowHeight = 0; // 카드 1행 높이(gap 포함), 0이면 다음 렌더링에서 측정
+let renderScheduled = false;
+const RENDER_DEBUG = (() => {
+    try {
+        return new URLSearchParams(window.location.search).has('debugRender');
+    } catch (_) {
+        return false;
+    }
+})();
+// 렌더링 측정값 (개발자 도구에서 window.renderStats로 확인)
+const renderStats = { updates: 0, last_ms: 0, avg_ms: 0, max_ms: 0, patched: 0, mounted: 0, devices: 0, virtual: false };
+window.renderStats = renderStats;
+
 // 저장된 설정 불러오기
 function loadSavedCommand() {
     try {
@@ -194,10 +217,11 @@ async function init() {
 async function loadDevices() {
     const allDevices = await api.getDevices();
     const allDeviceIds = DEVICE_GRID_ORDER.flat();
+    const found = new Map(allDevices.map(d => [d.id, d]));
     
     // 장치를 고정 순서로 정렬
     devices = allDeviceIds.map(id => {
-        const device = allDevices.find(d => d.id === id);
+        const device = found.get(id);
         // 새로 발견된 장치의 health 히스토리 초기화
         if (device && !healthHistory[id]) {
             healthHistory[id] = {
@@ -208,10 +232,48 @@ async function loadDevices() {
         }
         return device || { id, ip: '', port: 80 }; // 없으면 빈 장치로 표시
     });
+    // 고정 배치에 없는 장치는 id 순으로 뒤에 붙임
+    const extra = allDevices.filter(d => !allDeviceIds.includes(d.id));
+    extra.sort((a, b) => a.id.localeCompare(b.id));
+    devices.push(...extra);
+    deviceById = new Map(devices.map(d => [d.id, d]));
     
     renderDevices();
 }
 
+// 그리드 표시 순서의 장치 id 목록
+function orderedDeviceIds() {
+    return devices.map(d => d.id);
+}
+
+// 상태 응답에서 처음 보는 장치를 목록 뒤에 추가 (고정 배치의 빈 장치는 주소만 채움)
+function ensureDevice(entry) {
+    const known = deviceById.get(entry.id);
+    if (known) {
+        if (!known.ip && entry.ip) {
+            known.ip = entry.ip;
+            known.port = entry.port;
+        }
+        return;
+    }
+    const device = { id: entry.id, ip: entry.ip || '', port: entry.port || 80 };
+    devices.push(device);
+    deviceById.set(device.id, device);
+}
+
+// 고정 배치 밖의 장치 중 서버 목록에서 사라진 장치 제거
+function pruneDevices(liveIds) {
+    const fixedIds = new Set(DEVICE_GRID_ORDER.flat());
+    const before = devices.length;
+    devices = devices.filter(d => fixedIds.has(d.id) || liveIds.has(d.id));
+    if (devices.length !== before) {
+        deviceById = new Map(devices.map(d => [d.id, d]));
+        for (const id of cardCache.keys()) {
+            if (!deviceById.has(id)) cardCache.delete(id);
+        }
+    }
+}
+
 // Health 상태 안정화 함수
 function updateHealthStability(deviceId, isHealthy) {
     if (!healthHistory[deviceId]) {
@@ -313,36 +375,23 @@ function updateHealthStability(deviceId, isHealthy) {
 }
 
 // 상태 업데이트
+// since=이전 버전으로 바뀐 장치만 받아 누적하고, health/상태 만료는 down/stale 목록으로 전체 반영
 async function updateStatus() {
     try {
-        const statuses = await api.getAllStatus();
-        
-        // 상태를 객체로 변환하고 health 안정화 적용
-        deviceStatuses = {};
-        
-        // statuses가 배열인지 확인
-        if (!statuses || !Array.isArray(statuses)) {
-            // null이거나 배열이 아니면 빈 배열로 처리
-            console.warn('getAllStatus returned non-array:', statuses);
+        let delta = await api.getStatusDelta(statusVersion);
+        if (delta && !delta.full && !applyStatusDelta(delta)) {
+            // 장치 수가 맞지 않음(삭제 발생): 전체를 다시 받음
+            delta = await api.getStatusDelta(null);
+        }
+        if (!delta) {
+            // 서버 응답 없음: 모든 장치를 상태 없음으로 표시하고 다음 폴링은 전체 요청
+            deviceStatuses = {};
+            rawStatuses = {};
+            statusVersion = null;
             renderDevices();
             return;
         }
-        
-        statuses.forEach(status => {
-            const rawHealthy = status?.health?.ok || false;
-            const stableHealthy = updateHealthStability(status.id, rawHealthy);
-            
-            // 안정화된 health 상태로 덮어쓰기
-            deviceStatuses[status.id] = {
-                ...status,
-                health: {
-                    ...status.health,
-                    ok: stableHealthy,
-                    raw: rawHealthy // 원본 상태도 보관 (디버깅용)
-                }
-            };
-        });
-        
+        if (delta.full) applyStatusDelta(delta);
         renderDevices();
     } catch (error) {
         console.error('Error in updateStatus:', error);
@@ -350,23 +399,162 @@ async function updateStatus() {
     }
 }
 
-// 장치 카드 렌더링
+// 델타 응답을 rawStatuses에 누적하고 deviceStatuses를 다시 계산. 장치 수가 어긋나면 false
+function applyStatusDelta(delta) {
+    const changed = Array.isArray(delta.changed) ? delta.changed : [];
+    if (delta.full) {
+        rawStatuses = {};
+    }
+    changed.forEach(entry => {
+        if (!entry || !entry.id) return;
+        rawStatuses[entry.id] = entry;
+        ensureDevice(entry);
+    });
+    const ids = Object.keys(rawStatuses);
+    if (!delta.full && typeof delta.count === 'number' && ids.length !== delta.count) {
+        statusVersion = null;
+        return false;
+    }
+    if (delta.full) {
+        pruneDevices(new Set(ids));
+    }
+    statusVersion = delta.version ?? null;
+    
+    const down = new Set(delta.down || []);
+    const stale = new Set(delta.stale || []);
+    const next = {};
+    ids.forEach(id => {
+        const status = rawStatuses[id];
+        const rawHealthy = !down.has(id);
+        const stableHealthy = updateHealthStability(id, rawHealthy);
+        
+        // 안정화된 health 상태로 덮어쓰기 (상태 캐시가 만료된 장치는 상태 없음으로 표시)
+        next[id] = {
+            ...status,
+            state: stale.has(id) ? null : status.state,
+            health: {
+                ...status.health,
+                ok: stableHealthy,
+                raw: rawHealthy // 원본 상태도 보관 (디버깅용)
+            }
+        };
+    });
+    deviceStatuses = next;
+    return true;
+}
+
+// 장치 카드 렌더링 (바뀐 카드만 갱신, 장치가 많으면 보이는 영역만)
 function renderDevices() {
-    const devicesGrid = document.getElementById('devicesGrid');
-    devicesGrid.innerHTML = '';
+    const t0 = performance.now();
+    const ids = orderedDeviceIds();
+    const virtual = ids.length > VIRTUAL_SCROLL_THRESHOLD;
+    const container = devicesGrid.parentElement;
+    if (container) container.classList.toggle('virtual', virtual);
     
-    // 2열 그리드로 렌더링
-    DEVICE_GRID_ORDER.forEach(row => {
-        row.forEach(deviceId => {
-            const card = createDeviceCard(deviceId);
-            if (card) devicesGrid.appendChild(card);
-        });
+    let start = 0;
+    let end = ids.length;
+    let padTop = 0;
+    let padBottom = 0;
+    if (virtual) {
+        const win = virtualWindow(ids.length, container);
+        ({ start, end, padTop, padBottom } = win);
+    }
+    
+    let patched = 0;
+    const wanted = [];
+    const selected = new Set(selectedDeviceIds);
+    for (let i = start; i < end; i++) {
+        const entry = patchDeviceCard(ids[i], selected);
+        if (entry.changed) patched++;
+        wanted.push(entry.el);
+    }
+    
+    // 필요 없는 카드만 떼어내고, 순서가 다른 카드만 옮김
+    const keep = new Set(wanted);
+    Array.from(devicesGrid.children).forEach(child => {
+        if (!keep.has(child)) devicesGrid.removeChild(child);
+    });
+    let cursor = devicesGrid.firstChild;
+    wanted.forEach(el => {
+        if (el === cursor) {
+            cursor = cursor.nextSibling;
+        } else {
+            devicesGrid.insertBefore(el, cursor);
+        }
+    });
+    devicesGrid.style.paddingTop = padTop ? `${padTop}px` : '';
+    devicesGrid.style.paddingBottom = padBottom ? `${padBottom}px` : '';
+    
+    // 가상 스크롤 행 높이는 처음 붙은 카드로 측정 (기본값과 다르면 한 번 더 그림)
+    if (virtual && !virtualRowHeight && wanted.length) {
+        virtualRowHeight = wanted[0].offsetHeight + GRID_GAP_PX;
+        scheduleRender();
+    }
+    
+    const took = performance.now() - t0;
+    renderStats.updates++;
+    renderStats.last_ms = took;
+    renderStats.avg_ms += (took - renderStats.avg_ms) / renderStats.updates;
+    renderStats.max_ms = Math.max(renderStats.max_ms, took);
+    renderStats.patched = patched;
+    renderStats.mounted = wanted.length;
+    renderStats.devices = ids.length;
+    renderStats.virtual = virtual;
+    if (RENDER_DEBUG) {
+        console.debug(`[Render] ${took.toFixed(2)}ms patched=${patched} mounted=${wanted.length} devices=${ids.length}`);
+    }
+}
+
+// 스크롤 위치 기준으로 DOM에 붙일 장치 범위와 위/아래 여백 계산
+function virtualWindow(total, container) {
+    const rowHeight = virtualRowHeight || 72;
+    const rows = Math.ceil(total / GRID_COLUMNS);
+    const scrollTop = container ? container.scrollTop : 0;
+    const viewHeight = container ? container.clientHeight : window.innerHeight;
+    const firstRow = Math.max(0, Math.floor(scrollTop / rowHeight) - VIRTUAL_OVERSCAN_ROWS);
+    const lastRow = Math.min(rows, Math.ceil((scrollTop + viewHeight) / rowHeight) + VIRTUAL_OVERSCAN_ROWS);
+    return {
+        start: firstRow * GRID_COLUMNS,
+        end: Math.min(total, lastRow * GRID_COLUMNS),
+        padTop: firstRow * rowHeight,
+        padBottom: Math.max(0, rows - lastRow) * rowHeight,
+    };
+}
+
+// 스크롤/리사이즈 시 다음 프레임에 한 번만 렌더링
+function scheduleRender() {
+    if (renderScheduled) return;
+    renderScheduled = true;
+    requestAnimationFrame(() => {
+        renderScheduled = false;
+        renderDevices();
     });
 }
 
-// 장치 카드 생성 함수
-function createDeviceCard(deviceId) {
-        const device = devices.find(d => d.id === deviceId);
+// 카드 1개를 가져오거나 만들고, 표시 내용이 바뀐 경우에만 다시 그림
+function patchDeviceCard(deviceId, selected) {
+    let entry = cardCache.get(deviceId);
+    if (!entry) {
+        const el = document.createElement('div');
+        el.dataset.deviceId = deviceId;
+        entry = { el, sig: null, changed: false };
+        cardCache.set(deviceId, entry);
+    }
+    const view = deviceCardView(deviceId, selected);
+    const sig = [
+        view.floor, view.location, view.isSelected, view.isPending, view.hasIssue,
+        view.isOn, view.setTemp, view.roomTemp, view.cardMode,
+    ].join('|');
+    entry.changed = entry.sig !== sig;
+    if (entry.changed) {
+        fillDeviceCard(entry.el, deviceId, view);
+        entry.sig = sig;
+    }
+    return entry;
+}
+
+// 카드에 표시할 값 계산
+function deviceCardView(deviceId, selected) {
         const status = deviceStatuses[deviceId];
         const isHealthy = status?.health?.ok || false;
         const state = status?.state || null;
@@ -378,25 +566,26 @@ function createDeviceCard(deviceId) {
             ? parseInt(state.temp, 10)
             : null;
         const mode = state?.mode || null;
-        
-        const card = document.createElement('div');
-        const isSelected = selectedDeviceIds.includes(deviceId);
-        const exists = device && device.ip; // 실제 장치가 존재하는지 확인
         const isPending = pendingDevices.has(deviceId); // 진행중인지 확인
         const hasTemp = roomTemp !== '--'; // 온도 정보가 있는지 확인
-        const hasIssue = !hasTemp || !isHealthy; // 온도 정보가 없거나 health가 안 좋으면 문제
+        return {
+            isOn,
+            roomTemp,
+            setTemp,
+            isSelected: selected.has(deviceId),
+            isPending,
+            hasIssue: !hasTemp || !isHealthy, // 온도 정보가 없거나 health가 안 좋으면 문제
+            location: DEVICE_LOCATIONS[deviceId] || '',
+            floor: DEVICE_FLOOR[deviceId] || '',
+            cardMode: isOn && mode ? mode : null, // 카드 배경색용 모드
+        };
+    }
+
+// 장치 카드 내용 채우기 (클릭은 devicesGrid에서 위임 처리)
+function fillDeviceCard(card, deviceId, view) {
+        const { isOn, roomTemp, setTemp, isSelected, isPending, hasIssue, location, floor, cardMode } = view;
         
         card.className = `device-card ${isSelected ? 'selected' : ''} ${isPending ? 'pending' : ''}`;
-        card.dataset.deviceId = deviceId;
-        
-        // 진행중이 아닐 때만 클릭 가능
-        if (!isPending) {
-            card.addEventListener('click', () => selectDevice(deviceId));
-        }
-        
-        const location = DEVICE_LOCATIONS[deviceId] || '';
-        const floor = DEVICE_FLOOR[deviceId] || '';
-        const cardMode = isOn && mode ? mode : null; // 카드 배경색용 모드
         
         card.innerHTML = `
             <div class="device-floor-badge">${floor}</div>
@@ -436,8 +625,6 @@ function createDeviceCard(deviceId) {
         } else if (cardMode === 'cool') {
             card.classList.add('mode-cool-bg');
         }
-        
-        return card;
     }
 
 // 장치 선택 (단일)
@@ -477,7 +664,7 @@ function selectAllDevices() {
             if (controlPanel) controlPanel.style.display = '';
         }
     } catch (_) {}
-    const allDeviceIds = DEVICE_GRID_ORDER.flat();
+    const allDeviceIds = orderedDeviceIds();
     
     // 장치 목록이 비어있으면 로드 먼저 시도
     if (devices.length === 0) {
@@ -491,10 +678,7 @@ function selectAllDevices() {
     }
     
     // 모든 장치를 선택 (IP가 없어도 선택 가능 - 제어는 안 될 수 있지만 선택은 가능)
-    selectedDeviceIds = allDeviceIds.filter(deviceId => {
-        const device = devices.find(d => d.id === deviceId);
-        return device !== undefined; // 장치가 존재하면 선택
-    });
+    selectedDeviceIds = allDeviceIds.filter(deviceId => deviceById.has(deviceId)); // 장치가 존재하면 선택
     
     console.log('전체 선택:', selectedDeviceIds.length, '개 선택됨. 전체 장치:', devices.length, '개'); // 디버깅용
     
@@ -601,6 +785,25 @@ function updateButtonGroup(type, value) {
 
 // 이벤트 리스너 설정
 function setupEventListeners() {
+    // 장치 카드 클릭 (카드는 재사용되므로 그리드에서 위임 처리, 진행중인 카드는 무시)
+    devicesGrid.addEventListener('click', (e) => {
+        const card = e.target.closest('.device-card');
+        if (!card) return;
+        const deviceId = card.dataset.deviceId;
+        if (pendingDevices.has(deviceId)) return;
+        selectDevice(deviceId);
+    });
+    // 가상 스크롤: 스크롤/화면 크기 변경 시 보이는 카드만 다시 붙임
+    const devicesContainer = devicesGrid.parentElement;
+    if (devicesContainer) {
+        devicesContainer.addEventListener('scroll', () => {
+            if (renderStats.virtual) scheduleRender();
+        }, { passive: true });
+    }
+    window.addEventListener('resize', () => {
+        virtualRowHeight = 0;
+        scheduleRender();
+    });
     // ALL 버튼 - 모든 장치 선택
     const allSelectBtn = document.getElementById('allSelectBtn');
     if (allSelectBtn) {
@@ -635,9 +838,9 @@ function setupEventListeners() {
     allOnBtn.addEventListener('click', async () => {
         setActionButtonsDisabled(true);
         // 온도 정보가 있는 장치를 진행중으로 표시
-        const allDeviceIds = DEVICE_GRID_ORDER.flat();
+        const allDeviceIds = orderedDeviceIds();
         allDeviceIds.forEach(deviceId => {
-            const device = devices.find(d => d.id === deviceId);
+            const device = deviceById.get(deviceId);
             // 전체 제어 시에는 IP만 있으면 진행중으로 표시(일관된 UX)
             if (device && device.ip) {
                 pendingDevices.add(deviceId);
@@ -662,9 +865,9 @@ function setupEventListeners() {
     allOffBtn.addEventListener('click', async () => {
         setActionButtonsDisabled(true);
         // 온도 정보가 있는 장치를 진행중으로 표시
-        const allDeviceIds = DEVICE_GRID_ORDER.flat();
+        const allDeviceIds = orderedDeviceIds();
         allDeviceIds.forEach(deviceId => {
-            const device = devices.find(d => d.id === deviceId);
+            const device = deviceById.get(deviceId);
             // 전체 제어 시에는 IP만 있으면 진행중으로 표시(일관된 UX)
             if (device && device.ip) {
                 pendingDevices.add(deviceId);
@@ -941,7 +1144,7 @@ function startAutoRefresh() {
     }, 5000); // 5초마다 업데이트
     
     // 초기 health 히스토리 초기화
-    const allDeviceIds = DEVICE_GRID_ORDER.flat();
+    const allDeviceIds = orderedDeviceIds();
     allDeviceIds.forEach(deviceId => {
         if (!healthHistory[deviceId]) {
             healthHistory[deviceId] = {